@@ -5,13 +5,14 @@ import functools
 import logging
 import random
 import secrets
+import threading
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
 from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableSequence, Set
 from enum import IntEnum, IntFlag
-from typing import (AbstractSet, Any, ClassVar, Dict, List, Literal, NamedTuple,
-                    Optional, Protocol, Tuple, Union, TYPE_CHECKING, overload)
+from typing import (AbstractSet, Any, ClassVar, Dict, Generic, List, Literal, NamedTuple,
+                    Optional, Protocol, Tuple, TypeVar, Union, TYPE_CHECKING, overload)
 import dataclasses
 
 from typing_extensions import NotRequired, TypedDict
@@ -23,6 +24,7 @@ import Utils
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
     from rule_builder.rules import Rule
+    from sweep_pool import SweepPool
     from worlds import AutoWorld
 
 
@@ -96,6 +98,12 @@ class MultiWorld():
     item_links: Dict[int, Options.ItemLinks]
 
     plando_item_blocks: Dict[int, List[PlandoItemBlock]]
+    locality_item_rules: Dict[Callable[[Item], bool], Dict[int, Set[str]]]
+    """Item rules created by locality_rules, mapped to the item names they forbid by sending player."""
+    sphere_cache: Optional[SphereCache]
+    """Set by cache_spheres once the placement is final."""
+    sweep_pool: Optional[SweepPool]
+    """Worker processes to run sweeps in, see sweep_pool.parallel_sweeps."""
 
     game: Dict[int, str]
 
@@ -169,6 +177,9 @@ class MultiWorld():
         self.indirect_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
+        self.locality_item_rules = {}
+        self.sphere_cache = None
+        self.sweep_pool = None
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -582,32 +593,72 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def cache_spheres(self) -> None:
         """
-        yields a set of locations for each logical sphere
+        Compute the logical spheres at most once from now on and share them between get_spheres,
+        get_sendable_spheres, fulfills_accessibility and the spoiler playthrough.
+        Only call this once no more items are going to be placed, moved or reclassified.
+        """
+        self.sphere_cache = SphereCache(self)
+
+    def _iterate_spheres(self, state: CollectionState, locations: Iterable[Location],
+                         events: Iterable[Location] = ()) -> Iterator[Set[Location]]:
+        """
+        yields a set of locations for each logical sphere reachable from state, collecting the items of a sphere into
+        state after it was yielded. The items of events are collected as soon as they can be reached,
+        without being part of any sphere.
 
         If there are unreachable locations, the last sphere of reachable
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        pending_locations: List[Location] = list(locations)
+        pending_events: List[Location] = list(events)
 
-        while locations:
-            sphere: Set[Location] = set()
+        while pending_locations:
+            # cull events out
+            while pending_events:
+                remaining_events: List[Location] = []
+                done_events: List[Location] = []
+                for event in pending_events:
+                    (done_events if event.can_reach(state) else remaining_events).append(event)
+                if not done_events:
+                    break
+                for event in done_events:
+                    state.collect(event.item, True, event)
+                pending_events = remaining_events
 
-            for location in locations:
+            # rules may depend on the state of any player, so all remaining locations are checked for every sphere
+            sphere: Set[Location] = set()
+            remaining: List[Location] = []
+            for location in pending_locations:
                 if location.can_reach(state):
                     sphere.add(location)
+                else:
+                    remaining.append(location)
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield set(remaining)  # unreachable locations
                 break
 
             for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+                if location.item:
+                    state.collect(location.item, True, location)
+            pending_locations = remaining
+
+    def get_spheres(self) -> Iterator[Set[Location]]:
+        """
+        yields a set of locations for each logical sphere
+
+        If there are unreachable locations, the last sphere of reachable
+        locations is followed by an empty set, and then a set of all of the
+        unreachable locations.
+        """
+        if self.sphere_cache:
+            for sphere in self.sphere_cache.spheres:
+                yield set(sphere)
+            return
+        yield from self._iterate_spheres(CollectionState(self), self.get_filled_locations())
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -616,46 +667,24 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
+        if self.sphere_cache:
+            for sphere in self.sphere_cache.sendable_spheres:
+                yield set(sphere)
+            return
+        yield from self._iterate_sendable_spheres()
+
+    def _iterate_sendable_spheres(self) -> Iterator[Set[Location]]:
+        locations: List[Location] = []
+        events: List[Location] = []
         for location in self.get_filled_locations():
             if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
+                locations.append(location)
             else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+                events.append(location)
+        yield from self._iterate_spheres(CollectionState(self), locations, events)
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -664,8 +693,6 @@ class MultiWorld():
         for player, world in self.worlds.items():
             players[world.options.accessibility.current_key].add(player)
 
-        beatable_fulfilled = False
-
         def location_condition(location: Location) -> bool:
             """Determine if this location has to be accessible, location is already filtered by location_relevant"""
             return location.player in players["full"] or \
@@ -675,50 +702,257 @@ class MultiWorld():
             """Determine if this location is relevant to sweep."""
             return location.player in players["full"] or location.advancement
 
-        def all_done() -> bool:
-            """Check if all access rules are fulfilled"""
-            if not beatable_fulfilled:
-                return False
-            if any(location_condition(location) for location in locations):
-                return False  # still locations required to be collected
-            return True
+        locations = {location for location in self.get_locations() if location_relevant(location)}
+        if not locations:
+            return False
 
-        locations = [location for location in self.get_locations() if location_relevant(location)]
+        if not state and self.sphere_cache:
+            # spheres of the final placement are already known, only unfilled locations are left to check
+            # with a copy, as checking them updates the region caches of the state shared by the sphere cache
+            state = self.sphere_cache.state.copy()
+            for sphere in self.sphere_cache.spheres:
+                if not sphere:
+                    break
+                locations -= sphere
+        else:
+            if not state:
+                state = CollectionState(self)
+            for sphere in self._iterate_spheres(state, locations):
+                if not sphere:
+                    break
+                locations -= sphere
+                if self.has_beaten_game(state) and not any(location_condition(location) for location in locations):
+                    return True
 
-        while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
+        locations = {location for location in locations if location.item or not location.can_reach(state)}
+        if self.has_beaten_game(state) and not any(location_condition(location) for location in locations):
+            return True
+        if locations:
+            if __debug__:
+                from Fill import FillError
+                raise FillError(
+                    f"Could not access required locations for accessibility check. Missing: {locations}",
+                    multiworld=self,
+                )
+            # ran out of places and did not finish yet, quit
+            logging.warning(f"Could not access required locations for accessibility check."
+                            f" Missing: {locations}")
+        return False
 
-            if not sphere:
-                if __debug__:
-                    from Fill import FillError
-                    raise FillError(
-                        f"Could not access required locations for accessibility check. Missing: {locations}",
-                        multiworld=self,
-                    )
-                # ran out of places and did not finish yet, quit
-                logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
-                return False
 
-            for location in sphere:
-                if location.item:
-                    state.collect(location.item, True, location)
+class SphereCache:
+    """
+    Logical spheres of a multiworld with its final placement, computed on first use and shared by everything that
+    needs them during output. Output steps run in a thread pool, so computing is guarded by a lock.
+    """
+    multiworld: MultiWorld
+    _spheres: Optional[List[Set[Location]]]
+    _sendable_spheres: Optional[List[Set[Location]]]
+    _state: Optional[CollectionState]
 
-            if self.has_beaten_game(state):
-                beatable_fulfilled = True
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.multiworld = multiworld
+        self._lock = threading.Lock()
+        self._spheres = None
+        self._sendable_spheres = None
+        self._state = None
+
+    def _compute_spheres(self) -> None:
+        with self._lock:
+            if self._spheres is None:
+                state = CollectionState(self.multiworld)
+                spheres = list(self.multiworld._iterate_spheres(state, self.multiworld.get_filled_locations()))
+                self._state = state
+                self._spheres = spheres
 
-            if all_done():
-                return True
+    @property
+    def spheres(self) -> List[Set[Location]]:
+        """Spheres of all filled locations, as yielded by MultiWorld.get_spheres. Do not modify."""
+        self._compute_spheres()
+        return self._spheres
 
-        return False
+    @property
+    def state(self) -> CollectionState:
+        """State after collecting all reachable locations. Do not modify."""
+        self._compute_spheres()
+        return self._state
+
+    @property
+    def sendable_spheres(self) -> List[Set[Location]]:
+        """Spheres of sendable locations, as yielded by MultiWorld.get_sendable_spheres. Do not modify."""
+        with self._lock:
+            if self._sendable_spheres is None:
+                self._sendable_spheres = list(self.multiworld._iterate_sendable_spheres())
+        return self._sendable_spheres
 
 
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class SupportsCopy(Protocol):
+    def copy(self) -> Any: ...
+
+
+ContainerType = TypeVar("ContainerType", bound=SupportsCopy)
+
+
+class SharedContainer(Generic[ContainerType]):
+    """A per-player container lent by a SharedPlayerContainers to its copies, which must not be modified."""
+    __slots__ = ("container", "pending")
+
+    container: ContainerType
+    pending: int
+    """Number of copies that share the container and have yet to copy it"""
+
+    def __init__(self, container: ContainerType) -> None:
+        self.container = container
+        self.pending = 0
+
+
+class SharedPlayerContainers(Dict[int, ContainerType]):
+    """
+    A mapping of player to a per-player container of CollectionState, such as a Counter or a set, that shares its
+    containers with copies of it, so copying a CollectionState doesn't copy the data of players that aren't accessed.
+    The first access to a player copies the shared container, reads included, as reads and writes can't be told apart.
+    The mapping a container was lent from takes back the same container instead, so references to it stay valid, but
+    must not be used to modify it after a copy until the player was accessed through the mapping again.
+    """
+    __slots__ = ("lent", "shared")
+
+    lent: Dict[int, SharedContainer[ContainerType]]
+    """Containers of this instance that copies may still share"""
+    shared: Dict[int, SharedContainer[ContainerType]]
+    """Containers of another instance that this instance has yet to copy"""
+
+    def __init__(self, containers: Optional[Mapping[int, ContainerType]] = None) -> None:
+        super().__init__(containers or ())
+        self.lent = {}
+        self.shared = {}
+
+    def __del__(self) -> None:
+        for shared in self.shared.values():
+            shared.pending -= 1
+
+    def __missing__(self, player: int) -> ContainerType:
+        shared = self.lent.pop(player, None)
+        if shared is not None:
+            container = shared.container
+            if shared.pending:
+                # keep the containers of the copies as they were
+                shared.container = container.copy()
+        else:
+            shared = self.shared.pop(player)
+            container = shared.container.copy()
+            shared.pending -= 1
+        dict.__setitem__(self, player, container)
+        if not self.lent and not self.shared:
+            # restore the order of players, which was changed by taking them back one by one
+            players = sorted(dict.items(self))
+            dict.clear(self)
+            dict.update(self, players)
+        return container
+
+    @classmethod
+    def share(cls, containers: Dict[int, ContainerType]
+              ) -> Tuple[SharedPlayerContainers[ContainerType], SharedPlayerContainers[ContainerType]]:
+        """
+        Shares all containers of the given mapping with a new instance.
+
+        :return: the mapping to use in place of the given one, and the new instance.
+        """
+        if not isinstance(containers, cls):
+            containers = cls(containers)
+        for player in list(dict.keys(containers)):
+            containers.lent[player] = SharedContainer(dict.pop(containers, player))
+        copy: SharedPlayerContainers[ContainerType] = cls()
+        for shared_containers in (containers.lent, containers.shared):
+            for player, shared in shared_containers.items():
+                shared.pending += 1
+                copy.shared[player] = shared
+        return containers, copy
+
+    def _release(self, player: int) -> None:
+        self.lent.pop(player, None)
+        shared = self.shared.pop(player, None)
+        if shared is not None:
+            shared.pending -= 1
+
+    def _materialize(self) -> None:
+        for player in [*self.lent, *self.shared]:
+            self[player]
+
+    def __setitem__(self, player: int, container: ContainerType) -> None:
+        self._release(player)
+        dict.__setitem__(self, player, container)
+
+    def __delitem__(self, player: int) -> None:
+        if player in self:
+            self._release(player)
+            dict.pop(self, player, None)
+        else:
+            raise KeyError(player)
+
+    def __contains__(self, player: object) -> bool:
+        return dict.__contains__(self, player) or player in self.lent or player in self.shared
+
+    def __iter__(self) -> Iterator[int]:
+        self._materialize()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self.lent) + len(self.shared)
+
+    def __eq__(self, other: object) -> bool:
+        self._materialize()
+        if isinstance(other, SharedPlayerContainers):
+            other._materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        self._materialize()
+        return dict.__repr__(self)
+
+    def get(self, player: int, default: Any = None) -> Any:
+        return self[player] if player in self else default
+
+    def keys(self):  # type: ignore[override]
+        self._materialize()
+        return dict.keys(self)
+
+    def values(self):  # type: ignore[override]
+        self._materialize()
+        return dict.values(self)
+
+    def items(self):  # type: ignore[override]
+        self._materialize()
+        return dict.items(self)
+
+    def copy(self) -> Dict[int, ContainerType]:  # type: ignore[override]
+        self._materialize()
+        return dict.copy(self)
+
+    def pop(self, player: int, *default: Any) -> Any:
+        if player in self:
+            container = self[player]
+            del self[player]
+            return container
+        return dict.pop(self, player, *default)
+
+    def setdefault(self, player: int, default: Any = None) -> Any:
+        if player not in self:
+            dict.__setitem__(self, player, default)
+        return self[player]
+
+    def __reduce__(self) -> Any:
+        self._materialize()
+        return self.__class__, (dict(dict.items(self)),)
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -728,17 +962,19 @@ class CollectionState():
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     """Internal cache for Advancement Locations already checked by this CollectionState. Not for use in logic."""
-    stale: Dict[int, bool]
+    stale: Dict[int, Union[bool, Set[str]]]
+    """Whether a player's reachable regions have to be updated. Worlds may store the set of item names collected since
+    the last update instead of True, in which case only the blocked connections depending on them are checked again."""
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = SharedPlayerContainers({player: Counter() for player in parent.get_all_ids()})
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.reachable_regions = SharedPlayerContainers({player: set() for player in parent.get_all_ids()})
+        self.blocked_connections = SharedPlayerContainers({player: set() for player in parent.get_all_ids()})
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
@@ -751,17 +987,23 @@ class CollectionState():
                 self.collect(item, True)
 
     def update_reachable_regions(self, player: int):
+        stale = self.stale[player]
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
+            queue = deque(self.blocked_connections[player])
             reachable_regions.add(start)
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
+        elif isinstance(stale, set):
+            # only items were collected since the last update, so only connections depending on them can unblock
+            queue = deque(world.get_connections_to_recheck(self, stale))
+        else:
+            queue = deque(self.blocked_connections[player])
 
         if world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
@@ -769,10 +1011,12 @@ class CollectionState():
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque[Entrance]):
-        reachable_regions = self.reachable_regions[player]
-        blocked_connections = self.blocked_connections[player]
         # run BFS on all connections, and keep track of those blocked by missing items
         while queue:
+            # the containers are looked up again after running access rules, because copying this state lends them to
+            # the copy, see SharedPlayerContainers
+            reachable_regions = self.reachable_regions[player]
+            blocked_connections = self.blocked_connections[player]
             connection = queue.popleft()
             new_region = connection.connected_region
             if new_region in reachable_regions:
@@ -781,6 +1025,8 @@ class CollectionState():
                 if self.allow_partial_entrances and not new_region:
                     continue
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                reachable_regions = self.reachable_regions[player]
+                blocked_connections = self.blocked_connections[player]
                 reachable_regions.add(new_region)
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
@@ -796,13 +1042,15 @@ class CollectionState():
                     queue.extend(relevant_entrances)
 
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance]):
-        reachable_regions = self.reachable_regions[player]
-        blocked_connections = self.blocked_connections[player]
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
             new_connection = False
             while queue:
+                # the containers are looked up again after running access rules, because copying this state lends them
+                # to the copy, see SharedPlayerContainers
+                reachable_regions = self.reachable_regions[player]
+                blocked_connections = self.blocked_connections[player]
                 connection = queue.popleft()
                 new_region = connection.connected_region
                 if new_region in reachable_regions:
@@ -811,6 +1059,8 @@ class CollectionState():
                     if self.allow_partial_entrances and not new_region:
                         continue
                     assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                    reachable_regions = self.reachable_regions[player]
+                    blocked_connections = self.blocked_connections[player]
                     reachable_regions.add(new_region)
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
@@ -819,19 +1069,23 @@ class CollectionState():
                     new_connection = True
                     self.multiworld.worlds[player].reached_region(self, new_region)
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            queue.extend(self.blocked_connections[player])
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        # skip __init__, all of its containers would be replaced anyway
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        # per-player containers are shared with the copy and only copied once a player is accessed from either side
+        self.prog_items, ret.prog_items = SharedPlayerContainers.share(self.prog_items)
+        self.reachable_regions, ret.reachable_regions = SharedPlayerContainers.share(self.reachable_regions)
+        self.blocked_connections, ret.blocked_connections = SharedPlayerContainers.share(self.blocked_connections)
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
+        ret.stale = {player: True for player in self.stale}
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -987,6 +1241,8 @@ class CollectionState():
         if yield_each_sweep:
             # Return a generator that will yield at the end of each sweep iteration.
             return self._sweep_for_advancements_impl(advancements_per_player, True)
+        elif self.multiworld.sweep_pool and self.multiworld.sweep_pool.sweep(self, advancements_per_player):
+            return None
         else:
             # Create the generator, but tell it not to yield anything, so it will run to completion in zero iterations
             # once started, then start and exhaust the generator by attempting to iterate it.
@@ -1121,7 +1377,8 @@ class CollectionState():
 
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
-        self.stale[item.player] = True
+        if not isinstance(self.stale[item.player], set):
+            self.stale[item.player] = True
 
         if changed and not prevent_sweep:
             self.sweep_for_advancements()
@@ -1710,12 +1967,14 @@ class Spoiler:
         state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        for sphere in multiworld.get_spheres():
+            if not sphere:
+                break
+            sphere &= sphere_candidates
+            if not sphere:
+                continue
 
             for location in sphere:
                 state.collect(location.item, True, location)
@@ -1727,17 +1986,19 @@ class Spoiler:
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
                           len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if not multiworld.has_beaten_game(state):
-                    raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
-                                       "Something went terribly wrong here. "
-                                       f"Unreachable progression items: {sphere_candidates}")
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+
+        if sphere_candidates:
+            collection_spheres.append(set())
+            state_cache.append(state.copy())
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if not multiworld.has_beaten_game(state):
+                raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
+                                   "Something went terribly wrong here. "
+                                   f"Unreachable progression items: {sphere_candidates}")
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
@@ -22,8 +22,10 @@ if __name__ == "__main__":
     Utils.init_logging("TextClient", exception_logger="Client")
 
 from MultiServer import CommandProcessor, mark_raw
+import NetUtils
 from NetUtils import (Endpoint, decode, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission, NetworkSlot,
-                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType)
+                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType,
+                      decode_binary)
 from Utils import gui_enabled, Version, stream_input, async_start
 from worlds import network_data_package, AutoWorldRegister
 import os
@@ -307,6 +309,8 @@ class CommonContext:
     server: typing.Optional[Endpoint] = None
     server_version: Version = Version(0, 0, 0)
     generator_version: Version = Version(0, 0, 0)
+    server_encodings: typing.List[str] = []
+    """encodings besides JSON the server offered in RoomInfo"""
     current_energy_link_value: typing.Optional[int] = None  # to display in UI, gets set by server
     max_size: int = 16*1024*1024  # 16 MB of max incoming packet size
 
@@ -461,6 +465,7 @@ class CommonContext:
         self.locations_info = {}
         self.server_version = Version(0, 0, 0)
         self.generator_version = Version(0, 0, 0)
+        self.server_encodings = []
         self.server = None
         self.server_task = None
         self.hint_cost = None
@@ -522,6 +527,9 @@ class CommonContext:
             'tags': self.tags, 'items_handling': self.items_handling,
             'uuid': Utils.get_unique_identifier(), 'game': self.game, "slot_data": self.want_slot_data,
         }
+        if NetUtils.msgpack and NetUtils.binary_encoding in self.server_encodings:
+            # the server then sends some packets, like ReceivedItems, in the faster binary encoding
+            payload["encoding"] = NetUtils.binary_encoding
         if kwargs:
             payload.update(kwargs)
         await self.send_msgs([payload])
@@ -880,7 +888,7 @@ async def server_loop(ctx: CommonContext, address: typing.Optional[str] = None)
         ctx.current_reconnect_delay = ctx.starting_reconnect_delay
         ctx.disconnected_intentionally = False
         async for data in ctx.server.socket:
-            for msg in decode(data):
+            for msg in decode_binary(data) if isinstance(data, bytes) else decode(data):
                 await process_server_cmd(ctx, msg)
         logger.warning(f"Disconnected from multiworld server{reconnect_hint()}")
     except websockets.InvalidMessage:
@@ -946,6 +954,7 @@ async def process_server_cmd(ctx: CommonContext, args: dict):
             if args['password']:
                 logger.info('Password required')
             ctx.update_permissions(args.get("permissions", {}))
+            ctx.server_encodings = args.get("encodings", [])
             logger.info(
                 f"A !hint costs {args['hint_cost']}% of your total location count as points"
                 f" and you get {args['location_check_points']}"
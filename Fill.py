@@ -1,4 +1,5 @@
 import collections
+import heapq
 import itertools
 import logging
 import typing
@@ -24,6 +25,85 @@ def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
     logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed.")
 
 
+class _CandidateLocations:
+    """
+    Index over the locations of a fill_restrictive call, bucketed by player, by whether a location is excluded and by
+    the locality rule it has from worlds.generic.Rules.locality_rules.
+
+    Locations that use the default always_allow and can_fill are skipped without evaluating any rules if they are
+    excluded and the item is progression or useful, or if their locality rule forbids the item. Candidates are still
+    checked in the order of the original list, so the same location is picked as with a linear scan of it.
+
+    Reachability is not indexed. The maximum exploration state is swept again for every placement and swaps put items
+    back into it, so a location found unreachable for one item may be reachable for the next.
+    """
+    BucketKey = typing.Tuple[int, bool, typing.Optional[typing.Callable[[Item], bool]]]
+    """player, whether the location can be skipped for progression and useful items, and its locality rule"""
+
+    locations: typing.List[Location]
+    positions: typing.Dict[Location, int]
+    buckets: typing.Dict[BucketKey, typing.List[Location]]
+    bucket_keys: typing.Dict[Location, BucketKey]
+    locality_blockers: typing.Dict[typing.Callable[[Item], bool], typing.Dict[int, typing.Set[str]]]
+    skipped_buckets: typing.Dict[typing.Tuple[int, str, bool, typing.Optional[int]], typing.FrozenSet[BucketKey]]
+
+    def __init__(self, multiworld: MultiWorld, locations: typing.List[Location]) -> None:
+        self.locations = locations
+        self.positions = {}
+        self.buckets = {}
+        self.bucket_keys = {}
+        self.locality_blockers = multiworld.locality_item_rules
+        self.skipped_buckets = {}
+        for position, location in enumerate(locations):
+            key: _CandidateLocations.BucketKey
+            if location.always_allow is Location.always_allow and type(location).can_fill is Location.can_fill:
+                key = (location.player, location.progress_type == LocationProgressType.EXCLUDED,
+                       location.item_rule if location.item_rule in self.locality_blockers else None)
+            else:
+                key = (location.player, False, None)
+            self.positions[location] = position
+            self.bucket_keys[location] = key
+            self.buckets.setdefault(key, []).append(location)
+
+    def _skipped_buckets(self, item: Item, player: typing.Optional[int]) -> typing.FrozenSet[BucketKey]:
+        cache_key = (item.player, item.name, item.advancement or item.useful, player)
+        skipped = self.skipped_buckets.get(cache_key)
+        if skipped is None:
+            skipped = self.skipped_buckets[cache_key] = frozenset(
+                key for key in self.buckets
+                if (player is not None and key[0] != player)
+                or (key[1] and cache_key[2])
+                or (key[2] and item.name in self.locality_blockers[key[2]].get(item.player, ())))
+        return skipped
+
+    def candidates(self, item: Item, player: typing.Optional[int] = None) -> typing.Iterator[Location]:
+        """Yields the locations that might accept item in order, only of the given player if one is given."""
+        skipped = self._skipped_buckets(item, player)
+        if not skipped:
+            yield from self.locations
+        elif len(self.buckets) - len(skipped) <= 4:
+            # few buckets are left, such as for single player placement or local items, so only walk those
+            yield from heapq.merge(*(bucket for key, bucket in self.buckets.items() if key not in skipped),
+                                   key=self.positions.__getitem__)
+        else:
+            bucket_keys = self.bucket_keys
+            for location in self.locations:
+                if bucket_keys[location] not in skipped:
+                    yield location
+
+    def pop_fillable(self, state: CollectionState, item: Item, check_access: bool,
+                     player: typing.Optional[int] = None) -> typing.Optional[Location]:
+        """Finds the first location that can be filled with item, then removes it from the index and the location list."""
+        for location in self.candidates(item, player):
+            if location.can_fill(state, item, check_access):
+                break
+        else:
+            return None
+        self.buckets[self.bucket_keys[location]].remove(location)
+        self.locations.remove(location)
+        return location
+
+
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
                     locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
     new_state = base_state.copy()
@@ -59,6 +139,14 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
+    # `base_state` with every item that is still to be placed collected, kept up to date as items leave and re-enter
+    # the pool, so each iteration only has to sweep a copy of it instead of collecting the whole pool again.
+    pool_state = base_state.copy()
+    for item in item_pool:
+        pool_state.collect(item, True)
+
+    candidate_locations = _CandidateLocations(multiworld, locations)
+
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
@@ -81,22 +169,22 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                 if pool_item is item:
                     del item_pool[-p]
                     break
+            pool_state.remove(item)
 
         maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+            pool_state, (), multiworld.get_filled_locations(item.player) if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
             if not locations:
+                for unplaced_item in items_to_place:
+                    pool_state.collect(unplaced_item, True)
                 unplaced_items += items_to_place
                 break
             item_to_place = items_to_place.pop(0)
 
-            spot_to_fill: typing.Optional[Location] = None
-
             # if minimal accessibility, only check whether location is reachable if game not beatable
             if multiworld.worlds[item_to_place.player].options.accessibility == Accessibility.option_minimal:
                 perform_access_check = not multiworld.has_beaten_game(maximum_exploration_state,
@@ -105,15 +193,10 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
-            else:
+            spot_to_fill: typing.Optional[Location] = candidate_locations.pop_fillable(
+                maximum_exploration_state, item_to_place, perform_access_check,
+                item_to_place.player if single_player_placement else None)
+            if spot_to_fill is None:
                 # we filled all reachable spots.
                 if swap:
                     # Keep a cache of previous safe swap states that might be usable to sweep from to produce the next
@@ -180,6 +263,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             reachable_items[placed_item.player].appendleft(
                                 placed_item)
                             item_pool.append(placed_item)
+                            pool_state.collect(placed_item, True)
 
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
@@ -193,9 +277,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
+                        pool_state.collect(item_to_place, True)
                         continue
                 else:
                     unplaced_items.append(item_to_place)
+                    pool_state.collect(item_to_place, True)
                     continue
             multiworld.push_item(spot_to_fill, item_to_place, False)
             spot_to_fill.locked = lock
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import bisect
 import collections
 import contextlib
 import copy
@@ -10,12 +11,16 @@ import functools
 import hashlib
 import inspect
 import itertools
+import json
 import logging
 import math
 import operator
+import os
 import pickle
 import random
+import re
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -44,7 +49,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+    SlotType, LocationStore, MultiData, Hint, HintStatus, decode_binary, encode_binary, is_binary_packet
 from BaseClasses import ItemClassification
 
 
@@ -134,6 +139,28 @@ modify_functions = {
 }
 
 
+# encoded game data for DataPackage messages by checksum, shared by all rooms of a WebHost process,
+# least recently used first and bounded, as rooms of custom worlds keep bringing new checksums
+encoded_game_packages: typing.OrderedDict[str, str] = collections.OrderedDict()
+encoded_game_packages_lock = threading.Lock()
+max_encoded_game_packages = 256
+
+
+def get_encoded_game_package(checksum: str, game_package: typing.Dict[str, typing.Any]) -> str:
+    """Returns the encoded game_package, from the cache if it was encoded before."""
+    with encoded_game_packages_lock:
+        encoded_game = encoded_game_packages.get(checksum)
+        if encoded_game is not None:
+            encoded_game_packages.move_to_end(checksum)
+            return encoded_game
+    encoded_game = encode(game_package)
+    with encoded_game_packages_lock:
+        encoded_game_packages[checksum] = encoded_game
+        while len(encoded_game_packages) > max_encoded_game_packages:
+            encoded_game_packages.popitem(last=False)
+    return encoded_game
+
+
 def get_saving_second(seed_name: str, interval: int = 60) -> int:
     # save at expected times so other systems using savegame can expect it
     # represents the target second of the auto_save_interval at which to save
@@ -156,6 +183,7 @@ class Client(Endpoint):
         "no_items",
         "no_locations",
         "no_text",
+        "binary",
     )
 
     version: Version
@@ -171,6 +199,8 @@ class Client(Endpoint):
     no_items: bool
     no_locations: bool
     no_text: bool
+    binary: bool
+    """whether the client asked for packets in NetUtils' binary encoding where possible"""
 
     def __init__(self, socket: "ServerConnection", ctx: Context) -> None:
         super().__init__(socket)
@@ -187,6 +217,7 @@ class Client(Endpoint):
         self.no_items = False
         self.no_locations = False
         self.no_text = False
+        self.binary = False
 
     @property
     def items_handling(self):
@@ -213,6 +244,285 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class SaveJournal:
+    """
+    Append-only journal of changes to the save data of a Context, written next to its full save file.
+
+    Each entry only holds the parts of the save that changed since the previous entry, so writing one scales with the
+    activity since the last save instead of the size of the multiworld. Entries are tagged with the generation of the
+    full save they apply to; compacting writes a new full save with the next generation, outdating all entries.
+    Marks are made on the event loop and collected by the saving thread, so they are swapped out under a lock.
+
+    WebHost rooms do not use the journal, see WebHostContext._save.
+    """
+    # sections of the save data with immutable values, compared against the last written value to find changes
+    value_sections: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "hints_used", "name_aliases", "client_game_state", "client_activity_timers", "client_connection_timers")
+    # value sections holding datetimes, which are written as timestamps
+    timer_sections: typing.ClassVar[typing.Tuple[str, ...]] = ("client_activity_timers", "client_connection_timers")
+    # sections with mutable values, which are only written if they were marked as changed
+    marked_sections: typing.ClassVar[typing.Tuple[str, ...]] = ("hints", "stored_data")
+    header = struct.Struct("<I")  # length of an entry
+
+    generation: int
+    """generation of the full save the journal applies to"""
+    size: int
+    """bytes in the journal file, compaction happens once it outgrows the full save"""
+    snapshot_size: int
+    """bytes in the full save, 0 if none was written for this generation yet"""
+    marked: typing.Dict[str, typing.Set[typing.Hashable]]
+    marked_lock: threading.Lock
+    written: typing.Dict[str, typing.Dict[typing.Hashable, typing.Any]]
+
+    def __init__(self) -> None:
+        self.generation = 0
+        self.size = 0
+        self.snapshot_size = 0
+        self.marked = {section: set() for section in self.marked_sections}
+        self.marked_lock = threading.Lock()
+        self.written = {}
+
+    def mark(self, section: str, key: typing.Hashable) -> None:
+        """Mark the value of key in a section of marked_sections as changed."""
+        with self.marked_lock:
+            self.marked[section].add(key)
+
+    def take_marked(self) -> typing.Dict[str, typing.Set[typing.Hashable]]:
+        """Returns the keys marked since the last call or reset and starts new sets for further marks."""
+        with self.marked_lock:
+            marked, self.marked = self.marked, {section: set() for section in self.marked_sections}
+        return marked
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.size >= self.snapshot_size
+
+    def reset(self, ctx: Context) -> None:
+        """Remember the current state of ctx as written, call before writing a full save."""
+        self.take_marked()
+        for section in self.value_sections:
+            self.written[section] = dict(getattr(ctx, section))
+        self.written["received_items"] = {key: len(items) for key, items in tuple(ctx.received_items.items())}
+        self.written["location_checks"] = {key: len(checks) for key, checks in tuple(ctx.location_checks.items())}
+        self.written["other"] = self.get_other(ctx)
+
+    @staticmethod
+    def get_other(ctx: Context) -> typing.Dict[str, typing.Any]:
+        return {
+            "random_state": ctx.random.getstate(),
+            "group_collected": {group: set(players) for group, players in tuple(ctx.group_collected.items())},
+            "game_options": {name: getattr(ctx, name) for name in ctx.simple_options},
+        }
+
+    def collect(self, ctx: Context) -> typing.Dict[str, typing.Any]:
+        """Returns an entry with the changes since the last call or reset, empty if nothing changed."""
+        entry: typing.Dict[str, typing.Any] = {}
+        for section in self.value_sections:
+            current = tuple(getattr(ctx, section).items())
+            written = self.written[section]
+            changes = {key: value for key, value in current if key not in written or written[key] != value}
+            deleted = written.keys() - {key for key, _ in current}
+            written.update(changes)
+            for key in deleted:
+                del written[key]
+            if section in self.timer_sections:
+                changes = {key: value.timestamp() for key, value in changes.items()}
+            if changes or deleted:
+                entry[section] = changes, deleted
+        for section, marked in self.take_marked().items():
+            if marked:
+                current = getattr(ctx, section)
+                changes = {key: copy.copy(current[key]) for key in marked if key in current}
+                entry[section] = changes, marked - changes.keys()
+
+        received_items = {}
+        written = self.written["received_items"]
+        for key, items in tuple(ctx.received_items.items()):
+            start = written.get(key, 0)
+            if len(items) != start:
+                received_items[key] = start, items[start:]
+                written[key] = len(items)
+        if received_items:
+            entry["received_items"] = received_items
+
+        location_checks = {}
+        written = self.written["location_checks"]
+        for key, checks in tuple(ctx.location_checks.items()):
+            if len(checks) != written.get(key, 0):
+                location_checks[key] = set(checks)
+                written[key] = len(checks)
+        if location_checks:
+            entry["location_checks"] = location_checks
+
+        for name, value in self.get_other(ctx).items():
+            if self.written["other"][name] != value:
+                entry[name] = self.written["other"][name] = value
+
+        return entry
+
+    @staticmethod
+    def apply(ctx: Context, entry: typing.Dict[str, typing.Any]) -> None:
+        """Applies a journal entry on top of the current state of ctx. Applying an entry twice has no further effect."""
+        for section in SaveJournal.value_sections + SaveJournal.marked_sections:
+            if section in entry:
+                changes, deleted = entry[section]
+                if section in SaveJournal.timer_sections:
+                    changes = {key: datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+                               for key, value in changes.items()}
+                container = getattr(ctx, section)
+                container.update(changes)
+                for key in deleted:
+                    container.pop(key, None)
+        if "hints" in entry:
+            ctx.hint_index = None  # rebuilt on first use
+        for key, (start, items) in entry.get("received_items", {}).items():
+            ctx.received_items.setdefault(key, [])[start:] = items
+        for key, checks in entry.get("location_checks", {}).items():
+            ctx.location_checks[key] |= checks
+        if "random_state" in entry:
+            ctx.random.setstate(entry["random_state"])
+        if "group_collected" in entry:
+            ctx.group_collected = entry["group_collected"]
+        for name, value in entry.get("game_options", {}).items():
+            setattr(ctx, name, value)
+
+    def encode(self, entry: typing.Dict[str, typing.Any]) -> bytes:
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        data = zlib.compress(pickle.dumps((self.generation, entry)))
+        return self.header.pack(len(data)) + data
+
+    def replay(self, ctx: Context, filename: str) -> int:
+        """
+        Applies all entries of the current generation in the journal file to ctx and returns how many were applied.
+        An incomplete entry at the end, as left behind by a crash while writing it, is cut off.
+        """
+        try:
+            with open(filename, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.size = 0
+            return 0
+        applied = 0
+        position = 0
+        while position + self.header.size <= len(data):
+            length, = self.header.unpack_from(data, position)
+            end = position + self.header.size + length
+            if end > len(data):
+                break
+            try:
+                generation, entry = restricted_loads(zlib.decompress(data[position + self.header.size:end]))
+            except Exception as e:
+                ctx.logger.exception(e)
+                break
+            if generation == self.generation:
+                self.apply(ctx, entry)
+                applied += 1
+            position = end
+        if position != len(data):
+            ctx.logger.warning(f"Discarding {len(data) - position} bytes of incomplete save journal data.")
+            with open(filename, "r+b") as f:
+                f.truncate(position)
+        self.size = position
+        return applied
+
+
+class ServerMetrics:
+    """
+    Timing histograms and traffic counters of a Context, logged as one JSON line per interval while enabled.
+
+    Instrumented code checks Context.metrics first, so disabled metrics only cost that attribute lookup.
+    """
+    # upper bounds of the histogram buckets in seconds, the last bucket holds everything above
+    bucket_bounds: typing.ClassVar[typing.Tuple[float, ...]] = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+    lag_probe_interval: typing.ClassVar[float] = 0.25
+    # commands of process_client_cmd, anything else a client sends is recorded as unknown
+    client_cmds: typing.ClassVar[typing.FrozenSet[str]] = frozenset({
+        "Connect", "ConnectUpdate", "Sync", "LocationChecks", "LocationScouts", "CreateHints", "UpdateHint",
+        "StatusUpdate", "Say", "GetDataPackage", "Bounce", "Get", "Set", "SetNotify"})
+    cmd_pattern: typing.ClassVar[re.Pattern[str]] = re.compile(r'\[\{"cmd":"(\w+)"')
+    # msgpack array and map headers, then the key "cmd" and the header of its string value holding its length
+    binary_cmd_pattern: typing.ClassVar[re.Pattern[bytes]] = re.compile(rb"[\x91-\x9f][\x81-\x8f]\xa3cmd([\xa0-\xbf])")
+
+    interval: float
+    timings: typing.Dict[str, typing.List[float]]
+    """name -> [count, total seconds, max seconds, count per bucket...]"""
+    sent: typing.Dict[str, typing.List[int]]
+    """message type -> [packets, size], each recipient counting separately.
+    The size of text frames is counted in characters, as only websockets encodes them, binary frames in bytes."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.reset()
+
+    def reset(self) -> None:
+        self.timings = {}
+        self.sent = {}
+
+    def record_cmd(self, cmd: typing.Any, duration: float) -> None:
+        self.record(f"cmd {cmd if type(cmd) is str and cmd in self.client_cmds else 'unknown'}", duration)
+
+    def record(self, name: str, duration: float) -> None:
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = [0, 0.0, 0.0] + [0] * (len(self.bucket_bounds) + 1)
+        timing[0] += 1
+        timing[1] += duration
+        if duration > timing[2]:
+            timing[2] = duration
+        timing[3 + bisect.bisect_left(self.bucket_bounds, duration)] += 1
+
+    def record_sent(self, msg: typing.Union[str, bytes], recipients: int = 1) -> None:
+        """Counts an encoded packet by the cmd of its first message."""
+        msg_type = "unknown"
+        if isinstance(msg, bytes):
+            match = self.binary_cmd_pattern.match(msg)
+            if match:
+                msg_type = msg[match.end():match.end() + (match.group(1)[0] & 0x1f)].decode()
+            size = len(msg)
+        else:
+            match = self.cmd_pattern.match(msg)
+            if match:
+                msg_type = match.group(1)
+            size = len(msg)
+        sent = self.sent.get(msg_type)
+        if sent is None:
+            sent = self.sent[msg_type] = [0, 0]
+        sent[0] += recipients
+        sent[1] += size * recipients
+
+    def report(self, ctx: Context) -> typing.Dict[str, typing.Any]:
+        """Returns the metrics since the last report and starts the next interval."""
+        timings, sent = self.timings, self.sent
+        self.reset()
+        return {
+            "endpoints": len(ctx.endpoints),
+            "clients": sum(1 for endpoint in ctx.endpoints if endpoint.auth),
+            "timings": {
+                name: {
+                    "count": timing[0],
+                    "total": round(timing[1], 6),
+                    "max": round(timing[2], 6),
+                    "buckets": timing[3:],
+                } for name, timing in sorted(timings.items())
+            },
+            "bucket_bounds": self.bucket_bounds,
+            "sent": {msg_type: {"packets": packets, "size": size} for msg_type, (packets, size) in sorted(sent.items())},
+        }
+
+    async def run(self, ctx: Context) -> None:
+        """Measures event loop lag and logs a report every interval until the Context exits."""
+        loop = asyncio.get_running_loop()
+        next_report = loop.time() + self.interval
+        while not ctx.exit_event.is_set():
+            expected = loop.time() + self.lag_probe_interval
+            await asyncio.sleep(self.lag_probe_interval)
+            now = loop.time()
+            self.record("event_loop_lag", max(0.0, now - expected))
+            if now >= next_report:
+                next_report = now + self.interval
+                ctx.logger.info(f"Metrics: {json.dumps(self.report(ctx), separators=(',', ':'))}")
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -231,7 +541,7 @@ class Context:
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
     endpoints: list[Client]
     locations: LocationStore  # typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
-    location_checks: typing.Dict[typing.Tuple[int, int], typing.Set[int]]
+    location_checks: typing.Dict[typing.Tuple[int, int], typing.MutableSet[int]]
     hints_used: typing.Dict[typing.Tuple[int, int], int]
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
@@ -266,6 +576,7 @@ class Context:
         self.shutdown_task = None
         self.data_filename = None
         self.save_filename = None
+        self.journal_filename = None
         self.saving = False
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
@@ -278,6 +589,8 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.dirty_item_slots: typing.Set[team_slot] = set()  # slots with received items not sent to clients yet
+        self.new_items_scheduled = False
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -285,6 +598,7 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.hint_index: typing.Optional[typing.Dict[typing.Tuple[int, int, int], typing.Set[Hint]]] = None
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -304,6 +618,8 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        self.save_journal = SaveJournal()
+        self.metrics: typing.Optional[ServerMetrics] = None
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -344,9 +660,9 @@ class Context:
             self.non_hintable_names[world_name] = world.hint_blacklist
 
         for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            # remove groups from data sent to clients, if an earlier Context in this process did not already
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -378,7 +694,11 @@ class Context:
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
+        if getattr(endpoint, "binary", False):
+            msgs = list(msgs)
+            msg = self.dump_binary(msgs) if is_binary_packet(msgs) else self.dumper(msgs)
+        else:
+            msg = self.dumper(msgs)
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -386,6 +706,8 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            if self.metrics:
+                self.metrics.record_sent(msg)
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -400,11 +722,14 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            if self.metrics:
+                self.metrics.record_sent(msg)
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
 
-    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint],
+                                          msg: typing.Union[str, bytes]) -> bool:
         sockets = []
         for endpoint in endpoints:
             if endpoint.socket and endpoint.socket.open:
@@ -415,37 +740,86 @@ class Context:
             self.logger.exception("Exception during broadcast_send_encoded_msgs")
             return False
         else:
+            if self.metrics:
+                self.metrics.record_sent(msg, len(sockets))
             if self.log_network:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
 
+    def encode_data_package(self, game_names: typing.Iterable[str]) -> str:
+        """Returns the encoded DataPackage message for game_names. Splices together the encoded data of each game,
+        which is cached by checksum, so each data package only gets encoded once."""
+        if self.dumper is not encode:
+            return self.dumper([{"cmd": "DataPackage",
+                                 "data": {"games": {name: self.gamespackage[name] for name in game_names}}}])
+        parts: typing.List[str] = ['[{"cmd":"DataPackage","data":{"games":{']
+        for name in game_names:
+            game_package = self.gamespackage[name]
+            checksum = game_package.get("checksum")
+            encoded_game = get_encoded_game_package(checksum, game_package) if checksum else encode(game_package)
+            # no concatenation of the big strings besides the final join
+            parts += (encode(name), ":", encoded_game, ",")
+        if len(parts) > 1:
+            parts.pop()  # trailing comma
+        parts.append("}}}]")
+        return "".join(parts)
+
+    def dump_binary(self, msgs: typing.List[dict]) -> typing.Union[bytes, str]:
+        """Encodes msgs with encode_binary, or with the dumper if they hold values msgpack can't encode,
+        which binary clients read just the same."""
+        try:
+            return encode_binary(msgs)
+        except (TypeError, ValueError, OverflowError):
+            self.logger.debug("Could not encode messages as binary, sending them as JSON.", exc_info=True)
+            return self.dumper(msgs)
+
+    def _broadcast_msgs(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]) -> None:
+        """Encodes msgs once per encoding used by endpoints and sends them."""
+        if not is_binary_packet(msgs):
+            async_start(self.broadcast_send_encoded_msgs(endpoints, self.dumper(msgs)))
+            return
+        text_endpoints: typing.List[Client] = []
+        binary_endpoints: typing.List[Client] = []
+        for endpoint in endpoints:
+            (binary_endpoints if endpoint.binary else text_endpoints).append(endpoint)
+        if text_endpoints:
+            async_start(self.broadcast_send_encoded_msgs(text_endpoints, self.dumper(msgs)))
+        if binary_endpoints:
+            async_start(self.broadcast_send_encoded_msgs(binary_endpoints, self.dump_binary(msgs)))
+
     def broadcast_all(self, msgs: typing.List[dict]):
+        start = time.perf_counter() if self.metrics else 0.0
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self._broadcast_msgs(endpoints, msgs)
+        if self.metrics:
+            self.metrics.record("broadcast_all", time.perf_counter() - start)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
         self.broadcast_all([{**{"cmd": "PrintJSON", "data": [{ "text": text }]}, **additional_arguments}])
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
+        start = time.perf_counter() if self.metrics else 0.0
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self._broadcast_msgs(endpoints, msgs)
+        if self.metrics:
+            self.metrics.record("broadcast_team", time.perf_counter() - start)
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        start = time.perf_counter() if self.metrics else 0.0
+        self._broadcast_msgs(endpoints, msgs)
+        if self.metrics:
+            self.metrics.record("broadcast", time.perf_counter() - start)
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
@@ -486,11 +860,8 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
+        return NetUtils.MultiDataSections(data)
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -536,9 +907,10 @@ class Context:
         self.random.seed(self.seed_name)
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
+        self.location_checks = Utils.KeyedDefaultDict(self._new_location_checks)
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -579,49 +951,98 @@ class Context:
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
 
+    def _new_location_checks(self, key: team_slot) -> typing.MutableSet[int]:
+        try:
+            return self.locations.new_checks(key[1])
+        except KeyError:
+            return set()  # slot without locations in the multidata, like a group
+
     # saving
 
     def save(self, now=False) -> bool:
         if self.saving:
             if now:
                 self.save_dirty = False
-                return self._save()
+                return self._timed_save()
 
             self.save_dirty = True
             return True
 
         return False
 
+    def _timed_save(self) -> bool:
+        if not self.metrics:
+            return self._save()
+        start = time.perf_counter()
+        try:
+            return self._save()
+        finally:
+            self.metrics.record("save", time.perf_counter() - start)
+
     def _save(self, exit_save: bool = False) -> bool:
+        """Appends the changes since the last save to the save journal, or compacts it into a full save if due."""
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            if exit_save or self.save_journal.needs_compaction:
+                self._compact_save()
+            else:
+                entry = self.save_journal.collect(self)
+                if entry:
+                    data = self.save_journal.encode(entry)
+                    with open(self.journal_filename, "ab") as f:
+                        f.write(data)
+                    self.save_journal.size += len(data)
         except Exception as e:
             self.logger.exception(e)
             return False
         else:
             return True
 
+    def _compact_save(self) -> None:
+        """Writes a full save for a new journal generation and empties the save journal."""
+        journal = self.save_journal
+        journal.generation += 1
+        # changes made while the full save is created end up in both it and the next journal entry
+        journal.reset(self)
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        encoded_save = zlib.compress(pickle.dumps(self.get_save()))
+        temp_filename = self.save_filename + ".tmp"
+        with open(temp_filename, "wb") as f:
+            f.write(encoded_save)
+        os.replace(temp_filename, self.save_filename)
+        journal.snapshot_size = len(encoded_save)
+        with open(self.journal_filename, "wb"):
+            pass
+        journal.size = 0
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            if not self.journal_filename:
+                self.journal_filename = self.save_filename + ".journal"
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    data = f.read()
+                self.set_save(restricted_loads(zlib.decompress(data)))
+                self.save_journal.snapshot_size = len(data)
+                applied = self.save_journal.replay(self, self.journal_filename)
+                if applied:
+                    self.logger.info(f"Replayed {applied} save journal entries.")
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
+            self.save_journal.reset(self)
             self._start_async_saving()
 
+    def start_metrics(self, interval: float) -> None:
+        """Starts recording metrics of this server, which get logged every interval seconds."""
+        self.metrics = ServerMetrics(interval)
+        async_start(self.metrics.run(self), name="metrics")
+
     def _start_async_saving(self, atexit_save: bool = True):
         if not self.auto_saver_thread:
             def save_regularly():
@@ -637,7 +1058,7 @@ class Context:
                         time.sleep(max(1.0, next_wakeup))
                         if self.save_dirty:
                             self.logger.debug("Saving via thread.")
-                            self._save()
+                            self._timed_save()
                     except OperationalError as e:
                         self.logger.exception(e)
                         self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
@@ -654,14 +1075,14 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
             "version": self.save_version,
+            "journal_generation": self.save_journal.generation,
             "connect_names": self.connect_names,
             "received_items": self.received_items,
             "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
+            "location_checks": {key: set(checks) for key, checks in self.location_checks.items()},
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -687,9 +1108,11 @@ class Context:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
             raise Exception("This savegame is newer than the server.")
+        self.save_journal.generation = savedata.get("journal_generation", 0)
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.hint_index = None  # rebuilt on first use
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -699,7 +1122,8 @@ class Context:
         self.client_activity_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
-        self.location_checks.update(savedata["location_checks"])
+        for key, checks in savedata["location_checks"].items():
+            self.location_checks[key] |= checks
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -756,9 +1180,43 @@ class Context:
             self.hints[hint_team, hint_slot] = new_hints
 
     def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
+        self.get_hint_index()  # hints are kept up to date once the index exists
         return self.hints[team, slot]
 
+    def get_hint_index(self) -> typing.Dict[typing.Tuple[int, int, int], typing.Set[Hint]]:
+        """Returns the hints that are not found yet by team, finding player and location.
+        If the index does not exist yet, e.g. after loading a save, all hints are rechecked to build it."""
+        if self.hint_index is None:
+            self.recheck_hints()
+            self.hint_index = {}
+            for (team, _), hints in self.hints.items():
+                for hint in hints:
+                    self.index_hint(team, hint)
+        return self.hint_index
+
+    def index_hint(self, team: int, hint: Hint) -> None:
+        """Adds a new hint to the hint index, so check_hints can find it."""
+        if self.hint_index is not None and not hint.found:
+            self.hint_index.setdefault((team, hint.finding_player, hint.location), set()).add(hint)
+
+    def check_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                    changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Marks the hints for newly checked locations of team/slot as found. Only has to look at the hints for these
+        locations, unlike recheck_hints. If a set is passed for 'changed', each (team,slot) pair that has at least one
+        hint modified will be added to the set.
+        """
+        hint_index = self.get_hint_index()
+        for location in locations:
+            # the index may also hold hints that have been replaced since, replace_hint ignores those
+            for hint in hint_index.pop((team, slot, location), ()):
+                new_hint = hint.re_check(self, team)
+                if hint == new_hint:
+                    continue
+                for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
+                    if changed is not None:
+                        changed.add((team, player))
+                    self.replace_hint(team, player, hint, new_hint)
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
@@ -825,6 +1283,7 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.index_hint(team, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
@@ -852,6 +1311,7 @@ class Context:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.index_hint(team, new_hint)
     
     # "events"
 
@@ -873,6 +1333,7 @@ class Context:
         }])
 
     def on_changed_hints(self, team: int, slot: int):
+        self.save_journal.mark("hints", (team, slot))
         key: str = f"_read_hints_{team}_{slot}"
         targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
         if targets:
@@ -907,8 +1368,16 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
         async for data in websocket:
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
-            for msg in decode(data):
-                await process_client_cmd(ctx, client, msg)
+            for msg in decode_binary(data) if isinstance(data, bytes) else decode(data):
+                if ctx.metrics:
+                    # read before processing, some commands turn the message into their reply
+                    cmd = msg.get("cmd") if isinstance(msg, dict) else None
+                    start = time.perf_counter()
+                    await process_client_cmd(ctx, client, msg)
+                    # includes waiting on sends to a slow client, as that holds up its following commands as well
+                    ctx.metrics.record_cmd(cmd, time.perf_counter() - start)
+                else:
+                    await process_client_cmd(ctx, client, msg)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
             ctx.logger.exception(e)
@@ -937,6 +1406,7 @@ async def on_client_connected(ctx: Context, client: Client):
                                   in ctx.gamespackage.items() if game in games and "checksum" in game_data},
         'seed_name': ctx.seed_name,
         'time': time.time(),
+        'encodings': [NetUtils.binary_encoding] if NetUtils.msgpack else [],
     }])
 
 
@@ -1068,20 +1538,32 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Sends new items of the slots in ctx.dirty_item_slots to their clients at the end of the current event loop tick,
+    so items of all checks within the tick are sent as one ReceivedItems per client."""
+    if ctx.dirty_item_slots and not ctx.new_items_scheduled:
+        ctx.new_items_scheduled = True
+        asyncio.get_running_loop().call_soon(flush_new_items, ctx)
+
+
+def flush_new_items(ctx: Context):
+    start = time.perf_counter() if ctx.metrics else 0.0
+    ctx.new_items_scheduled = False
+    dirty_item_slots, ctx.dirty_item_slots = ctx.dirty_item_slots, set()
+    for team, slot in dirty_item_slots:
+        for client in ctx.clients[team].get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
+    if ctx.metrics:
+        ctx.metrics.record("send_new_items", time.perf_counter() - start)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1089,13 +1571,34 @@ def update_checked_locations(ctx: Context, team: int, slot: int):
                   [{"cmd": "RoomUpdate", "checked_locations": get_checked_checks(ctx, team, slot)}])
 
 
+def log_bulk_send(ctx: Context, team: int, slot: int, event: str, sends: typing.List[typing.Tuple[int, int, int, int]]):
+    """Log the (finding player, receiving player, item, location) sends of a release or collect as one record,
+    with one record per item at debug level."""
+    if not sends:
+        return
+    received: typing.Counter[int] = collections.Counter(target_player for _, target_player, _, _ in sends)
+    ctx.logger.info("(Team #%d) %s of %s sent %d items: %s", team + 1, event, ctx.player_names[(team, slot)],
+                    len(sends), ", ".join(f"{count} to {ctx.player_names[(team, target_player)]}"
+                                          for target_player, count in received.most_common()),
+                    extra={"bulk_send": {"type": event, "team": team, "slot": slot, "items": len(sends),
+                                         "receivers": dict(received)}})
+    if ctx.logger.isEnabledFor(logging.DEBUG):
+        for source_player, target_player, item_id, location in sends:
+            ctx.logger.debug('(Team #%d) %s sent %s to %s (%s)' % (
+                team + 1, ctx.player_names[(team, source_player)],
+                ctx.item_names[ctx.slot_info[target_player].game][item_id],
+                ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[source_player].game][location]))
+
+
 def release_player(ctx: Context, team: int, slot: int):
     """register any locations that are in the multidata"""
     all_locations = set(ctx.locations[slot])
     ctx.broadcast_text_all("%s (Team #%d) has released all remaining items from their world."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Release", "team": team, "slot": slot})
-    register_location_checks(ctx, team, slot, all_locations)
+    sends: typing.List[typing.Tuple[int, int, int, int]] = []
+    register_location_checks(ctx, team, slot, all_locations, sends=sends)
+    log_bulk_send(ctx, team, slot, "Release", sends)
     update_checked_locations(ctx, team, slot)
 
 
@@ -1106,9 +1609,11 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
     ctx.broadcast_text_all("%s (Team #%d) has collected their items from other worlds."
                            % (ctx.player_names[(team, slot)], team + 1),
                            {"type": "Collect", "team": team, "slot": slot})
+    sends: typing.List[typing.Tuple[int, int, int, int]] = []
     for source_player, location_ids in all_locations.items():
-        register_location_checks(ctx, team, source_player, location_ids, count_activity=False)
+        register_location_checks(ctx, team, source_player, location_ids, count_activity=False, sends=sends)
         update_checked_locations(ctx, team, source_player)
+    log_bulk_send(ctx, team, slot, "Collect", sends)
 
     if not is_group:
         for group, group_players in ctx.groups.items():
@@ -1129,10 +1634,14 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.dirty_item_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
-                             count_activity: bool = True):
+                             count_activity: bool = True,
+                             sends: typing.Optional[typing.List[typing.Tuple[int, int, int, int]]] = None):
+    """Send the items of newly checked locations. If sends is given, the (finding player, receiving player, item,
+    location) of each item get appended to it for the caller to log, instead of logging every item here."""
     slot_locations = ctx.locations[slot]
     new_locations = set(locations) - ctx.location_checks[team, slot]
     new_locations.intersection_update(slot_locations)  # ignore location IDs unknown to this multidata
@@ -1152,9 +1661,13 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             new_item = NetworkItem(item_id, location, slot, flags)
             send_items_to(ctx, team, target_player, new_item)
 
-            ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
-                team + 1, ctx.player_names[(team, slot)], ctx.item_names[ctx.slot_info[target_player].game][item_id],
-                ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
+            if sends is None:
+                ctx.logger.info('(Team #%d) %s sent %s to %s (%s)' % (
+                    team + 1, ctx.player_names[(team, slot)],
+                    ctx.item_names[ctx.slot_info[target_player].game][item_id],
+                    ctx.player_names[(team, target_player)], ctx.location_names[ctx.slot_info[slot].game][location]))
+            else:
+                sends.append((slot, target_player, item_id, location))
             if len(info_texts) >= 140:
                 # split into chunks that are close to compression window of 64K but not too big on the wire
                 # (roughly 1300-2600 bytes after compression depending on repetitiveness)
@@ -1173,7 +1686,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.check_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1675,6 +2188,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.dirty_item_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1917,6 +2431,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.no_locations = bool(client.tags & _non_game_messages.keys())
             # set NoText for old PopTracker clients that predate the tag to save traffic
             client.no_text = "NoText" in client.tags or ("PopTracker" in client.tags and client.version < (0, 5, 1))
+            client.binary = NetUtils.msgpack is not None and args.get("encoding") == NetUtils.binary_encoding
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1942,23 +2457,17 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            games = set(args.get("games", []))
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(
+                name for name in ctx.gamespackage if name in games))
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(
+                name for name in ctx.gamespackage if name not in exclusions))
 
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            await ctx.send_encoded_msgs(client, ctx.encode_data_package(ctx.gamespackage))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2187,6 +2696,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            ctx.save_journal.mark("stored_data", args["key"])
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", False):
                 targets.add(client)
@@ -2645,6 +3155,8 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--metrics_interval', default=defaults["metrics_interval"], type=int,
+                        help="log command timings, event loop lag and traffic every this many seconds, 0 to disable")
     args = parser.parse_args()
     return args
 
@@ -2686,7 +3198,8 @@ def load_server_cert(path: str, cert_key: typing.Optional[str]) -> "ssl.SSLConte
 async def main(args: argparse.Namespace):
     Utils.init_logging(name="Server",
                        loglevel=args.loglevel.lower(),
-                       add_timestamp=args.logtime)
+                       add_timestamp=args.logtime,
+                       queued=True)
 
     ctx = Context(args.host, args.port, args.server_password, args.password, args.location_check_points,
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
@@ -2737,6 +3250,8 @@ async def main(args: argparse.Namespace):
                                                  'No password' if not ctx.password else 'Password: %s' % ctx.password))
 
     await ctx.server
+    if args.metrics_interval:
+        ctx.start_metrics(args.metrics_interval)
     console_task = asyncio.create_task(console(ctx))
     if ctx.auto_shutdown:
         ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, [console_task]))
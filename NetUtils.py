@@ -1,15 +1,27 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from collections.abc import Mapping, Sequence
+import threading
 import typing
 import enum
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, VersionException, restricted_dumps, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -135,7 +147,30 @@ _encode = JSONEncoder(
 ).encode
 
 
+def _orjson_default(obj: typing.Any) -> typing.Any:
+    if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # orjson hands over NamedTuples, but not plain tuples
+        data = dict(zip(obj._fields, obj))
+        data["class"] = obj.__class__.__name__
+        return data
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError
+
+
+if orjson:
+    # datetimes and dataclasses are left to the default, which rejects them like the json module does
+    _orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
 def encode(obj: typing.Any) -> str:
+    """Encodes obj to JSON like the json module, using orjson if it is installed.
+    With orjson, NaN and infinite floats become null instead of the invalid JSON NaN and Infinity,
+    and members of plain Enums get encoded as their value instead of raising TypeError."""
+    if orjson:
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=_orjson_options).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass  # things orjson can't encode, like integers beyond 64 bit, take the slow path
     return _encode(_scan_for_TypedTuples(obj))
 
 
@@ -172,6 +207,66 @@ def _object_hook(o: typing.Any) -> typing.Any:
 
 decode = JSONDecoder(object_hook=_object_hook).decode
 
+binary_encoding = "msgpack"
+"""name of the binary encoding, offered in RoomInfo and requested in Connect, if msgpack is installed"""
+binary_commands = frozenset({"RoomUpdate", "ReceivedItems", "LocationInfo", "PrintJSON"})
+"""commands that may be sent with the binary encoding, any other is sent as JSON,
+like Connected, as its world defined slot_data may hold values that only JSON keeps as intended"""
+
+
+def _binary_default(obj: typing.Any) -> typing.Any:
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Cannot encode {type(obj)}")
+
+
+def _binary_map(pairs: typing.List[typing.Tuple[typing.Any, typing.Any]]) -> typing.Dict[str, typing.Any]:
+    # keys become strings, like they would in JSON
+    return {key if type(key) is str else _encode(key): value for key, value in pairs}
+
+
+def _network_items(items: typing.List[typing.List[int]]) -> typing.List[NetworkItem]:
+    return [NetworkItem(*item) for item in items]
+
+
+def _network_players(players: typing.List[typing.List[typing.Any]]) -> typing.List[NetworkPlayer]:
+    return [NetworkPlayer(*player) for player in players]
+
+
+# NamedTuples are sent as arrays of their fields, these turn them back into the classes decode creates
+_binary_fields: typing.Dict[str, typing.Dict[str, typing.Callable[[typing.Any], typing.Any]]] = {
+    "Connect": {"version": lambda version: Version(*version)},
+    "RoomUpdate": {"players": _network_players},
+    "ReceivedItems": {"items": _network_items},
+    "LocationInfo": {"locations": _network_items},
+    "PrintJSON": {"item": lambda item: NetworkItem(*item)},
+}
+
+
+def is_binary_packet(msgs: typing.Iterable[typing.Dict[str, typing.Any]]) -> bool:
+    """Returns whether the messages can be sent with encode_binary."""
+    return msgpack is not None and all(msg["cmd"] in binary_commands for msg in msgs)
+
+
+def encode_binary(obj: typing.Any) -> bytes:
+    """
+    Encodes messages with msgpack. Unlike encode, NamedTuples are not turned into objects with a "class" key,
+    but encoded as arrays of their fields, so this is only valid for the fields decode_binary knows about.
+    """
+    return msgpack.packb(obj, default=_binary_default)
+
+
+def decode_binary(data: bytes) -> typing.Any:
+    """Decodes messages of encode_binary into the same objects decode creates from their JSON."""
+    msgs = msgpack.unpackb(data, object_pairs_hook=_binary_map, strict_map_key=False)
+    for msg in msgs:
+        fields = _binary_fields.get(msg.get("cmd"))
+        if fields:
+            for key, restore in fields.items():
+                if key in msg:
+                    msg[key] = restore(msg[key])
+    return msgs
+
 
 class Endpoint:
     __slots__ = ("socket",)
@@ -414,9 +509,88 @@ class Hint(typing.NamedTuple):
         return self.receiving_player == self.finding_player
 
 
+class _LocationChecks(typing.MutableSet[int]):
+    """Checked locations of a slot, stored as one bit per location of the slot in sorted order"""
+    __slots__ = ("_locations", "_bits")
+
+    _locations: typing.Sequence[int]
+    _bits: int
+
+    def __init__(self, locations: typing.Sequence[int]):
+        self._locations = locations
+        self._bits = 0
+
+    @classmethod
+    def _from_iterable(cls, it: typing.Iterable[int]) -> typing.Set[int]:
+        # results of set operations are plain sets
+        return set(it)
+
+    def _find(self, location: object) -> int:
+        if not isinstance(location, int):
+            return -1
+        i = bisect_left(self._locations, location)
+        if i < len(self._locations) and self._locations[i] == location:
+            return i
+        return -1
+
+    def _bit_string(self) -> str:
+        return f"{self._bits:0{len(self._locations)}b}"[::-1]
+
+    def checked(self) -> typing.List[int]:
+        return [location for location, bit in zip(self._locations, self._bit_string()) if bit == "1"]
+
+    def missing(self) -> typing.List[int]:
+        return [location for location, bit in zip(self._locations, self._bit_string()) if bit == "0"]
+
+    def __len__(self) -> int:
+        return self._bits.bit_count()
+
+    def __contains__(self, location: object) -> bool:
+        i = self._find(location)
+        return i >= 0 and bool(self._bits >> i & 1)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.checked())
+
+    def add(self, location: int) -> None:
+        i = self._find(location)
+        if i < 0:
+            raise KeyError(location)
+        self._bits |= 1 << i
+
+    def discard(self, location: int) -> None:
+        i = self._find(location)
+        if i >= 0:
+            self._bits &= ~(1 << i)
+
+    def update(self, *others: typing.Iterable[int]) -> None:
+        """Adds all locations of others, ignoring location IDs that do not belong to the slot."""
+        for other in others:
+            for location in other:
+                i = self._find(location)
+                if i >= 0:
+                    self._bits |= 1 << i
+
+    def __ior__(self, other: typing.AbstractSet[int]) -> _LocationChecks:
+        self.update(other)
+        return self
+
+    def __repr__(self) -> str:
+        return f"LocationChecks({set(self)})"
+
+
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    # (position, sender, location, flags) of the locations holding items for a receiver,
+    # by receiver and by (item, receiver), built on first use. position is the order in self.items().
+    _by_receiver: typing.Optional[typing.Dict[int, typing.List[typing.Tuple[int, int, int, int]]]]
+    _by_item: typing.Optional[typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int, int]]]]
+    _sorted_locations: typing.Dict[int, typing.Tuple[int, ...]]  # shared by the _LocationChecks of all teams
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
+        self._by_receiver = None
+        self._by_item = None
+        self._sorted_locations = {}
 
         if not self:
             raise ValueError(f"Rejecting game with 0 players")
@@ -427,25 +601,52 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+    def _build_receiver_index(self) -> None:
+        import itertools
+        by_receiver: typing.Dict[int, typing.List[typing.Tuple[int, int, int, int]]] = {}
+        by_item: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int, int]]] = {}
+        position = itertools.count()
+        for sender, check_data in self.items():
+            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
+                entry = next(position), sender, location_id, item_flags
+                by_receiver.setdefault(receiving_player, []).append(entry)
+                by_item.setdefault((item_id, receiving_player), []).append(entry)
+        self._by_receiver = by_receiver
+        self._by_item = by_item
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        import heapq
+        if self._by_item is None:
+            self._build_receiver_index()
+        # merge by position to yield in the same order as a scan over all locations would
+        found = heapq.merge(*([(entry, receiving_player) for entry in entries]
+                              for receiving_player in slots
+                              if (entries := self._by_item.get((seeked_item_id, receiving_player)))))
+        for (_, finding_player, location_id, item_flags), receiving_player in found:
+            yield finding_player, location_id, seeked_item_id, receiving_player, item_flags
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
-        all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        if self._by_receiver is None:
+            self._build_receiver_index()
+        all_locations: typing.Dict[int, typing.Set[int]] = {}
+        for _, source_slot, location_id, _ in self._by_receiver.get(slot, ()):
+            all_locations.setdefault(source_slot, set()).add(location_id)
         return all_locations
 
+    def new_checks(self, slot: int) -> _LocationChecks:
+        """Returns an empty set of checked locations for slot, stored as a bitset over the locations of the slot."""
+        if slot not in self._sorted_locations:
+            self._sorted_locations[slot] = tuple(sorted(self[slot]))
+        return _LocationChecks(self._sorted_locations[slot])
+
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
         checked = state[team, slot]
+        if isinstance(checked, _LocationChecks):
+            if slot not in self:
+                raise KeyError(slot)
+            return checked.checked()
         if not checked:
             # This optimizes the case where everyone connects to a fresh game at the same time.
             if slot not in self:
@@ -458,6 +659,10 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
     def get_missing(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
         checked = state[team, slot]
+        if isinstance(checked, _LocationChecks):
+            if slot not in self:
+                raise KeyError(slot)
+            return checked.missing()
         if not checked:
             # This optimizes the case where everyone connects to a fresh game at the same time.
             return list(self[slot])
@@ -510,6 +715,132 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+multidata_version = 4
+"""Version of the .archipelago format written by encode_multidata.
+Up to version 3 the whole multidata is one compressed pickle, since version 4 each key is compressed on its own
+and slot_data per slot. A header indexes the sections by key, so readers decode only what they use."""
+
+
+class LazySlotData(Mapping[int, typing.Any]):
+    """slot_data of a MultiDataSections, which decodes the data of a slot on first access."""
+
+    def __init__(self, decode: typing.Callable[[tuple[int, int]], typing.Any], index: dict[int, tuple[int, int]],
+                 lock: threading.Lock):
+        self._decode = decode
+        self._index = index
+        self._lock = lock
+        self._decoded: dict[int, typing.Any] = {}
+
+    def __getitem__(self, slot: int) -> typing.Any:
+        try:
+            return self._decoded[slot]
+        except KeyError:
+            with self._lock:
+                if slot not in self._decoded:
+                    self._decoded[slot] = self._decode(self._index[slot])
+                return self._decoded[slot]
+
+    def __contains__(self, slot: object) -> bool:
+        return slot in self._index
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class MultiDataSections(typing.MutableMapping[str, typing.Any]):
+    """Multidata read from the contents of an .archipelago file, which decodes sections on first access.
+    Versions before 4 have no sections and get decoded completely.
+    Sections get decoded under a lock, so it can be read from several threads, like the WebHost's trackers do."""
+
+    def __init__(self, data: bytes):
+        format_version = data[0]
+        if format_version > multidata_version:
+            raise VersionException("Incompatible multidata.")
+        self._decoded: dict[str, typing.Any] = {}
+        self._index: dict[str, typing.Any] = {}
+        self._lock = threading.Lock()
+        if format_version < 4:
+            self._decoded.update(restricted_loads(zlib.decompress(data[1:])))
+        else:
+            sections_start = 5 + int.from_bytes(data[1:5], "little")
+            self._index = restricted_loads(data[5:sections_start])
+            self._sections = memoryview(data)[sections_start:]
+
+    def _decode(self, span: tuple[int, int]) -> typing.Any:
+        return restricted_loads(zlib.decompress(self._sections[span[0]:span[1]]))
+
+    def get_raw(self, key: str) -> bytes | dict[int, bytes] | None:
+        """Returns the compressed section of a key that was not accessed yet, per slot for slot_data."""
+        if key not in self._index or (key in self._decoded and key != "slot_data"):
+            return None
+        if key == "slot_data":
+            slot_data = self._decoded.get(key)
+            return {slot: bytes(self._sections[start:end]) for slot, (start, end) in self._index[key].items()
+                    if not isinstance(slot_data, LazySlotData) or slot not in slot_data._decoded}
+        start, end = self._index[key]
+        return bytes(self._sections[start:end])
+
+    def __getitem__(self, key: str) -> typing.Any:
+        try:
+            return self._decoded[key]
+        except KeyError:
+            with self._lock:
+                if key not in self._decoded:
+                    span = self._index[key]
+                    self._decoded[key] = LazySlotData(self._decode, span, self._lock) if key == "slot_data" \
+                        else self._decode(span)
+                return self._decoded[key]
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._decoded[key] = value
+        self._index.pop(key, None)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._decoded.pop(key, None)
+        self._index.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._decoded or key in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self._decoded
+        yield from (key for key in self._index if key not in self._decoded)
+
+    def __len__(self) -> int:
+        return len(self._decoded.keys() | self._index.keys())
+
+
+def encode_multidata(multidata: typing.Mapping[str, typing.Any]) -> bytes:
+    """Encodes multidata into the contents of an .archipelago file of the current multidata_version.
+    Sections of a MultiDataSections that were never accessed are copied without decoding them."""
+    index: dict[str, typing.Any] = {}
+    sections: list[bytes] = []
+    size = 0
+
+    def add(value: typing.Any, raw: bytes | None) -> tuple[int, int]:
+        nonlocal size
+        section = raw if raw is not None else zlib.compress(restricted_dumps(value), 9)
+        sections.append(section)
+        size += len(section)
+        return size - len(section), size
+
+    for key in multidata:
+        raw = multidata.get_raw(key) if isinstance(multidata, MultiDataSections) else None
+        if key == "slot_data":
+            raw = raw or {}
+            index[key] = {slot: add(None, raw[slot]) if slot in raw else add(multidata[key][slot], None)
+                          for slot in multidata[key]}
+        else:
+            index[key] = add(None, raw) if raw is not None else add(multidata[key], None)
+    header = restricted_dumps(index)
+    return b"".join((bytes([multidata_version]), len(header).to_bytes(4, "little"), header, *sections))
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
@@ -15,6 +15,8 @@ import io
 import collections
 import importlib
 import logging
+import logging.handlers
+import threading
 import warnings
 
 from argparse import Namespace
@@ -536,9 +538,58 @@ def get_text_after(text: str, start: str) -> str:
 loglevel_mapping = {'error': logging.ERROR, 'info': logging.INFO, 'warning': logging.WARNING, 'debug': logging.DEBUG}
 
 
+class QueuedLogHandler(logging.handlers.QueueHandler):
+    """
+    Hands records over to a process wide writer thread, which passes them on to the wrapped handler.
+    Keeps slow handler I/O, like writing to files or a console, off the event loop.
+    """
+    _writer: typing.ClassVar[Optional[logging.handlers.QueueListener]] = None
+    _writer_pid: typing.ClassVar[int] = 0
+
+    class Writer(logging.handlers.QueueListener):
+        def handle(self, item: typing.Tuple[logging.Handler, typing.Union[logging.LogRecord, threading.Event]]) -> None:
+            handler, record = item
+            if isinstance(record, threading.Event):
+                handler.close()
+                record.set()
+            elif record.levelno >= handler.level:
+                handler.handle(record)
+
+    def __init__(self, handler: logging.Handler) -> None:
+        cls = type(self)
+        if cls._writer_pid != os.getpid():
+            import atexit
+            import queue
+            cls._writer = cls.Writer(queue.SimpleQueue())
+            cls._writer.start()
+            cls._writer_pid = os.getpid()
+            atexit.register(cls._writer.stop)
+        super().__init__(cls._writer.queue)
+        self.handler = handler
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.handler:
+            self.queue.put_nowait((self.handler, record))
+
+    def close(self) -> None:
+        """Waits for the writer to get to all records queued before, then closes the wrapped handler."""
+        if self.handler:
+            closed = threading.Event()
+            self.queue.put_nowait((self.handler, closed))
+            if self._writer._thread and self._writer._thread is not threading.current_thread():
+                closed.wait(5)
+            self.handler = None
+        super().close()
+
+
 def init_logging(name: str, loglevel: typing.Union[str, int] = logging.INFO,
                  write_mode: str = "w", log_format: str = "[%(name)s at %(asctime)s]: %(message)s",
-                 add_timestamp: bool = False, exception_logger: typing.Optional[str] = None):
+                 add_timestamp: bool = False, exception_logger: typing.Optional[str] = None,
+                 queued: bool = False):
+    """
+    Set up the root logger to log to a file in the logs folder and to stdout.
+    With queued, the handlers are written to from a background thread, see QueuedLogHandler.
+    """
     import datetime
     loglevel: int = loglevel_mapping.get(loglevel, loglevel)
     log_folder = user_path("logs")
@@ -567,14 +618,14 @@ def init_logging(name: str, loglevel: typing.Union[str, int] = logging.INFO,
 
     file_handler.addFilter(Filter("NoStream", lambda record: not getattr(record, "NoFile", False)))
     file_handler.addFilter(Filter("NoCarriageReturn", lambda record: '\r' not in record.getMessage()))
-    root_logger.addHandler(file_handler)
+    root_logger.addHandler(QueuedLogHandler(file_handler) if queued else file_handler)
     if sys.stdout:
         formatter = logging.Formatter(fmt='[%(asctime)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
         stream_handler = logging.StreamHandler(sys.stdout)
         stream_handler.addFilter(Filter("NoFile", lambda record: not getattr(record, "NoStream", False)))
         if add_timestamp:
             stream_handler.setFormatter(formatter)
-        root_logger.addHandler(stream_handler)
+        root_logger.addHandler(QueuedLogHandler(stream_handler) if queued else stream_handler)
         if hasattr(sys.stdout, "reconfigure"):
             sys.stdout.reconfigure(encoding="utf-8", errors="replace")
 
@@ -50,6 +50,10 @@ app.config["JOB_TIME"] = 600
 app.config["MAX_ROOM_TIMEOUT"] = 259200
 # memory limit for generator processes in bytes
 app.config["GENERATOR_MEMORY_LIMIT"] = 4294967296
+# log metrics of each room to its room log every this many seconds, 0 to disable
+app.config["ROOM_METRICS_INTERVAL"] = 0
+# seconds without clients after which a room frees its memory until the next connection attempt, 0 to disable
+app.config["ROOM_HIBERNATE_AFTER"] = 0
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
 # archipelago.gg uses gunicorn + nginx; ignoring this option
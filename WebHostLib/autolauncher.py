@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import logging
 import multiprocessing
+import time
 import typing
 from datetime import timedelta
 from threading import Event, Thread
@@ -113,12 +114,21 @@ def cleanup():
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
 
 
+def delete_stale_commands(max_room_timeout: int) -> int:
+    """delete commands of rooms that have been closed for longer than any room can be started again after"""
+    with db_session:
+        cutoff = utcnow() - timedelta(seconds=max_room_timeout)
+        return select(command for command in Command if command.room.last_activity < cutoff).delete(bulk=True)
+
+
 def autohost(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autohost"):
                 cleanup()
+                delete_stale_commands(config["MAX_ROOM_TIMEOUT"])
+                next_command_cleanup = time.monotonic() + 60
                 hosters = []
                 for x in range(config["HOSTERS"]):
                     hoster = MultiworldInstance(config, x)
@@ -126,6 +136,11 @@ def autohost(config: dict):
                     hoster.start()
 
                 while not stop_event.wait(0.1):
+                    for hoster in hosters:
+                        hoster.update_rooms()
+                    if time.monotonic() >= next_command_cleanup:
+                        delete_stale_commands(config["MAX_ROOM_TIMEOUT"])
+                        next_command_cleanup = time.monotonic() + 60
                     with db_session:
                         rooms = select(
                             room for room in Room if
@@ -133,8 +148,9 @@ def autohost(config: dict):
                                 seconds=config["MAX_ROOM_TIMEOUT"])).order_by(desc(Room.last_port))
                         for room in rooms:
                             # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                            if room.last_activity >= utcnow() - timedelta(seconds=room.timeout + 5) and \
+                                    not any(room.id in hoster.room_ids for hoster in hosters):
+                                min(hosters, key=MultiworldInstance.get_load).start_room(room.id)
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -188,8 +204,12 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.metrics_interval = config["ROOM_METRICS_INTERVAL"]
+        self.hibernate_after = config["ROOM_HIBERNATE_AFTER"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        # memory use in bytes and number of rooms, as last reported by the process
+        self.status = multiprocessing.Array("Q", 2, lock=False)
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -197,16 +217,28 @@ class MultiworldInstance():
             return False
 
         process = multiprocessing.Process(group=None, target=run_server_process,
-                                          args=(self.name, self.ponyconfig, get_static_server_data(),
+                                          args=(self.name, self.ponyconfig, get_static_server_data_file(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down,
+                                                self.metrics_interval, self.hibernate_after, self.status),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def update_rooms(self):
         while not self.rooms_shutting_down.empty():
             self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+
+    def get_load(self) -> typing.Tuple[int, int]:
+        """Memory use of the process, including an estimate for rooms it has not reported yet, and its room count."""
+        memory, reported_rooms = self.status
+        new_rooms = len(self.room_ids) - reported_rooms
+        if new_rooms > 0:
+            memory += memory // max(reported_rooms, 1) * new_rooms
+        return memory, len(self.room_ids)
+
+    def start_room(self, room_id):
+        self.update_rooms()
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
@@ -226,6 +258,6 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .models import Command, Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .customserver import run_server_process, get_static_server_data_file
 from .generate import gen_game
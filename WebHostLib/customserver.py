@@ -3,7 +3,6 @@ from __future__ import annotations
 import asyncio
 import collections
 import datetime
-import functools
 import logging
 import multiprocessing
 import pickle
@@ -13,6 +12,7 @@ import threading
 import time
 import typing
 import sys
+from uuid import UUID
 
 import websockets
 from pony.orm import commit, db_session, select
@@ -23,7 +23,7 @@ from MultiServer import (
     Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
     server_per_message_deflate_factory,
 )
-from Utils import restricted_loads, cache_argsless
+from Utils import restricted_loads, cache_argsless, async_start
 from .locker import Locker
 from .models import Command, GameDataPackage, Room, db
 
@@ -89,25 +89,6 @@ class WebHostContext(Context):
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    async def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            await self.main_loop.run_in_executor(None, self._process_db_commands, cmdprocessor)
-            try:
-                await asyncio.wait_for(self.exit_event.wait(), 5)
-            except asyncio.TimeoutError:
-                pass
-
-    def _process_db_commands(self, cmdprocessor):
-        with db_session:
-            commands = select(command for command in Command if command.room.id == self.room_id)
-            if commands:
-                for command in commands:
-                    self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                    command.delete()
-                commit()
-
     @db_session
     def load(self, room_id: int):
         self.room_id = room_id
@@ -148,11 +129,12 @@ class WebHostContext(Context):
             self.item_name_groups[game] = static_item_name_groups.get(game, {})
             self.location_name_groups[game] = static_location_name_groups.get(game, {})
 
-        if not game_data_packages and not missing_checksum:
-            # all static -> use the static dicts directly
+        if "datapackage" not in multidata:
+            # rolled before data packages got embedded, so the games of this room are not known here
             self.gamespackage = static_gamespackage
             self.item_name_groups = static_item_name_groups
             self.location_name_groups = static_location_name_groups
+        # otherwise only the games of this room get loaded from the static data
         return self._load(multidata, game_data_packages, True)
 
     def init_save(self, enabled: bool = True):
@@ -163,10 +145,10 @@ class WebHostContext(Context):
                 if savegame_data:
                     self.set_save(restricted_loads(savegame_data))
             self._start_async_saving(atexit_save=False)
-        asyncio.create_task(self.listen_to_db_commands())
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
+        """Stores a full snapshot in Room.multisave, as trackers read it directly. Rooms don't use the save journal."""
         room = Room.get(id=self.room_id)
         # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
         room.multisave = pickle.dumps(self.get_save())
@@ -181,6 +163,143 @@ class WebHostContext(Context):
         return d
 
 
+class DBCommandPoller:
+    """Fetches the pending commands of all rooms hosted by this process in one query and hands them to their rooms."""
+    interval: float = 1
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.processors: typing.Dict[UUID, typing.Callable[[str], typing.Any]] = {}
+
+    def add(self, room_id: UUID, processor: typing.Callable[[str], typing.Any]):
+        self.processors[room_id] = processor
+
+    def remove(self, room_id: UUID):
+        self.processors.pop(room_id, None)
+
+    async def run(self):
+        while True:
+            if self.processors:
+                try:
+                    await self.loop.run_in_executor(None, self._process_db_commands)
+                except Exception:
+                    # a failed poll, e.g. the database being unreachable, must not stop commands for all rooms
+                    logging.exception("Failed to fetch room commands.")
+            await asyncio.sleep(self.interval)
+
+    def _process_db_commands(self):
+        with db_session:
+            room_ids = list(self.processors)
+            for command in select(command for command in Command if command.room.id in room_ids):
+                processor = self.processors.get(command.room.id)
+                if processor:
+                    self.loop.call_soon_threadsafe(processor, command.commandtext)
+                    command.delete()
+            commit()
+
+
+class HibernatingRoom:
+    """Holds the Context of a hosted room. While the room hibernates, only its listening socket is kept and the
+    Context gets reopened by the next connection or command."""
+
+    def __init__(self, room_id: UUID, logger: logging.Logger,
+                 open_room: typing.Callable[[UUID, logging.Logger], typing.Awaitable[WebHostContext]]):
+        self.room_id = room_id
+        self.logger = logger
+        self.open_room = open_room
+        self.ctx: typing.Optional[WebHostContext] = None
+        self.cmdprocessor: typing.Optional[DBCommandProcessor] = None
+        self.server = None
+        self.hibernating = False
+        self.connections = 0
+        """Connections being handled, including those still waiting for the room to wake up"""
+        self.woken = asyncio.Event()
+        self.waking = asyncio.Lock()
+        """Held while the Context is being dropped or reopened"""
+
+    async def open(self) -> WebHostContext:
+        self.ctx = ctx = await self.open_room(self.room_id, self.logger)
+        self.cmdprocessor = DBCommandProcessor(ctx)
+        return ctx
+
+    async def hibernate(self) -> bool:
+        """Saves and drops the Context, unless a client connected since the room became idle.
+        Connections and commands wait for the save to finish before the room wakes up again.
+
+        :return: whether the room is hibernating."""
+        async with self.waking:
+            ctx = self.ctx
+            if self.connections or ctx.endpoints:
+                return False
+            ctx.logger.info("Hibernating due to inactivity.")
+            self.ctx = self.cmdprocessor = None
+            self.hibernating = True
+            self.woken.clear()
+            if ctx.saving:
+                await asyncio.to_thread(ctx._save, True)
+            ctx.save_dirty = False
+            ctx.exit_event.set()
+            return True
+
+    def close(self) -> None:
+        """Stops a hibernating room from waking up again."""
+        self.hibernating = False
+
+    async def wake_up(self) -> None:
+        """Reopens the Context if the room is hibernating. If that fails, the room keeps hibernating, so the next
+        connection or command tries again."""
+        async with self.waking:
+            if not self.hibernating:
+                return
+            try:
+                ctx = await self.open_room(self.room_id, self.logger)
+            except Exception:
+                self.logger.exception("Failed to wake up from hibernation.")
+                return
+            if not self.hibernating:  # closed while opening
+                ctx.exit_event.set()
+                return
+            ctx.server = self.server
+            self.ctx = ctx
+            self.cmdprocessor = DBCommandProcessor(ctx)
+            self.hibernating = False
+            ctx.logger.info("Woke up from hibernation.")
+            self.woken.set()
+
+    async def handle_connection(self, websocket, path: str = "/"):
+        self.connections += 1
+        try:
+            await self.wake_up()
+            if self.ctx:
+                await server(websocket, path, self.ctx)
+        finally:
+            self.connections -= 1
+
+    def handle_command(self, commandtext: str):
+        if self.hibernating or self.waking.locked():
+            async_start(self._handle_command_awake(commandtext))
+        elif self.cmdprocessor:
+            self.cmdprocessor(commandtext)
+
+    async def _handle_command_awake(self, commandtext: str):
+        await self.wake_up()
+        if self.cmdprocessor:
+            self.cmdprocessor(commandtext)
+
+
+async def wait_for_idle(ctx: WebHostContext, seconds: int) -> float:
+    """Returns once no client has been connected or active for seconds, with the number of seconds it has been idle."""
+    started = datetime.datetime.now(datetime.timezone.utc)
+    while True:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        idle = (now - max([started, *ctx.client_activity_timers.values()])).total_seconds()
+        if ctx.endpoints:
+            idle = 0
+        elif idle >= seconds:
+            return idle
+        await asyncio.sleep(seconds - idle)
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
@@ -214,6 +333,87 @@ def get_static_server_data() -> dict:
     return data
 
 
+class LazyGameData(typing.Mapping[str, typing.Any]):
+    """Read-only view of one section of a static server data file, which unpickles a game on first access."""
+
+    def __init__(self, buffer: memoryview, index: typing.Dict[str, typing.Tuple[int, int]]):
+        self._buffer = buffer
+        self._index = index
+        self._loaded: typing.Dict[str, typing.Any] = {}
+
+    def __getitem__(self, game: str) -> typing.Any:
+        try:
+            return self._loaded[game]
+        except KeyError:
+            start, end = self._index[game]
+            value = self._loaded[game] = pickle.loads(self._buffer[start:end])
+            return value
+
+    def __contains__(self, game: object) -> bool:
+        return game in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def write_static_server_data(file: typing.BinaryIO) -> None:
+    """Writes get_static_server_data to file, one pickle per game and section, for map_static_server_data.
+    Layout: length of the index, pickled index, then the pickles of the index."""
+    data = get_static_server_data()
+    index: typing.Dict[str, typing.Any] = {"non_hintable_names": data["non_hintable_names"]}
+    blobs: typing.List[bytes] = []
+    offset = 0
+    for section in ("gamespackage", "item_name_groups", "location_name_groups"):
+        section_index = index[section] = {}
+        for game, value in data[section].items():
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            section_index[game] = offset, offset + len(blob)
+            offset += len(blob)
+            blobs.append(blob)
+    header = pickle.dumps(index, pickle.HIGHEST_PROTOCOL)
+    file.write(len(header).to_bytes(8, "little"))
+    file.write(header)
+    for blob in blobs:
+        file.write(blob)
+
+
+def map_static_server_data(path: str) -> dict:
+    """Maps a file written by write_static_server_data into memory, so processes share its pages,
+    and returns the static server data with a LazyGameData for each per-game section."""
+    import mmap
+    with open(path, "rb") as file:
+        buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    header_end = 8 + int.from_bytes(buffer[:8], "little")
+    index = pickle.loads(buffer[8:header_end])
+    data = buffer[header_end:]
+    return {
+        section: LazyGameData(data, section_index) if section != "non_hintable_names" else section_index
+        for section, section_index in index.items()
+    }
+
+
+@cache_argsless
+def get_static_server_data_file() -> str:
+    """Writes the static server data to a temporary file once per process and returns its path."""
+    import atexit
+    import os
+    import tempfile
+    with tempfile.NamedTemporaryFile("wb", prefix="static_server_data_", suffix=".bin", delete=False) as file:
+        write_static_server_data(file)
+
+    def remove():
+        try:
+            os.unlink(file.name)
+        except OSError:
+            pass  # may still be mapped by a hoster on Windows
+
+    atexit.register(remove)
+    return file.name
+
+
 def set_up_logging(room_id) -> logging.Logger:
     import os
     # logger setup
@@ -230,7 +430,7 @@ def set_up_logging(room_id) -> logging.Logger:
         encoding="utf-8-sig")
     file_handler.setFormatter(logging.Formatter("[%(asctime)s]: %(message)s"))
     logger.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
+    logger.addHandler(Utils.QueuedLogHandler(file_handler))
     return logger
 
 
@@ -245,13 +445,19 @@ def tear_down_logging(room_id):
         del logging.Logger.manager.loggerDict[logger_name]
 
 
-def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
+def run_server_process(name: str, ponyconfig: dict, static_server_data_file: str,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       metrics_interval: int = 0, hibernate_after: int = 0,
+                       status: typing.Optional[typing.MutableSequence[int]] = None):
+    """Hosts the rooms that come in through rooms_to_run until they shut down.
+    static_server_data_file is mapped into memory, see write_static_server_data.
+    Rooms without clients for hibernate_after seconds free their Context until the next connection attempt.
+    The process' memory use and number of rooms get reported in status, if given."""
     from setproctitle import setproctitle
 
     setproctitle(name)
-    Utils.init_logging(name)
+    Utils.init_logging(name, queued=True)
     try:
         import resource
     except ModuleNotFoundError:
@@ -267,6 +473,8 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     db.bind(**ponyconfig)
     db.generate_mapping(check_tables=False)
 
+    static_server_data = map_static_server_data(static_server_data_file)
+
     if "worlds" in sys.modules:
         raise Exception("Worlds system should not be loaded in the custom server.")
 
@@ -291,18 +499,37 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    command_poller = DBCommandPoller(loop)
+    hosted_rooms: typing.Set[UUID] = set()
+
+    def load_room(ctx: WebHostContext, room_id: UUID) -> None:
+        # decompressing and loading the multidata and save can take a while, so this runs outside the event loop
+        ctx.load(room_id)
+        ctx.init_save()
+        with db_session:
+            ctx.auto_shutdown = Room.get(id=room_id).timeout
+
+    async def open_room(room_id: UUID, logger: logging.Logger) -> WebHostContext:
+        ctx = WebHostContext(static_server_data, logger)
+        await loop.run_in_executor(None, load_room, ctx, room_id)
+        if metrics_interval:
+            ctx.start_metrics(metrics_interval)
+        return ctx
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
+            hosted: typing.Optional[HibernatingRoom] = None
+            hosted_rooms.add(room_id)
+
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
-                ctx.load(room_id)
-                ctx.init_save()
+                hosted = HibernatingRoom(room_id, logger, open_room)
+                ctx = await hosted.open()
+                command_poller.add(room_id, hosted.handle_command)
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx),
+                        hosted.handle_connection,
                         ctx.host,
                         ctx.port,
                         ssl=get_ssl_context(),
@@ -310,10 +537,10 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     )
                     await ctx.server
                 except OSError:  # likely port in use
-                    ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx), ctx.host, 0, ssl=get_ssl_context())
+                    ctx.server = websockets.serve(hosted.handle_connection, ctx.host, 0, ssl=get_ssl_context())
 
                     await ctx.server
+                hosted.server = ctx.server
                 port = 0
                 for wssocket in ctx.server.ws_server.sockets:
                     socketname = wssocket.getsockname()
@@ -331,16 +558,41 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     del room
                 else:
                     ctx.logger.exception("Could not determine port. Likely hosting failure.")
-                with db_session:
-                    ctx.auto_shutdown = Room.get(id=room_id).timeout
                 if ctx.saving:
-                    setattr(asyncio.current_task(), "save", lambda: ctx._save(True))
-                assert ctx.shutdown_task is None
-                ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
-                await ctx.shutdown_task
+                    setattr(asyncio.current_task(), "save", lambda: hosted.ctx and hosted.ctx._save(True))
+                while True:
+                    ctx = hosted.ctx
+                    if ctx.shutdown_task is None:
+                        ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
+                    if not hibernate_after or ctx.auto_shutdown <= hibernate_after:
+                        # the room would time out before or as soon as it hibernates
+                        await ctx.shutdown_task
+                        break
+                    idle_task = asyncio.create_task(wait_for_idle(ctx, hibernate_after))
+                    await asyncio.wait((ctx.shutdown_task, idle_task), return_when=asyncio.FIRST_COMPLETED)
+                    if ctx.shutdown_task.done():
+                        idle_task.cancel()
+                        ctx.shutdown_task.result()
+                        break
+
+                    # hibernate: keep only the listening socket, the room's state goes to the database
+                    timeout = ctx.auto_shutdown - idle_task.result()
+                    ctx.shutdown_task.cancel()
+                    ctx.shutdown_task = None
+                    if not await hosted.hibernate():
+                        continue  # a client connected in the meantime
+                    ctx = None
+                    gc.collect()
+                    try:
+                        await asyncio.wait_for(hosted.woken.wait(), max(timeout, 0))
+                    except asyncio.TimeoutError:
+                        hosted.close()
+                        logger.info("Shutting down due to inactivity.")
+                        break
 
             except (KeyboardInterrupt, SystemExit):
-                if ctx.saving:
+                ctx = hosted and hosted.ctx
+                if ctx and ctx.saving:
                     ctx._save(True)
                     setattr(asyncio.current_task(), "save", None)
             except Exception as e:
@@ -351,30 +603,51 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logger.exception(e)
                 raise
             else:
-                if ctx.saving:
+                ctx = hosted.ctx
+                if ctx and ctx.saving:
                     ctx._save(True)
                     setattr(asyncio.current_task(), "save", None)
             finally:
                 try:
-                    ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
-                    ctx.exit_event.set()  # make sure the saving thread stops at some point
+                    command_poller.remove(room_id)
+                    ctx = hosted and hosted.ctx
+                    if ctx:
+                        ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
+                        ctx.exit_event.set()  # make sure the saving thread stops at some point
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
 
-                    if ctx.server and hasattr(ctx.server, "ws_server"):
-                        ctx.server.ws_server.close()
-                        await ctx.server.ws_server.wait_closed()
+                    room_server = hosted and hosted.server
+                    if room_server and hasattr(room_server, "ws_server"):
+                        room_server.ws_server.close()
+                        await room_server.ws_server.wait_closed()
 
                     with db_session:
                         # ensure the Room does not spin up again on its own, minute of safety buffer
                         room = Room.get(id=room_id)
                         room.last_activity = Utils.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+                        # commands that came in after the last poll would otherwise wait for the room's next start
+                        select(command for command in Command if command.room == room).delete(bulk=True)
                     del room
-                    tear_down_logging(room_id)
+                    # closing waits for the log writer to get to the room's last records
+                    await asyncio.to_thread(tear_down_logging, room_id)
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
+                    hosted_rooms.discard(room_id)
                     await asyncio.sleep(5)
                     rooms_shutting_down.put(room_id)
 
+    async def report_status():
+        try:
+            import psutil
+        except ImportError:
+            process = None
+        else:
+            process = psutil.Process()
+        while True:
+            status[0] = process.memory_info().rss if process else 0
+            status[1] = len(hosted_rooms)
+            await asyncio.sleep(5)
+
     class Starter(threading.Thread):
         _tasks: typing.List[asyncio.Future]
 
@@ -399,6 +672,10 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    # the loop only keeps weak references to tasks
+    background_tasks = [loop.create_task(command_poller.run())]
+    if status is not None:
+        background_tasks.append(loop.create_task(report_status()))
     try:
         loop.run_forever()
     finally:
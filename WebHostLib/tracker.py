@@ -1,5 +1,7 @@
 import datetime
 import collections
+import functools
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -12,10 +14,13 @@ from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict, utcnow
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Number of decoded seeds and room saves kept around for TrackerData across requests.
+TRACKER_SEED_CACHE_SIZE = 16
+TRACKER_SAVE_CACHE_SIZE = 64
 
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
@@ -40,12 +45,76 @@ def _cache_results(func: Callable) -> Callable:
     return method_wrapper
 
 
+class SeedData(NamedTuple):
+    """The parts of TrackerData that only depend on the seed."""
+    multidata: Dict[str, Any]
+    item_name_to_id: Dict[str, Dict[str, int]]
+    location_name_to_id: Dict[str, Dict[str, int]]
+    item_id_to_name: Dict[str, Dict[int, str]]
+    location_id_to_name: Dict[str, Dict[int, str]]
+
+
+@functools.lru_cache(maxsize=TRACKER_SEED_CACHE_SIZE)
+def load_seed_data(seed_id: UUID) -> SeedData:
+    """Decodes the multidata of a seed and builds the lookup tables of its games, once per process while cached.
+    Has to be called within a db_session."""
+    multidata = Context.decompress(Seed.get(id=seed_id).multidata)
+    seed_data = SeedData(multidata, {}, {}, {}, {})
+
+    # Generate inverse lookup tables from data package, useful for trackers.
+    for game, game_package in multidata["datapackage"].items():
+        game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
+        seed_data.item_id_to_name[game] = {id: name for name, id in game_package["item_name_to_id"].items()}
+        seed_data.location_id_to_name[game] = {id: name for name, id in game_package["location_name_to_id"].items()}
+
+        # Normal lookup tables as well.
+        seed_data.item_name_to_id[game] = game_package["item_name_to_id"]
+        seed_data.location_name_to_id[game] = game_package["location_name_to_id"]
+    return seed_data
+
+
+def _id_to_name_lookup(tables: Dict[str, Dict[int, str]], kind: str) -> Dict[str, Dict[int, str]]:
+    """Looks up names by game and id with placeholder names for unknown ones, for a single TrackerData.
+    The table of a game is copied from the shared tables on first use, so placeholders are not added to those."""
+    def game_lookup(game_name: str) -> Dict[int, str]:
+        if game_name in tables:
+            return KeyedDefaultDict(lambda code: f"Unknown {kind} (ID: {code})", tables[game_name])
+        return {game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - {kind} (ID: {code})")}
+
+    return KeyedDefaultDict(game_lookup)
+
+
+_room_saves: "collections.OrderedDict[UUID, Tuple[bytes, Dict[str, Any]]]" = collections.OrderedDict()
+_room_saves_lock = threading.Lock()
+
+
+def load_room_save(room: Room) -> Dict[str, Any]:
+    """Unpickles the multisave of a room, reusing the previous result for as long as the save stays the same."""
+    multisave = room.multisave
+    if not multisave:
+        return {}
+    with _room_saves_lock:
+        cached = _room_saves.get(room.id)
+        if cached and cached[0] == multisave:
+            _room_saves.move_to_end(room.id)
+            return cached[1]
+    save = restricted_loads(multisave)
+    with _room_saves_lock:
+        _room_saves[room.id] = multisave, save
+        _room_saves.move_to_end(room.id)
+        while len(_room_saves) > TRACKER_SAVE_CACHE_SIZE:
+            _room_saves.popitem(last=False)
+    return save
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    The decoded multidata, multisave and name to id tables are shared with other instances and must not be modified.
+    The id to name lookups add placeholders for unknown ids and are built per instance.
     """
     room: Room
     _multidata: Dict[str, Any]
@@ -55,30 +124,16 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        seed_data = load_seed_data(room.seed.id)
+        self._multidata = seed_data.multidata
+        self._multisave = load_room_save(room)
         self._tracker_cache = {}
 
-        self.item_name_to_id: Dict[str, Dict[str, int]] = {}
-        self.location_name_to_id: Dict[str, Dict[str, int]] = {}
-
-        # Generate inverse lookup tables from data package, useful for trackers.
-        self.item_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
-        })
-        self.location_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
-        })
-        for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
-
-            # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+        self.item_name_to_id: Dict[str, Dict[str, int]] = seed_data.item_name_to_id
+        self.location_name_to_id: Dict[str, Dict[str, int]] = seed_data.location_name_to_id
+        self.item_id_to_name: Dict[str, Dict[int, str]] = _id_to_name_lookup(seed_data.item_id_to_name, "Item")
+        self.location_id_to_name: Dict[str, Dict[int, str]] = _id_to_name_lookup(seed_data.location_id_to_name,
+                                                                                 "Location")
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
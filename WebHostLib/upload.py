@@ -13,7 +13,7 @@ from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
-from NetUtils import GamesPackage, SlotType
+from NetUtils import GamesPackage, SlotType, encode_multidata
 from Utils import VersionException, __version__
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
@@ -90,7 +90,11 @@ def process_multidata(compressed_multidata, files={}):
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    if compressed_multidata[0] < 4:
+        # keep the format of older multidata, in case anything else reads it back
+        compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(dict(decompressed_multidata)), 9)
+    else:
+        compressed_multidata = encode_multidata(decompressed_multidata)
     return slots, compressed_multidata
 
 
@@ -11,10 +11,13 @@ This is deliberately .pyx because using a non-compiled "pure python" may be slow
 import cython
 import warnings
 from cpython cimport PyObject
+from cpython.mem cimport PyMem_Calloc, PyMem_Free
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
-from libc.stdint cimport int64_t, uint32_t
+from libc.stdint cimport int64_t, uint32_t, uint64_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
+from collections.abc import MutableSet
 
 cdef extern from *:
     """
@@ -69,6 +72,25 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ReceiverEntry:
+    ap_id_t item
+    size_t position  # index into LocationStore.entries
+    ap_player_t receiver
+
+
+cdef int compare_receiver_entries(const void* a, const void* b) noexcept nogil:
+    # order by receiver, then item, then position, so a receiver's entries for an item are a slice in entries order
+    cdef const ReceiverEntry* x = <const ReceiverEntry*>a
+    cdef const ReceiverEntry* y = <const ReceiverEntry*>b
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    if x.position != y.position:
+        return -1 if x.position < y.position else 1
+    return 0
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -96,11 +118,17 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    # built on first use by find_item and get_for_player
+    cdef ReceiverEntry* receiver_entries  # 2.4MB/100k items, sorted by receiver, item and position
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, slice of receiver_entries per receiver
+    cdef size_t receiver_index_size
 
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
                 + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+        if self.receiver_index:
+            size += sizeof(ReceiverEntry) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -215,57 +243,109 @@ cdef class LocationStore:
         return self._items
 
     # specialized accessors
+    cdef void _build_receiver_index(self) except *:
+        cdef size_t i
+        cdef ap_player_t receiver
+        cdef ap_player_t max_receiver = 0
+        for i in range(self.entry_count):
+            max_receiver = max(max_receiver, self.entries[i].receiver)
+        if self.entry_count:
+            self.receiver_entries = <ReceiverEntry*>self._mem.alloc(self.entry_count, sizeof(ReceiverEntry))
+            for i in range(self.entry_count):
+                self.receiver_entries[i].receiver = self.entries[i].receiver
+                self.receiver_entries[i].item = self.entries[i].item
+                self.receiver_entries[i].position = i
+            qsort(self.receiver_entries, self.entry_count, sizeof(ReceiverEntry), compare_receiver_entries)
+        receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
+        for i in range(self.entry_count):
+            receiver = self.receiver_entries[i].receiver
+            if not receiver_index[receiver].count:
+                receiver_index[receiver].start = i
+            receiver_index[receiver].count += 1
+        self.receiver_index_size = max_receiver + 1
+        self.receiver_index = receiver_index  # set last, a non-NULL index is complete
+
+    cdef IndexEntry _find_received(self, ap_player_t receiver, ap_id_t item) nogil:
+        # binary search for the slice of receiver_entries for item within the slice of receiver
+        cdef IndexEntry result
+        cdef size_t low = self.receiver_index[receiver].start
+        cdef size_t high = low + self.receiver_index[receiver].count
+        cdef size_t end = high
+        cdef size_t middle
+        while low < high:
+            middle = (low + high) // 2
+            if self.receiver_entries[middle].item < item:
+                low = middle + 1
+            else:
+                high = middle
+        result.start = low
+        while high < end and self.receiver_entries[high].item == item:
+            high += 1
+        result.count = high - low
+        return result
+
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
-        cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef IndexEntry found
+        cdef LocationEntry* entry
+        cdef size_t i
+        cdef list positions = []
+        if not self.receiver_index:
+            self._build_receiver_index()
+        for receiver in slots:
+            if 0 < receiver < self.receiver_index_size:
+                found = self._find_received(receiver, item)
+                for i in range(found.start, found.start + found.count):
+                    positions.append(self.receiver_entries[i].position)
+        if len(slots) > 1:
+            positions.sort()  # yield in the order of entries, same as for a single slot
+        for i in positions:
+            entry = &self.entries[i]
+            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
+        cdef LocationEntry* entry
+        cdef size_t i
+        cdef size_t start
+        cdef size_t count
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if not self.receiver_index:
+            self._build_receiver_index()
+        if not 0 < slot < self.receiver_index_size:
+            return all_locations
+        start = self.receiver_index[<size_t>slot].start
+        count = self.receiver_index[<size_t>slot].count
+        # positions are sorted per item, sort them to add senders in the order of entries
+        for i in sorted([self.receiver_entries[i].position for i in range(start, start + count)]):
+            entry = &self.entries[i]
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
         return all_locations
 
+    def new_checks(self, slot: int) -> LocationChecks:
+        """Returns an empty set of checked locations for slot, stored as a bitset over the entries of the slot."""
+        cdef ap_player_t sender = slot
+        if sender < 1 or sender >= self.sender_index_size:
+            raise KeyError(slot)
+        return LocationChecks(self, sender)
+
+    cdef bint _is_own_checks(self, object checked):
+        return isinstance(checked, LocationChecks) and (<LocationChecks>checked)._store is self
+
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
 
+        cdef object state_checked = state[team, slot]
+        if self._is_own_checks(state_checked):
+            return (<LocationChecks>state_checked)._locations(True)
+
         # This used to validate checks actually exist. A remnant from the past.
         # If the order of locations becomes relevant at some point, we could not do sorted(set), so leaving it.
-        cdef set checked = state[team, slot]
+        cdef set checked = state_checked
 
         if not len(checked):
             # Skips loop if none have been checked.
@@ -285,7 +365,10 @@ cdef class LocationStore:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
-        cdef set checked = state[team, slot]
+        cdef object state_checked = state[team, slot]
+        if self._is_own_checks(state_checked):
+            return (<LocationChecks>state_checked)._locations(False)
+        cdef set checked = state_checked
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
         if not len(checked):
@@ -304,7 +387,10 @@ cdef class LocationStore:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
             raise KeyError(slot)
-        cdef set checked = state[team, slot]
+        cdef object state_checked = state[team, slot]
+        if self._is_own_checks(state_checked):
+            return (<LocationChecks>state_checked)._remaining()
+        cdef set checked = state_checked
         cdef size_t start = self.sender_index[sender].start
         cdef size_t count = self.sender_index[sender].count
         return sorted([(entry.receiver, entry.item) for
@@ -376,3 +462,126 @@ cdef class PlayerLocationProxy:
         count = self._store.sender_index[self._player].count
         for entry in self._store.entries[start:start+count]:
             yield entry.location, (entry.item, entry.receiver, entry.flags)
+
+
+@cython.auto_pickle(False)
+@cython.internal  # created by LocationStore.new_checks
+cdef class LocationChecks:
+    """Checked locations of a slot, stored as one bit per entry of the slot in a LocationStore"""
+    # Replaces a set of location IDs (~60 bytes per location) with 1 bit per location.
+    # Bits are in entry order, so checked/missing locations are a scan over the bits and entries.
+
+    cdef LocationStore _store
+    cdef LocationEntry* _entries  # entries of the slot, sorted by location
+    cdef size_t _count
+    cdef uint64_t* _bits
+    cdef size_t _len
+
+    def __init__(self, LocationStore store, ap_player_t slot) -> None:
+        self._store = store
+        self._entries = store.entries + store.sender_index[slot].start
+        self._count = store.sender_index[slot].count
+        self._len = 0
+        if self._count:
+            self._bits = <uint64_t*>PyMem_Calloc((self._count + 63) // 64, sizeof(uint64_t))
+            if not self._bits:
+                raise MemoryError()
+
+    def __dealloc__(self) -> None:
+        PyMem_Free(self._bits)
+
+    cdef Py_ssize_t _find(self, object location):
+        # binary search for the entry of location, -1 if the slot has no such location
+        cdef ap_id_t loc
+        cdef size_t l = 0
+        cdef size_t r = self._count
+        cdef size_t m
+        if not isinstance(location, int):
+            return -1
+        try:
+            loc = location
+        except OverflowError:
+            return -1
+        while l < r:
+            m = (l + r) // 2
+            if self._entries[m].location < loc:
+                l = m + 1
+            else:
+                r = m
+        if l < self._count and self._entries[l].location == loc:
+            return l
+        return -1
+
+    cdef inline bint _test(self, size_t i):
+        return (self._bits[i >> 6] >> (i & 63)) & 1
+
+    cdef inline void _set(self, size_t i):
+        if not self._test(i):
+            self._bits[i >> 6] |= (<uint64_t>1) << (i & 63)
+            self._len += 1
+
+    cdef list _locations(self, bint checked):
+        cdef size_t i
+        return [self._entries[i].location for i in range(self._count) if self._test(i) == checked]
+
+    cdef list _remaining(self):
+        cdef size_t i
+        return sorted([(self._entries[i].receiver, self._entries[i].item) for i in range(self._count)
+                       if not self._test(i)])
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, location) -> bool:
+        cdef Py_ssize_t i = self._find(location)
+        return i >= 0 and self._test(i)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._locations(True))
+
+    def add(self, location) -> None:
+        cdef Py_ssize_t i = self._find(location)
+        if i < 0:
+            raise KeyError(location)
+        self._set(i)
+
+    def discard(self, location) -> None:
+        cdef Py_ssize_t i = self._find(location)
+        if i >= 0 and self._test(i):
+            self._bits[i >> 6] &= ~((<uint64_t>1) << (i & 63))
+            self._len -= 1
+
+    def update(self, *others: Iterable[int]) -> None:
+        """Adds all locations of others, ignoring location IDs that do not belong to the slot."""
+        cdef Py_ssize_t i
+        for other in others:
+            for location in other:
+                i = self._find(location)
+                if i >= 0:
+                    self._set(i)
+
+    def __ior__(self, other: Iterable[int]) -> LocationChecks:
+        self.update(other)
+        return self
+
+    def __sub__(self, other: Iterable[int]) -> Set[int]:
+        return set(self).difference(other)
+
+    def __rsub__(self, other: Iterable[int]) -> Set[int]:
+        return {location for location in other if location not in self}
+
+    def __eq__(self, other):
+        if not isinstance(other, (set, frozenset, LocationChecks)):
+            return NotImplemented
+        return len(self) == len(other) and all(location in self for location in other)
+
+    def __repr__(self) -> str:
+        return f"LocationChecks({set(self)})"
+
+    def get_size(self) -> int:
+        from sys import getsizeof
+        return getsizeof(self) + sizeof(uint64_t) * ((self._count + 63) // 64)
+
+
+MutableSet.register(LocationChecks)
+
@@ -1,9 +1,10 @@
 from collections import defaultdict
+from collections.abc import Iterable
 from typing import ClassVar, cast
 
 from typing_extensions import override
 
-from BaseClasses import CollectionState, Item, MultiWorld, Region
+from BaseClasses import CollectionRule, CollectionState, Entrance, Item, MultiWorld, Region
 from worlds.AutoWorld import LogicMixin, World
 
 from .rules import Rule
@@ -24,6 +25,10 @@ class CachedRuleBuilderWorld(World):
     rule_entrance_dependencies: dict[str, set[int]]
     """A mapping of entrance name to set of rule ids"""
 
+    connection_item_dependencies: dict[int, tuple[CollectionRule, frozenset[str] | None]]
+    """A mapping of entrance rule id to the rule and the item names it depends on,
+    or None if it has to be checked for any item. Holding the rule keeps its id from being reused."""
+
     item_mapping: ClassVar[dict[str, str]] = {}
     """A mapping of actual item name to logical item name.
     Useful when there are multiple versions of a collected item but the logic only uses one. For example:
@@ -38,6 +43,7 @@ class CachedRuleBuilderWorld(World):
         self.rule_region_dependencies = defaultdict(set)
         self.rule_location_dependencies = defaultdict(set)
         self.rule_entrance_dependencies = defaultdict(set)
+        self.connection_item_dependencies = {}
 
     @override
     def register_rule_dependencies(self, resolved_rule: Rule.Resolved) -> None:
@@ -76,17 +82,43 @@ class CachedRuleBuilderWorld(World):
             for region_name in entrance.access_rule.region_dependencies():
                 self.rule_region_dependencies[region_name] |= rule_ids
 
+    def get_connection_item_dependencies(self, rule: CollectionRule) -> frozenset[str] | None:
+        """Returns the item names an entrance rule depends on, or None if it has to be checked for any item"""
+        entry = self.connection_item_dependencies.get(id(rule))
+        if entry is not None and entry[0] is rule:
+            return entry[1]
+        dependencies: frozenset[str] | None
+        if not isinstance(rule, Rule.Resolved):
+            dependencies = None
+        elif rule.force_recalculate or rule.location_dependencies() or rule.entrance_dependencies():
+            # the result of these rules can change without collecting any of their own items
+            dependencies = None
+        else:
+            # region dependencies are covered by indirect conditions
+            dependencies = frozenset(rule.item_dependencies())
+        self.connection_item_dependencies[id(rule)] = rule, dependencies
+        return dependencies
+
     @override
     def collect(self, state: CollectionState, item: Item) -> bool:
         changed = super().collect(state, item)
+        mapped_name = self.item_mapping.get(item.name, "")
         if changed and self.rule_item_dependencies:
             player_results = cast(dict[int, bool], state.rule_builder_cache[self.player])  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
-            mapped_name = self.item_mapping.get(item.name, "")
             rule_ids = self.rule_item_dependencies[item.name] | self.rule_item_dependencies[mapped_name]
             for rule_id in rule_ids:
                 if player_results.get(rule_id, None) is False:
                     del player_results[rule_id]
 
+        # track collected item names so only the connections depending on them have to be checked again
+        stale = state.stale[self.player]
+        if stale is False:
+            stale = state.stale[self.player] = set()
+        if changed and stale is not True:
+            stale.add(item.name)
+            if mapped_name:
+                stale.add(mapped_name)
+
         return changed
 
     @override
@@ -122,6 +154,21 @@ class CachedRuleBuilderWorld(World):
 
         return changed
 
+    @override
+    def get_connections_to_recheck(self, state: CollectionState, item_names: set[str]) -> Iterable[Entrance]:
+        connection_item_dependencies = self.connection_item_dependencies
+        connections: list[Entrance] = []
+        for connection in state.blocked_connections[self.player]:
+            rule = connection.access_rule
+            entry = connection_item_dependencies.get(id(rule))
+            if entry is not None and entry[0] is rule:
+                dependencies = entry[1]
+            else:
+                dependencies = self.get_connection_item_dependencies(rule)
+            if dependencies is None or not dependencies.isdisjoint(item_names):
+                connections.append(connection)
+        return connections
+
     @override
     def reached_region(self, state: CollectionState, region: Region) -> None:
         super().reached_region(state, region)
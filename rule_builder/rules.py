@@ -32,6 +32,80 @@ def _create_hash_fn(resolved_rule_cls: "CustomRuleRegister") -> Callable[..., in
     return hash_impl
 
 
+class RuleCompiler:
+    """Generates a single function that evaluates a whole resolved rule tree.
+    Rules that implement _compile are inlined as expressions with their names and counts as literals,
+    any other rule is called through its bound _evaluate."""
+
+    constants: dict[str, Any]
+    """Values bound to names in the generated function"""
+
+    item_players: set[int]
+    """Players whose prog_items lookup is hoisted to the start of the generated function"""
+
+    def __init__(self) -> None:
+        self.constants = {}
+        self.item_players = set()
+
+    def constant(self, value: Any) -> str:
+        """Binds a value to a name usable in the generated expressions and returns the name"""
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def item_count(self, item_name: str, player: int) -> str:
+        """Returns an expression for the amount of an item the player has"""
+        self.item_players.add(player)
+        return f"_get{player}({item_name!r}, 0)"
+
+    def expression(self, rule: "Rule.Resolved") -> str:
+        """Returns an expression for the result of the given rule, including its caching"""
+        if type(rule).__call__ is not Rule.Resolved.__call__:
+            return f"{self.constant(rule)}(state)"
+        expression = rule._compile(self) if self._can_inline(type(rule)) else None  # pyright: ignore[reportPrivateUsage]
+        if expression is None:
+            expression = f"{self.constant(rule._evaluate)}(state)"  # pyright: ignore[reportPrivateUsage]
+        if rule.caching_enabled:
+            expression = (
+                f"(_r if (_r := state.rule_builder_cache[{rule.player}].get({id(rule)})) is not None "
+                f"else _store(state, {rule.player}, {id(rule)}, {expression}))"
+            )
+        return f"({expression})"
+
+    @staticmethod
+    def _can_inline(rule_cls: type) -> bool:
+        # a subclass overriding _evaluate without _compile has to be evaluated as written
+        for cls in rule_cls.__mro__:
+            if "_compile" in cls.__dict__ or "_evaluate" in cls.__dict__:
+                return "_compile" in cls.__dict__ and "_evaluate" in cls.__dict__
+        return False
+
+    def build(self, rule: "Rule.Resolved") -> Callable[[CollectionState], bool]:
+        """Returns a function evaluating the given rule in the same way as calling it"""
+        expression = self.expression(rule)
+        body = [f"        _get{player} = state.prog_items[{player}].get" for player in sorted(self.item_players)]
+        names = ", ".join(["_store", *self.constants])
+        source = "\n".join(
+            [
+                f"def _make({names}):",
+                "    def evaluate(state):",
+                *body,
+                f"        return {expression}",
+                "    return evaluate",
+            ]
+        )
+        namespace: dict[str, Any] = {}
+        exec(compile(source, f"<compiled rule {rule}>", "exec"), namespace)
+        function = namespace["_make"](_store_result, *self.constants.values())
+        function.__qualname__ = f"{type(rule).__qualname__}.compiled"
+        return function
+
+
+def _store_result(state: CollectionState, player: int, rule_id: int, result: bool) -> bool:
+    state.rule_builder_cache[player][rule_id] = result  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    return result
+
+
 @dataclass_transform(frozen_default=True, field_specifiers=(dataclasses.field, dataclasses.Field))
 class CustomRuleRegister(type):
     """A metaclass to contain world custom rules and automatically convert resolved rules to frozen dataclasses"""
@@ -237,6 +311,10 @@ class Rule(Generic[TWorld]):
 
         def __call__(self, state: CollectionState) -> bool:
             """Evaluate this rule's result with the given state, using the cached value if possible"""
+            return self._call(state)
+
+        def _call(self, state: CollectionState) -> bool:
+            # replaced on the instance by compile
             if not self.caching_enabled:
                 return self._evaluate(state)
 
@@ -253,6 +331,16 @@ class Rule(Generic[TWorld]):
             """Calculate this rule's result with the given state"""
             ...
 
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            """Returns a Python expression that calculates the same result as _evaluate from `state`,
+            or None to call _evaluate instead. Must be overridden together with _evaluate."""
+            return None
+
+        def compile(self) -> None:
+            """Replaces the evaluation of this rule with a single generated function for its whole rule tree"""
+            if "_call" not in self.__dict__ and type(self).__call__ is Rule.Resolved.__call__:
+                object.__setattr__(self, "_call", RuleCompiler().build(self))
+
         def item_dependencies(self) -> dict[str, set[int]]:
             """Returns a mapping of item name to set of object ids, used for cache invalidation"""
             return {}
@@ -295,6 +383,10 @@ class True_(Rule[TWorld], game="Archipelago"):  # noqa: N801
         def _evaluate(self, state: CollectionState) -> bool:
             return True
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return "True"
+
         @override
         def explain_json(self, state: CollectionState | None = None) -> list[JSONMessagePart]:
             return [{"type": "color", "color": "green", "text": "True"}]
@@ -316,6 +408,10 @@ class False_(Rule[TWorld], game="Archipelago"):  # noqa: N801
         def _evaluate(self, state: CollectionState) -> bool:
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return "False"
+
         @override
         def explain_json(self, state: CollectionState | None = None) -> list[JSONMessagePart]:
             return [{"type": "color", "color": "salmon", "text": "False"}]
@@ -492,6 +588,10 @@ class And(NestedRule[TWorld], game="Archipelago"):
                     return False
             return True
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return " and ".join(compiler.expression(rule) for rule in self.children) or "True"
+
         @override
         def explain_json(self, state: CollectionState | None = None) -> list[JSONMessagePart]:
             messages: list[JSONMessagePart] = [{"type": "text", "text": "("}]
@@ -576,6 +676,10 @@ class Or(NestedRule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return " or ".join(compiler.expression(rule) for rule in self.children) or "False"
+
         @override
         def explain_json(self, state: CollectionState | None = None) -> list[JSONMessagePart]:
             messages: list[JSONMessagePart] = [{"type": "text", "text": "("}]
@@ -647,6 +751,10 @@ class WrapperRule(Rule[TWorld], game="Archipelago"):
         def _evaluate(self, state: CollectionState) -> bool:
             return self.child(state)
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return compiler.expression(self.child)
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             deps: dict[str, set[int]] = {}
@@ -735,6 +843,10 @@ class Has(Rule[TWorld], game="Archipelago"):
             # implementation based on state.has
             return state.prog_items[self.player][self.item_name] >= self.count
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return f"{compiler.item_count(self.item_name, self.player)} >= {self.count}"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {self.item_name: set()}
@@ -822,6 +934,11 @@ class HasAll(Rule[TWorld], game="Archipelago"):
                     return False
             return True
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (f"{compiler.item_count(item, self.player)} > 0" for item in self.item_names)
+            return " and ".join(counts) or "True"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item in self.item_names}
@@ -940,6 +1057,11 @@ class HasAny(Rule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (f"{compiler.item_count(item, self.player)} > 0" for item in self.item_names)
+            return " or ".join(counts) or "False"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item in self.item_names}
@@ -1060,6 +1182,11 @@ class HasAllCounts(Rule[TWorld], game="Archipelago"):
                     return False
             return True
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (f"{compiler.item_count(item, self.player)} >= {count}" for item, count in self.item_counts)
+            return " and ".join(counts) or "True"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item, _ in self.item_counts}
@@ -1183,6 +1310,11 @@ class HasAnyCount(Rule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (f"{compiler.item_count(item, self.player)} >= {count}" for item, count in self.item_counts)
+            return " or ".join(counts) or "False"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item, _ in self.item_counts}
@@ -1313,6 +1445,11 @@ class HasFromList(Rule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (compiler.item_count(item, self.player) for item in self.item_names)
+            return f"{' + '.join(counts)} >= {self.count}" if self.item_names else "False"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item in self.item_names}
@@ -1448,6 +1585,11 @@ class HasFromListUnique(Rule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (f"({compiler.item_count(item, self.player)} > 0)" for item in self.item_names)
+            return f"{' + '.join(counts)} >= {self.count}" if self.item_names else "False"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item in self.item_names}
@@ -1557,6 +1699,11 @@ class HasGroup(Rule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (compiler.item_count(item, self.player) for item in self.item_names)
+            return f"{' + '.join(counts)} >= {self.count}" if self.item_names else "False"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item in self.item_names}
@@ -1631,6 +1778,11 @@ class HasGroupUnique(Rule[TWorld], game="Archipelago"):
                     return True
             return False
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            counts = (f"({compiler.item_count(item, self.player)} > 0)" for item in self.item_names)
+            return f"{' + '.join(counts)} >= {self.count}" if self.item_names else "False"
+
         @override
         def item_dependencies(self) -> dict[str, set[int]]:
             return {item: {id(self)} for item in self.item_names}
@@ -1704,6 +1856,10 @@ class CanReachLocation(Rule[TWorld], game="Archipelago"):
         def _evaluate(self, state: CollectionState) -> bool:
             return state.can_reach_location(self.location_name, self.player)
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return f"state.can_reach_location({self.location_name!r}, {self.player})"
+
         @override
         def region_dependencies(self) -> dict[str, set[int]]:
             if self.parent_region_name:
@@ -1766,6 +1922,10 @@ class CanReachRegion(Rule[TWorld], game="Archipelago"):
         def _evaluate(self, state: CollectionState) -> bool:
             return state.can_reach_region(self.region_name, self.player)
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return f"state.can_reach_region({self.region_name!r}, {self.player})"
+
         @override
         def region_dependencies(self) -> dict[str, set[int]]:
             return {self.region_name: {id(self)}}
@@ -1833,6 +1993,10 @@ class CanReachEntrance(Rule[TWorld], game="Archipelago"):
         def _evaluate(self, state: CollectionState) -> bool:
             return state.can_reach_entrance(self.entrance_name, self.player)
 
+        @override
+        def _compile(self, compiler: RuleCompiler) -> str | None:
+            return f"state.can_reach_entrance({self.entrance_name!r}, {self.player})"
+
         @override
         def region_dependencies(self) -> dict[str, set[int]]:
             if self.parent_region_name:
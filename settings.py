@@ -609,6 +609,9 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class MetricsInterval(int):
+        """Log command timings, event loop lag and traffic every this many seconds, 0 to disable"""
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
@@ -628,6 +631,7 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    metrics_interval: MetricsInterval = MetricsInterval(0)
 
 
 class GeneratorOptions(Group):
@@ -687,6 +691,12 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class SweepWorkers(int):
+        """
+        Number of worker processes that check which locations are reachable during fill and progression balancing.
+        0 or 1 checks them in the generating process. Only supported where processes can be forked, such as Linux.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -696,6 +706,7 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    sweep_workers: SweepWorkers = SweepWorkers(0)
     loglevel: str = "info"
     logtime: bool = False
 
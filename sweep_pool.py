@@ -0,0 +1,285 @@
+"""
+Sweeping for advancements with the reachability checks split over forked worker processes.
+
+Workers are forked with a snapshot of the multiworld, so regions, entrances, locations and their rules must not change
+while a SweepPool is in use. At the start of a sweep, each worker receives a copy of the state and the locations of the
+players assigned to it. After that, only the items collected by each sweep iteration are sent, which the workers collect
+into their copy of the state, and the reachable locations are sent back.
+"""
+import heapq
+import io
+import logging
+import multiprocessing
+import pickle
+import traceback
+from collections import defaultdict
+from contextlib import contextmanager
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from BaseClasses import CollectionState, Item, Location, MultiWorld
+
+_objects: List[Any] = []
+"""Objects of the multiworld that are sent by index instead of by value, shared with the workers by forking."""
+_indices: Dict[int, int] = {}
+"""id() of each object in _objects to its index."""
+
+_state_attributes = frozenset({"multiworld", "prog_items", "reachable_regions", "blocked_connections", "advancements",
+                               "path", "locations_checked", "stale", "allow_partial_entrances"})
+"""Attributes of CollectionState that are not sent as is. Anything else is added by worlds and sent along."""
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj: Any) -> Optional[int]:
+        return _indices.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid: int) -> Any:
+        return _objects[pid]
+
+
+def _dumps(obj: Any) -> bytes:
+    file = io.BytesIO()
+    _Pickler(file, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return file.getvalue()
+
+
+def _loads(data: bytes) -> Any:
+    return _Unpickler(io.BytesIO(data)).load()
+
+
+class _Worker:
+    """The part of a SweepPool that runs in each worker process."""
+    state: Optional[CollectionState]
+    pending: Dict[int, List[Location]]
+    """Locations of the players assigned to this worker that were not reachable yet."""
+
+    def __init__(self) -> None:
+        self.state = None
+        self.pending = {}
+
+    def start(self, prog_items: Dict[int, Any], extra_attributes: Dict[str, Any], allow_partial_entrances: bool,
+              pending: Dict[int, List[Location]]) -> None:
+        multiworld: MultiWorld = _objects[0]
+        # skip __init__, to not collect precollected items again
+        state = CollectionState.__new__(CollectionState)
+        state.multiworld = multiworld
+        state.prog_items = prog_items
+        state.reachable_regions = {player: set() for player in multiworld.get_all_ids()}
+        state.blocked_connections = {player: set() for player in multiworld.get_all_ids()}
+        state.advancements = set()
+        state.path = {}
+        state.locations_checked = set()
+        state.stale = {player: True for player in multiworld.get_all_ids()}
+        state.allow_partial_entrances = allow_partial_entrances
+        for function in state.additional_init_functions:
+            function(state, multiworld)
+        for name, value in extra_attributes.items():
+            current = getattr(state, name, None)
+            if isinstance(current, defaultdict):
+                # keep the default factory, which can't be pickled if it's a lambda
+                current.update(value)
+            else:
+                setattr(state, name, value)
+        self.state = state
+        self.pending = pending
+
+    def check(self, collected: List[Tuple[Item, Location]], players: Set[int]) -> Dict[int, List[int]]:
+        """Collects the items of the previous sweep iteration and returns the reachable locations of players."""
+        assert self.state
+        for item, location in collected:
+            self.state.collect(item, True, location)
+        reachable_per_player: Dict[int, List[int]] = {}
+        for player in players.intersection(self.pending):
+            reachable: List[int] = []
+            unreachable: List[Location] = []
+            for index, location in enumerate(self.pending[player]):
+                if location.can_reach(self.state):
+                    reachable.append(index)
+                else:
+                    unreachable.append(location)
+            if reachable:
+                reachable_per_player[player] = reachable
+                self.pending[player] = unreachable
+        return reachable_per_player
+
+    def finish(self, collected: List[Tuple[Item, Location]]) \
+            -> Tuple[Dict[int, Any], Dict[Any, Any], Dict[str, Dict[int, Any]]]:
+        """Collects the remaining items and returns the region caches of the players assigned to this worker, and the
+        paths to the regions and entrances it reached."""
+        assert self.state
+        state = self.state
+        for item, location in collected:
+            state.collect(item, True, location)
+        regions = {player: (state.reachable_regions[player], state.blocked_connections[player], state.stale[player])
+                   for player in self.pending}
+        # worlds usually keep their own caches in dictionaries by player, so those are sent back as well
+        player_attributes: Dict[str, Dict[int, Any]] = {}
+        for name, value in state.__dict__.items():
+            if name not in _state_attributes and isinstance(value, dict):
+                player_attributes[name] = {player: value[player] for player in self.pending if player in value}
+        self.state = None
+        self.pending = {}
+        return regions, state.path, player_attributes
+
+    @classmethod
+    def run(cls, connection: Connection) -> None:
+        worker = cls()
+        while True:
+            command, args = _loads(connection.recv_bytes())
+            if command == "stop":
+                return
+            try:
+                result = getattr(worker, command)(*args)
+            except BaseException:
+                connection.send_bytes(_dumps(("error", traceback.format_exc())))
+            else:
+                connection.send_bytes(_dumps(("ok", result)))
+
+
+class SweepPool:
+    """
+    Worker processes forked with a snapshot of a multiworld, which check the locations of a sweep for all players of an
+    iteration at once. Create it through parallel_sweeps.
+    """
+    min_locations: int = 1000
+    """Sweeps of fewer locations are not worth sending to the workers and are run in-process."""
+
+    _connections: List[Connection]
+    _processes: List[multiprocessing.process.BaseProcess]
+
+    def __init__(self, multiworld: MultiWorld, workers: int) -> None:
+        _objects[:] = [multiworld, *multiworld.get_regions(), *multiworld.get_entrances(), *multiworld.get_locations(),
+                       *multiworld.itempool, *(location.item for location in multiworld.get_filled_locations()),
+                       *(item for items in multiworld.precollected_items.values() for item in items)]
+        _indices.clear()
+        _indices.update((id(obj), index) for index, obj in enumerate(_objects))
+        context = multiprocessing.get_context("fork")
+        self._connections = []
+        self._processes = []
+        for _ in range(workers):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=_Worker.run, args=(worker_connection,), daemon=True)
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.send_bytes(_dumps(("stop", ())))
+        for process in self._processes:
+            process.join()
+        _objects.clear()
+        _indices.clear()
+
+    @staticmethod
+    def _call(connections: List[Connection], command: str, args_per_worker: List[Tuple[Any, ...]]) -> List[Any]:
+        messages = [_dumps((command, args)) for args in args_per_worker]
+        for connection, message in zip(connections, messages):
+            connection.send_bytes(message)
+        results: List[Any] = []
+        errors: List[str] = []
+        for connection in connections:
+            status, result = _loads(connection.recv_bytes())
+            if status == "error":
+                errors.append(result)
+            results.append(result)
+        if errors:
+            raise RuntimeError(f"Sweep worker failed to {command}:\n{errors[0]}")
+        return results
+
+    def sweep(self, state: CollectionState, advancements_per_player: List[Tuple[int, List[Location]]]) -> bool:
+        """
+        Sweeps through the given locations like CollectionState.sweep_for_advancements, except that all players of a
+        sweep iteration are checked against the state from before any of the iteration's items were collected.
+
+        :return: False if the sweep is not worth running in the workers, in which case nothing was done.
+        """
+        if len(advancements_per_player) < 2 or \
+                sum(len(locations) for _, locations in advancements_per_player) < self.min_locations:
+            return False
+
+        # distribute players over the workers by their amount of locations, largest first
+        buckets: List[Tuple[int, int, Dict[int, List[Location]]]] = \
+            [(0, worker, {}) for worker in range(len(self._connections))]
+        for player, locations in sorted(advancements_per_player, key=lambda entry: len(entry[1]), reverse=True):
+            load, worker, bucket = heapq.heappop(buckets)
+            bucket[player] = locations
+            heapq.heappush(buckets, (load + len(locations), worker, bucket))
+        buckets = [bucket for bucket in buckets if bucket[2]]
+        connections = [self._connections[worker] for _, worker, _ in buckets]
+        pending_per_worker = [dict(bucket) for _, _, bucket in buckets]
+
+        prog_items = {player: state.prog_items[player] for player in state.multiworld.get_all_ids()}
+        extra_attributes = {name: dict(value) if isinstance(value, defaultdict) else value
+                            for name, value in state.__dict__.items() if name not in _state_attributes}
+        try:
+            self._call(connections, "start", [(prog_items, extra_attributes, state.allow_partial_entrances, pending)
+                                              for pending in pending_per_worker])
+        except (pickle.PicklingError, AttributeError, TypeError) as error:
+            # raised while pickling, before anything was sent
+            logging.warning(f"Could not send state to sweep workers, sweeping in-process instead: {error}")
+            return False
+
+        all_players = {player for player, _ in advancements_per_player}
+        players_to_check = all_players
+        collected: List[Tuple[Item, Location]] = []
+        # see CollectionState._sweep_for_advancements_impl
+        checking_if_finished = False
+        while players_to_check:
+            next_players_to_check: Set[int] = set()
+            results = self._call(connections, "check", [(collected, players_to_check)] * len(connections))
+            collected = []
+            for pending, reachable_per_player in zip(pending_per_worker, results):
+                for player, reachable in reachable_per_player.items():
+                    locations = pending[player]
+                    reachable_set = set(reachable)
+                    pending[player] = [location for index, location in enumerate(locations)
+                                       if index not in reachable_set]
+                    for index in reachable:
+                        advancement = locations[index]
+                        state.advancements.add(advancement)
+                        item = advancement.item
+                        assert isinstance(item, Item), "tried to collect advancement Location with no Item"
+                        collected.append((item, advancement))
+                        if state.collect(item, True, advancement):
+                            next_players_to_check.add(item.player)
+
+            if not next_players_to_check:
+                if not checking_if_finished:
+                    checking_if_finished = True
+                    next_players_to_check = all_players
+            else:
+                checking_if_finished = False
+            players_to_check = next_players_to_check
+
+        for regions, path, player_attributes in self._call(connections, "finish", [(collected,)] * len(connections)):
+            for player, (reachable_regions, blocked_connections, stale) in regions.items():
+                state.reachable_regions[player] = reachable_regions
+                state.blocked_connections[player] = blocked_connections
+                state.stale[player] = stale
+            # paths the state already had stay, as the workers search from the start of each world again
+            for region_or_entrance, path_value in path.items():
+                state.path.setdefault(region_or_entrance, path_value)
+            for name, values in player_attributes.items():
+                getattr(state, name).update(values)
+        return True
+
+
+@contextmanager
+def parallel_sweeps(multiworld: MultiWorld, workers: int) -> Iterator[None]:
+    """
+    Sweeps of the multiworld are run in the given amount of forked worker processes while this context is active.
+    Does nothing for fewer than two workers or where processes can't be forked.
+    """
+    if workers < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        yield
+        return
+    sweep_pool = SweepPool(multiworld, workers)
+    multiworld.sweep_pool = sweep_pool
+    try:
+        yield
+    finally:
+        multiworld.sweep_pool = None
+        sweep_pool.close()
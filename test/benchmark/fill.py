@@ -0,0 +1,101 @@
+def run_fill_benchmark(games: tuple[str, ...] = ("A Link to the Past", "Hollow Knight", "Ocarina of Time", "Timespinner"),
+                       copies: int = 5, local_share: float = 0.5, freeze_gc: bool = True) -> None:
+    """
+    Measure the cost of finding a location for each placement of fill_restrictive during progression fill, with the
+    indexed candidate lookup and with a linear scan over all locations.
+
+    :param games: Games to put into the generated multiworld. Games that are not installed are skipped.
+    :param copies: Number of players of each game.
+    :param local_share: Share of each player's progression item names to add to their local_items.
+    :param freeze_gc: Whether to freeze gc before benchmarking and unfreeze gc afterward.
+    """
+    import argparse
+    import gc
+    import logging
+    import time
+    import typing
+
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState, Item, Location, MultiWorld
+    from Utils import init_logging
+    from worlds.AutoWorld import AutoWorldRegister, call_all
+    from worlds.generic.Rules import exclusion_rules, locality_rules
+    import Fill
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    gen_steps = ("generate_early", "create_regions", "create_items", "set_rules", "connect_entrances",
+                 "generate_basic", "pre_fill")
+
+    class LinearCandidateLocations(Fill._CandidateLocations):
+        def pop_fillable(self, state: CollectionState, item: Item, check_access: bool,
+                         player: typing.Optional[int] = None) -> typing.Optional[Location]:
+            for i, location in enumerate(self.locations):
+                if (player is None or location.player == player) and location.can_fill(state, item, check_access):
+                    return self.locations.pop(i)
+            return None
+
+    def create_multiworld() -> MultiWorld:
+        world_types = [AutoWorldRegister.world_types[game] for game in games
+                       if game in AutoWorldRegister.world_types] * copies
+        multiworld = MultiWorld(len(world_types))
+        multiworld.game = {player: world_type.game for player, world_type in enumerate(world_types, 1)}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for player, world_type in enumerate(world_types, 1):
+            for name, option in world_type.options_dataclass.type_hints.items():
+                player_options = getattr(args, name, {})
+                player_options[player] = option.from_any(option.default)
+                setattr(args, name, player_options)
+        multiworld.set_options(args)
+        multiworld.state = CollectionState(multiworld)
+        for step in gen_steps:
+            call_all(multiworld, step)
+        for player in multiworld.player_ids:
+            progression = sorted({item.name for item in multiworld.itempool
+                                  if item.player == player and item.advancement})
+            local_items = multiworld.random.sample(progression, int(len(progression) * local_share))
+            multiworld.worlds[player].options.local_items.value |= set(local_items)
+        locality_rules(multiworld)
+        for player in multiworld.player_ids:
+            exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
+        logger.info(f"Generated {multiworld.players} players of {', '.join(sorted(set(multiworld.game.values())))}.")
+        return multiworld
+
+    original_index = Fill._CandidateLocations
+    try:
+        for name, index_type in (("linear scan", LinearCandidateLocations), ("indexed lookup", original_index)):
+            lookup_time = 0.0
+            lookups = 0
+
+            class TimedCandidateLocations(index_type):
+                def pop_fillable(self, *args, **kwargs) -> typing.Optional[Location]:
+                    nonlocal lookup_time, lookups
+                    start = time.perf_counter()
+                    location = super().pop_fillable(*args, **kwargs)
+                    lookup_time += time.perf_counter() - start
+                    lookups += 1
+                    return location
+
+            multiworld = create_multiworld()
+            Fill._CandidateLocations = TimedCandidateLocations
+            gc.collect()
+            if freeze_gc:
+                gc.freeze()
+            with TimeIt(f"distribute_items_restrictive of {multiworld.players} players with {name}", logger):
+                Fill.distribute_items_restrictive(multiworld)
+            if freeze_gc:
+                gc.unfreeze()
+            logger.info(f"{lookups} lookups with {name} took {lookup_time:.4f} seconds, "
+                        f"{lookup_time / max(lookups, 1) * 1_000_000:.1f} microseconds per placement.")
+    finally:
+        Fill._CandidateLocations = original_index
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_fill_benchmark()
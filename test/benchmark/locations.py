@@ -11,6 +11,7 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
     import logging
     import gc
     import collections
+    import contextlib
     import typing
     import sys
 
@@ -20,6 +21,7 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
     from BaseClasses import MultiWorld, CollectionState, Location
     from worlds import AutoWorld
     from worlds.AutoWorld import call_all
+    from rule_builder.rules import CustomRuleRegister, Rule
 
     init_logging("Benchmark Runner")
     logger = logging.getLogger("Benchmark")
@@ -55,6 +57,18 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
                 gc.unfreeze()
             return t.dif
 
+        @staticmethod
+        @contextlib.contextmanager
+        def interpreted_rules() -> typing.Iterator[None]:
+            """Temporarily evaluates compiled rule builder rules node by node, like before compilation."""
+            compiled = {rule: rule.__dict__.pop("_call") for rule in CustomRuleRegister.resolved_rules.values()
+                        if "_call" in rule.__dict__}
+            try:
+                yield
+            finally:
+                for rule, function in compiled.items():
+                    object.__setattr__(rule, "_call", function)
+
         def main(self):
             for game in sorted(AutoWorld.AutoWorldRegister.world_types):
                 summary_data: typing.Dict[str, collections.Counter[str]] = {
@@ -96,6 +110,23 @@ def run_locations_benchmark(freeze_gc: bool = True) -> None:
                         time_taken = self.location_test(location, all_state, "all_state")
                         summary_data["all_state"][location.name] = time_taken
 
+                    compiled_locations = [location for location in locations
+                                          if isinstance(location.access_rule, Rule.Resolved)
+                                          and "_call" in location.access_rule.__dict__]
+                    if compiled_locations:
+                        interpreted: collections.Counter[str] = collections.Counter()
+                        with self.interpreted_rules():
+                            for location in compiled_locations:
+                                interpreted[location.name] = \
+                                    self.location_test(location, multiworld.state, "empty_state, interpreted") + \
+                                    self.location_test(location, all_state, "all_state, interpreted")
+                        total_compiled = sum(summary_data["empty_state"][location.name] +
+                                             summary_data["all_state"][location.name]
+                                             for location in compiled_locations)
+                        logger.info(f"{game} rule builder locations took {total_compiled:.4f} seconds compiled and "
+                                    f"{sum(interpreted.values()):.4f} interpreted. "
+                                    f"(all times summed for {len(compiled_locations)} locations.)")
+
                     total_empty_state = sum(summary_data["empty_state"].values())
                     total_all_state = sum(summary_data["all_state"].values())
 
@@ -0,0 +1,357 @@
+def run_multiserver_benchmark(clients: int = 50, duration: float = 30.0,
+                              rates: "dict[str, float] | None" = None, multidata: "str | None" = None,
+                              players: "int | None" = None, game: str = "A Link to the Past",
+                              locations_per_player: int = 200, loglevel: str = "warning",
+                              binary: bool = False) -> None:
+    """
+    Host a MultiServer in a subprocess and put it under load with simulated clients speaking the network protocol.
+
+    Each client connects to a slot and then sends commands at the given rates, with exponentially distributed intervals,
+    until the duration ran out. The latency of a command is the time until the server's reply to it arrived. As the
+    clients share one process, its CPU time is reported as well; if it is close to the duration, the clients are the
+    bottleneck and the numbers don't describe the server.
+
+    :param clients: Number of simulated clients. Clients are spread over the slots, so more clients than slots means
+        several clients per slot, like trackers or text clients next to the game.
+    :param duration: Seconds of load after all clients are connected.
+    :param rates: Commands per second of each client, by command. Defaults to a mix of mostly LocationChecks, some
+        data storage traffic and a little DeathLink and chat.
+    :param multidata: Path to a generated .archipelago or .zip file to host. If None, a synthetic multidata is generated.
+    :param players: Number of slots of the synthetic multidata, defaults to one per client.
+    :param game: Game of all slots of the synthetic multidata, items and locations are taken from its data package.
+    :param locations_per_player: Number of locations of each slot of the synthetic multidata.
+    :param loglevel: Log level of the server.
+    :param binary: Whether clients ask for the binary encoding.
+    """
+    import asyncio
+    import logging
+    import os
+    import random
+    import socket
+    import subprocess
+    import sys
+    import tempfile
+    import time
+    import typing
+    import zipfile
+    import zlib
+
+    import websockets
+
+    import worlds
+    from MultiServer import Context
+    from NetUtils import NetworkSlot, SlotType, binary_encoding, decode, decode_binary, encode
+    from Utils import init_logging, restricted_dumps, version_tuple
+    from worlds.AutoWorld import World
+
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    if rates is None:
+        rates = {
+            "LocationChecks": 0.5,
+            "Sync": 0.02,
+            "Set": 0.2,
+            "Get": 0.2,
+            "Bounce": 0.05,
+            "Say": 0.02,
+        }
+    commands = [command for command, rate in rates.items() if rate > 0]
+    weights = [rates[command] for command in commands]
+    total_rate = sum(weights)
+
+    def write_synthetic_multidata(path: str, player_count: int) -> None:
+        game_package = worlds.network_data_package["games"][game]
+        location_ids = sorted(game_package["location_name_to_id"].values())[:locations_per_player]
+        item_ids = sorted(game_package["item_name_to_id"].values())
+        slots = range(1, player_count + 1)
+        data = {
+            "slot_data": {slot: {} for slot in slots},
+            "slot_info": {slot: NetworkSlot(f"Player{slot}", game, SlotType.player) for slot in slots},
+            "connect_names": {f"Player{slot}": (0, slot) for slot in slots},
+            # spread every slot's items over the other slots, every other one as progression
+            "locations": {slot: {location: (item_ids[n % len(item_ids)], (slot + n) % player_count + 1, n % 2)
+                                 for n, location in enumerate(location_ids)} for slot in slots},
+            "checks_in_area": {},
+            "server_options": {},
+            "er_hint_data": {},
+            "precollected_items": {slot: [item_ids[0]] for slot in slots},
+            "precollected_hints": {slot: set() for slot in slots},
+            "version": (version_tuple.major, version_tuple.minor, version_tuple.build),
+            "tags": ["AP"],
+            "minimum_versions": {"server": World.required_server_version,
+                                 "clients": {slot: World.required_client_version for slot in slots}},
+            "seed_name": "Benchmark",
+            "spheres": [],
+            "datapackage": {name: worlds.network_data_package["games"][name] for name in (game, "Archipelago")},
+            "race_mode": 0,
+        }
+        with open(path, "wb") as f:
+            f.write(bytes([3]))
+            f.write(zlib.compress(restricted_dumps(data)))
+
+    def read_slots(path: str) -> typing.List[typing.Tuple[str, str]]:
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as zf:
+                data = zf.read(next(file for file in zf.namelist() if file.endswith(".archipelago")))
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+        decoded = Context.decompress(data)
+        return [(slot_info.name, slot_info.game) for slot_info in decoded["slot_info"].values()
+                if slot_info.type == SlotType.player]
+
+    def percentile(values: typing.List[float], q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    class SimulatedClient:
+        index: int
+        name: str
+        game: str
+        slot: int
+        locations: typing.List[int]
+        """missing locations of the slot this client is supposed to check"""
+
+        def __init__(self, index: int, name: str, game: str) -> None:
+            self.index = index
+            self.name = name
+            self.game = game
+            self.slot = 0
+            self.locations = []
+
+    class LoadTest:
+        address: str
+        pending: typing.Dict[typing.Any, typing.Tuple[str, float]]
+        latencies: typing.Dict[str, typing.List[float]]
+        received_messages: int
+        received_bytes: int
+        token_counter: int
+
+        def __init__(self, address: str) -> None:
+            self.address = address
+            self.pending = {}
+            self.latencies = {command: [] for command in ["Connect", *commands]}
+            self.received_messages = 0
+            self.received_bytes = 0
+            self.token_counter = 0
+
+        def new_token(self) -> str:
+            self.token_counter += 1
+            return f"benchmark {self.token_counter}"
+
+        def resolve(self, key: typing.Any) -> None:
+            entry = self.pending.pop(key, None)
+            if entry:
+                command, start = entry
+                self.latencies[command].append(time.perf_counter() - start)
+
+        async def connect(self, client: SimulatedClient, slot_clients: typing.List[SimulatedClient]) \
+                -> websockets.WebSocketClientProtocol:
+            start = time.perf_counter()
+            connection = await websockets.connect(self.address, ping_timeout=None, ping_interval=None,
+                                                  max_size=16 * 1024 * 1024)
+            await connection.recv()  # RoomInfo
+            await connection.send(encode([{
+                "cmd": "Connect", "password": None, "name": client.name, "game": client.game,
+                "uuid": f"benchmark-{client.index}", "version": version_tuple, "items_handling": 0b111,
+                "tags": ["AP", "DeathLink"], "slot_data": False, "encoding": binary_encoding if binary else None,
+            }]))
+            while True:
+                data = await connection.recv()
+                for msg in decode_binary(data) if isinstance(data, bytes) else decode(data):
+                    if msg["cmd"] == "ConnectionRefused":
+                        raise Exception(f"{client.name} was refused: {msg['errors']}")
+                    if msg["cmd"] == "Connected":
+                        self.latencies["Connect"].append(time.perf_counter() - start)
+                        client.slot = msg["slot"]
+                        # clients of the same slot split up its locations, so that every check is a new one
+                        share = slot_clients.index(client)
+                        client.locations = sorted(msg["missing_locations"])[share::len(slot_clients)]
+                        client.locations.reverse()
+                        return connection
+
+        async def read(self, client: SimulatedClient, connection: websockets.WebSocketClientProtocol) -> None:
+            async for data in connection:
+                self.received_bytes += len(data)
+                for msg in decode_binary(data) if isinstance(data, bytes) else decode(data):
+                    self.received_messages += 1
+                    cmd = msg["cmd"]
+                    if cmd == "RoomUpdate":
+                        for location in msg.get("checked_locations", ()):
+                            self.resolve((client.slot, location))
+                    elif cmd == "PrintJSON":
+                        if msg.get("type") == "Chat":
+                            self.resolve(msg["message"])
+                    elif cmd == "Bounced":
+                        self.resolve(msg["data"].get("cause"))
+                    elif cmd in ("SetReply", "Retrieved"):
+                        self.resolve(msg.get("token"))
+
+        def create_command(self, client: SimulatedClient, command: str) \
+                -> typing.Tuple[typing.Any, typing.List[typing.Dict[str, typing.Any]]]:
+            """Returns the key the reply is resolved by and the messages to send."""
+            token = self.new_token()
+            key = f"benchmark_{client.name}"
+            if command == "LocationChecks":
+                location = client.locations.pop()
+                return (client.slot, location), [{"cmd": "LocationChecks", "locations": [location]}]
+            if command == "Sync":
+                # Sync has no reply if the slot received nothing, so the Retrieved that follows it is awaited instead
+                return token, [{"cmd": "Sync"}, {"cmd": "Get", "keys": [], "token": token}]
+            if command == "Set":
+                return token, [{"cmd": "Set", "key": key, "default": 0, "want_reply": True, "token": token,
+                                "operations": [{"operation": "add", "value": 1}]}]
+            if command == "Get":
+                return token, [{"cmd": "Get", "keys": [key, f"_read_hints_0_{client.slot}"],
+                                "token": token}]
+            if command == "Bounce":
+                return token, [{"cmd": "Bounce", "tags": ["DeathLink"],
+                                "data": {"time": time.time(), "source": client.name, "cause": token}}]
+            if command == "Say":
+                return token, [{"cmd": "Say", "text": token}]
+            raise ValueError(f"Unknown command {command}")
+
+        async def run_client(self, client: SimulatedClient, connection: websockets.WebSocketClientProtocol,
+                             end: float) -> None:
+            reader = asyncio.create_task(self.read(client, connection))
+            client_random = random.Random(client.index)
+            next_send = time.perf_counter()
+            while True:
+                next_send += client_random.expovariate(total_rate)
+                if next_send >= end:
+                    break
+                await asyncio.sleep(next_send - time.perf_counter())
+                command = client_random.choices(commands, weights)[0]
+                if command == "LocationChecks" and not client.locations:
+                    continue
+                key, msgs = self.create_command(client, command)
+                self.pending[key] = command, time.perf_counter()
+                await connection.send(encode(msgs))
+            # give the server a moment to answer the outstanding commands
+            grace_end = time.perf_counter() + 5
+            while self.pending and time.perf_counter() < grace_end:
+                await asyncio.sleep(0.1)
+            await connection.close()
+            reader.cancel()
+
+        async def run(self, slots: typing.List[typing.Tuple[str, str]],
+                      server: "psutil.Process | None") -> None:
+            simulated = [SimulatedClient(index, *slots[index % len(slots)]) for index in range(clients)]
+            by_slot: typing.Dict[str, typing.List[SimulatedClient]] = {}
+            for client in simulated:
+                by_slot.setdefault(client.name, []).append(client)
+            connect_start = time.perf_counter()
+            connections = await asyncio.gather(*(self.connect(client, by_slot[client.name]) for client in simulated))
+            logger.info(f"Connected {clients} clients to {len(by_slot)} slots in "
+                        f"{time.perf_counter() - connect_start:.2f} seconds.")
+
+            memory_samples: typing.List[int] = []
+
+            async def sample_memory() -> None:
+                while True:
+                    memory_samples.append(server.memory_info().rss)
+                    await asyncio.sleep(0.5)
+
+            sampler = asyncio.create_task(sample_memory()) if server else None
+            server_cpu = sum(server.cpu_times()[:2]) if server else 0
+            client_cpu = time.process_time()
+            start = time.perf_counter()
+            end = start + duration
+            await asyncio.gather(*(self.run_client(client, connection, end)
+                                   for client, connection in zip(simulated, connections)))
+            elapsed = time.perf_counter() - start
+            client_cpu = time.process_time() - client_cpu
+            if server:
+                server_cpu = sum(server.cpu_times()[:2]) - server_cpu
+                sampler.cancel()
+
+            answered = sum(len(values) for command, values in self.latencies.items() if command != "Connect")
+            logger.info(f"{answered} commands answered in {elapsed:.2f} seconds, {answered / elapsed:.1f} per second, "
+                        f"{len(self.pending)} unanswered.")
+            logger.info(f"Received {self.received_messages / elapsed:.1f} messages and "
+                        f"{self.received_bytes / elapsed / 1024:.1f} KiB per second.")
+            logger.info(f"{'command':<16}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+            for command, values in self.latencies.items():
+                if values:
+                    values.sort()
+                    logger.info(f"{command:<16}{len(values):>8}{percentile(values, 0.5) * 1000:>10.1f}"
+                                f"{percentile(values, 0.99) * 1000:>10.1f}{values[-1] * 1000:>10.1f}")
+            if server:
+                logger.info(f"Server CPU: {server_cpu:.2f} seconds, {server_cpu / elapsed:.1%} of one core. "
+                            f"Memory: {max(memory_samples) / 1024 / 1024:.1f} MiB peak, "
+                            f"{memory_samples[-1] / 1024 / 1024:.1f} MiB at the end.")
+            else:
+                logger.info("Install psutil to measure server CPU and memory.")
+            logger.info(f"Client CPU: {client_cpu:.2f} seconds, {client_cpu / elapsed:.1%} of one core.")
+
+    def wait_for_server(port: int, proc: subprocess.Popen, timeout: float = 120) -> None:
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise Exception(f"MultiServer exited with {proc.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise TimeoutError("MultiServer did not start")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if multidata is None:
+            multidata = os.path.join(temp_dir, "Benchmark.archipelago")
+            write_synthetic_multidata(multidata, players or clients)
+        slots = read_slots(multidata)
+
+        with socket.socket() as free_socket:
+            free_socket.bind(("127.0.0.1", 0))
+            port = free_socket.getsockname()[1]
+
+        start_time = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "MultiServer.py", multidata, "--host", "127.0.0.1",
+                                 "--port", str(port), "--loglevel", loglevel,
+                                 "--savefile", os.path.join(temp_dir, "Benchmark.apsave")],
+                                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
+        try:
+            wait_for_server(port, proc)
+            logger.info(f"MultiServer started in {time.perf_counter() - start_time:.2f} seconds.")
+            load_test = LoadTest(f"ws://127.0.0.1:{port}")
+            asyncio.run(load_test.run(slots, psutil.Process(proc.pid) if psutil else None))
+        finally:
+            try:
+                proc.communicate("/exit\n", timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from path_change import change_home
+
+    parser = argparse.ArgumentParser(description="Load test a MultiServer with simulated clients.")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load after connecting.")
+    parser.add_argument("--rate", action="append", default=[], metavar="COMMAND=PER_SECOND",
+                        help="Rate of a command per client, like LocationChecks=2. Can be given multiple times, "
+                             "replaces the default mix.")
+    parser.add_argument("--multidata", help="Host this multidata instead of a synthetic one.")
+    parser.add_argument("--players", type=int, help="Slots of the synthetic multidata, defaults to one per client.")
+    parser.add_argument("--game", default="A Link to the Past", help="Game of the synthetic multidata.")
+    parser.add_argument("--locations", type=int, default=200, help="Locations per slot of the synthetic multidata.")
+    parser.add_argument("--loglevel", default="warning", help="Log level of the server.")
+    parser.add_argument("--binary", action="store_true", help="Let clients ask for the binary encoding.")
+    args = parser.parse_args()
+    if args.multidata:
+        import os
+        args.multidata = os.path.abspath(args.multidata)
+    change_home()
+    run_multiserver_benchmark(args.clients, args.duration,
+                              {command: float(rate) for command, rate in
+                               (entry.split("=", 1) for entry in args.rate)} if args.rate else None,
+                              args.multidata, args.players, args.game, args.locations, args.loglevel, args.binary)
@@ -0,0 +1,140 @@
+def run_sweep_benchmark(players: int = 100, regions: int = 40, extra_exits: int = 8, locations_per_region: int = 5,
+                        iterations: int = 5, freeze_gc: bool = True) -> None:
+    """
+    Compare the time it takes to sweep a large multiworld of synthetic rule builder worlds, with and without
+    incremental region updates.
+
+    Every player has a chain of regions, each locked behind its own key, plus extra exits with multi-key rules to other
+    regions that stay blocked for a large part of the sweep. Each player's keys are placed in the next player's world, so every sphere spans the
+    whole multiworld.
+
+    :param players: Number of players in the generated multiworld.
+    :param regions: Number of regions per player.
+    :param extra_exits: Number of additional, mostly blocked, exits per region.
+    :param locations_per_region: Number of locations in each region.
+    :param iterations: Number of sweeps to time for each variant.
+    :param freeze_gc: Whether to freeze gc before benchmarking and unfreeze gc afterward.
+    """
+    import argparse
+    import gc
+    import logging
+    from typing import ClassVar, Iterable, Set
+
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState, Entrance, Item, ItemClassification, Location, MultiWorld, Region
+    from Utils import init_logging
+    from rule_builder.cached_world import CachedRuleBuilderWorld
+    from rule_builder.rules import Has, HasAll, HasAny
+    from worlds.AutoWorld import AutoWorldRegister, World, call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    game_name = "Sweep Benchmark"
+    item_names = [f"Key {i}" for i in range(1, regions)] + ["Filler"]
+    location_names = [f"Region {i} Location {n}" for i in range(regions) for n in range(locations_per_region)]
+
+    class SweepBenchmarkItem(Item):
+        game = game_name
+
+    class SweepBenchmarkLocation(Location):
+        game = game_name
+
+    def create_world_type(incremental: bool) -> type[CachedRuleBuilderWorld]:
+        class SweepBenchmarkWorld(CachedRuleBuilderWorld):
+            game = game_name if incremental else f"{game_name} Full Recheck"
+            hidden = True
+            item_name_to_id: ClassVar = {name: code for code, name in enumerate(item_names, 1)}
+            location_name_to_id: ClassVar = {name: code for code, name in enumerate(location_names, 1)}
+            origin_region_name = "Region 0"
+
+            def create_regions(self) -> None:
+                chain = [Region(f"Region {i}", self.player, self.multiworld) for i in range(regions)]
+                self.multiworld.regions.extend(chain)
+                for i, region in enumerate(chain):
+                    region.add_locations({name: self.location_name_to_id[name] for name in
+                                          location_names[i * locations_per_region:(i + 1) * locations_per_region]},
+                                         SweepBenchmarkLocation)
+                    if i + 1 < regions:
+                        self.create_entrance(region, chain[i + 1], Has(f"Key {i + 1}"))
+                    for offset in range(2, extra_exits + 2):
+                        target = (i + offset * 3) % regions
+                        keys = {f"Key {max(1, (target + n) % regions)}" for n in range(3)}
+                        self.create_entrance(region, chain[target], HasAll(*keys) | HasAny(*keys, f"Key {target}"),
+                                             f"Region {i} Shortcut {offset}")
+
+            def create_item(self, name: str) -> SweepBenchmarkItem:
+                classification = ItemClassification.filler if name == "Filler" else ItemClassification.progression
+                return SweepBenchmarkItem(name, classification, self.item_name_to_id[name], self.player)
+
+            def get_filler_item_name(self) -> str:
+                return "Filler"
+
+            def get_connections_to_recheck(self, state: CollectionState, item_names: Set[str]) -> Iterable[Entrance]:
+                if incremental:
+                    return super().get_connections_to_recheck(state, item_names)
+                return World.get_connections_to_recheck(self, state, item_names)
+
+        return SweepBenchmarkWorld
+
+    def create_multiworld(world_type: type[World]) -> MultiWorld:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: world_type.game for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for name, option in world_type.options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        multiworld.state = CollectionState(multiworld)
+        for step in ("generate_early", "create_regions", "set_rules"):
+            call_all(multiworld, step)
+        return multiworld
+
+    def fill(multiworld: MultiWorld) -> None:
+        for player in multiworld.player_ids:
+            receiver = player % multiworld.players + 1
+            for i in range(regions):
+                region_locations = list(multiworld.get_region(f"Region {i}", player).locations)
+                if i + 1 < regions:
+                    receiver_world = multiworld.worlds[receiver]
+                    multiworld.push_item(region_locations.pop(0), receiver_world.create_item(f"Key {i + 1}"), False)
+                for location in region_locations:
+                    multiworld.push_item(location, multiworld.worlds[player].create_filler(), False)
+
+    world_types = [create_world_type(False), create_world_type(True)]
+    try:
+        for world_type in world_types:
+            multiworld = create_multiworld(world_type)
+            fill(multiworld)
+            gc.collect()
+            if freeze_gc:
+                gc.freeze()
+            with TimeIt(f"{iterations} sweeps of {players} {world_type.game} players", logger):
+                for _ in range(iterations):
+                    state = CollectionState(multiworld)
+                    state.sweep_for_advancements()
+            reached = sum(len(state.reachable_regions[player]) for player in multiworld.player_ids)
+            logger.info(f"{world_type.game} reached {reached} of {players * regions} regions.")
+
+            # like during fill, collect one item at a time and check reachability after each one
+            items = [location.item for sphere in multiworld.get_spheres() for location in sorted(sphere)
+                     if location.item.advancement]
+            with TimeIt(f"{iterations} step-by-step collections of {len(items)} items of {world_type.game}", logger):
+                for _ in range(iterations):
+                    state = CollectionState(multiworld)
+                    for item in items:
+                        state.collect(item, True)
+                        state.update_reachable_regions(item.player)
+            if freeze_gc:
+                gc.unfreeze()
+    finally:
+        for world_type in world_types:
+            AutoWorldRegister.world_types.pop(world_type.game, None)
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_sweep_benchmark()
@@ -463,6 +463,29 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertEqual(1, len(player1.prog_items))
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
+    def test_skipped_locations_keep_order(self):
+        """Test that skipping excluded and locality forbidden locations picks the same locations as a linear scan"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 4, 2)
+        player2 = generate_player_data(multiworld, 2, 4, 2)
+        multiworld.worlds[1].options.local_items.value = {player1.prog_items[0].name}
+        locality_rules(multiworld)
+        player2.locations[0].progress_type = LocationProgressType.EXCLUDED
+        locations = [location for pair in zip(player2.locations, player1.locations) for location in pair]
+        local_item, other_item = player1.prog_items
+        expected = {
+            local_item: player1.locations[0],
+            other_item: player2.locations[1],
+        }
+
+        fill_restrictive(multiworld, multiworld.state, locations, [other_item, local_item], swap=False)
+
+        for item, location in expected.items():
+            self.assertIs(item.location, location)
+        self.assertEqual(6, len(locations))
+        self.assertNotIn(player1.locations[0], locations)
+        self.assertNotIn(player2.locations[1], locations)
+
 
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
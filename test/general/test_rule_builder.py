@@ -1,3 +1,4 @@
+import itertools
 import unittest
 from dataclasses import dataclass, fields
 from typing import Any, ClassVar, cast
@@ -509,6 +510,166 @@ class TestCaching(CachedRuleBuilderTestCase):
         self.assertTrue(entrance.can_reach(self.state))
 
 
+class TestCompilation(CachedRuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+
+        region1 = Region("Region 1", self.player, self.multiworld)
+        region2 = Region("Region 2", self.player, self.multiworld)
+        self.multiworld.regions.extend([region1, region2])
+        region1.add_locations({"Location 1": 1}, RuleBuilderLocation)
+        region2.add_locations({"Location 2": 2}, RuleBuilderLocation)
+        world.create_entrance(region1, region2, HasAll("Item 1", "Item 2"))
+        world.set_rule(world.get_location("Location 2"), HasAny("Item 3", "Item 4"))
+        world.register_rule_builder_dependencies()
+
+    def test_compiled_matches_evaluated(self) -> None:
+        rules: list[Rule[Any]] = [
+            Has("Item 1", count=2) & (HasAny("Item 2", "Item 3") | HasAllCounts({"Item 4": 1, "Item 5": 2})),
+            HasFromList("Item 1", "Item 2", "Item 3", count=3) | HasFromListUnique("Item 3", "Item 4", count=2),
+            HasGroup("Group 1", count=2) & HasGroupUnique("Group 2", count=2),
+            HasAnyCount({"Item 1": 2, "Item 5": 1}) & CanReachRegion("Region 2"),
+            CanReachLocation("Location 2") | CanReachEntrance("Region 1 -> Region 2") & Has("Item 5"),
+        ]
+        resolved_rules = [rule.resolve(self.world) for rule in rules]
+        for resolved_rule in resolved_rules:
+            self.world.register_rule_dependencies(resolved_rule)
+            resolved_rule.compile()
+            self.assertIn("_call", resolved_rule.__dict__)
+
+        for counts in itertools.product(range(3), repeat=5):
+            evaluated_state = CollectionState(self.multiworld)
+            compiled_state = CollectionState(self.multiworld)
+            for i, count in enumerate(counts, 1):
+                for _ in range(count):
+                    evaluated_state.collect(self.world.create_item(f"Item {i}"))
+                    compiled_state.collect(self.world.create_item(f"Item {i}"))
+            for resolved_rule in resolved_rules:
+                with self.subTest(rule=str(resolved_rule), counts=counts):
+                    expected = type(resolved_rule)._call(resolved_rule, evaluated_state)  # pyright: ignore[reportPrivateUsage]
+                    self.assertEqual(expected, resolved_rule(compiled_state))
+                    self.assertEqual(expected, resolved_rule(compiled_state))  # from the cache
+
+    def test_set_rule_compiles(self) -> None:
+        location = self.world.get_location("Location 2")
+        self.assertIsInstance(location.access_rule, Rule.Resolved)
+        self.assertIn("_call", location.access_rule.__dict__)
+
+        state = CollectionState(self.multiworld)
+        self.assertFalse(location.can_reach(state))
+        state.collect(self.world.create_item("Item 3"))
+        self.assertFalse(location.can_reach(state))  # region 2 is not reachable
+        self.assertNotIn(id(location.access_rule), state.rule_builder_cache[1])  # pyright: ignore[reportAttributeAccessIssue]
+        state.collect(self.world.create_item("Item 1"))
+        state.collect(self.world.create_item("Item 2"))
+        self.assertTrue(location.can_reach(state))
+        self.assertTrue(state.rule_builder_cache[1][id(location.access_rule)])  # pyright: ignore[reportAttributeAccessIssue]
+
+    def test_overridden_evaluate_is_called(self) -> None:
+        calls: list[bool] = []
+
+        class CountingHas(Has.Resolved):
+            @override
+            def _evaluate(self, state: CollectionState) -> bool:
+                calls.append(True)
+                return super()._evaluate(state)
+
+        children = (CountingHas("Item 1", player=self.player), Has("Item 2").resolve(self.world))
+        resolved_rule = And.Resolved(children, player=self.player)
+        resolved_rule.compile()
+        state = CollectionState(self.multiworld)
+        self.assertFalse(resolved_rule(state))
+        self.assertEqual(1, len(calls))
+
+
+class TestIncrementalRegions(CachedRuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: CachedRuleBuilderWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    state: CollectionState  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = cast(CachedRuleBuilderWorld, self.multiworld.worlds[1])
+        self.world = world
+        self.state = self.multiworld.state
+
+        region1 = Region("Region 1", self.player, self.multiworld)
+        region2 = Region("Region 2", self.player, self.multiworld)
+        region3 = Region("Region 3", self.player, self.multiworld)
+        region4 = Region("Region 4", self.player, self.multiworld)
+        self.multiworld.regions.extend([region1, region2, region3, region4])
+
+        region2.add_locations({"Location 1": 1}, RuleBuilderLocation)
+
+        world.create_entrance(region1, region2, Has("Item 1"))
+        world.create_entrance(region1, region3, lambda state: state.has("Item 2", self.player))
+        world.create_entrance(region1, region4, CanReachLocation("Location 1") & Has("Item 3"))
+        world.register_rule_builder_dependencies()
+
+    def test_collect_tracks_item_names(self) -> None:
+        self.assertFalse(self.world.get_region("Region 2").can_reach(self.state))
+        self.assertIs(self.state.stale[1], False)
+
+        self.state.collect(self.world.create_item("Item 5"))
+        self.assertEqual(self.state.stale[1], {"Item 5"})
+        rechecked = {connection.name for connection in self.world.get_connections_to_recheck(self.state, {"Item 5"})}
+        # the lambda and location dependent entrances are always rechecked, the Has rule is skipped
+        self.assertEqual(rechecked, {"Region 1 -> Region 3", "Region 1 -> Region 4"})
+
+        self.state.collect(self.world.create_item("Item 1"))
+        self.assertEqual(self.state.stale[1], {"Item 1", "Item 5"})
+        self.assertTrue(self.world.get_region("Region 2").can_reach(self.state))
+        self.assertIs(self.state.stale[1], False)
+
+    def test_opaque_rules(self) -> None:
+        self.assertFalse(self.world.get_region("Region 3").can_reach(self.state))
+        self.state.collect(self.world.create_item("Item 2"))
+        self.assertTrue(self.world.get_region("Region 3").can_reach(self.state))
+
+        self.assertFalse(self.world.get_region("Region 4").can_reach(self.state))
+        self.state.collect(self.world.create_item("Item 3"))
+        self.assertFalse(self.world.get_region("Region 4").can_reach(self.state))
+        self.state.collect(self.world.create_item("Item 1"))  # unlocks location 1, which unlocks region 4
+        self.assertTrue(self.world.get_region("Region 4").can_reach(self.state))
+
+    def test_replaced_rule(self) -> None:
+        entrance = self.world.get_entrance("Region 1 -> Region 2")
+        self.assertFalse(entrance.connected_region.can_reach(self.state))
+        self.assertEqual(self.world.get_connection_item_dependencies(entrance.access_rule), {"Item 1"})
+        self.world.set_rule(entrance, Has("Item 5"))
+        # an entry left by another rule under the same id must not be used
+        self.world.connection_item_dependencies[id(entrance.access_rule)] = (lambda state: True, frozenset())
+        rechecked = {connection.name for connection in self.world.get_connections_to_recheck(self.state, {"Item 5"})}
+        self.assertIn("Region 1 -> Region 2", rechecked)
+
+    def test_external_stale_rechecks_all(self) -> None:
+        self.assertFalse(self.world.get_region("Region 2").can_reach(self.state))
+        self.state.prog_items[1]["Item 1"] = 1
+        self.state.stale[1] = True
+        self.assertTrue(self.world.get_region("Region 2").can_reach(self.state))
+
+    def test_remove_resets_regions(self) -> None:
+        item = self.world.create_item("Item 1")
+        self.state.collect(item)
+        self.assertTrue(self.world.get_region("Region 2").can_reach(self.state))
+        self.state.remove(item)
+        self.assertIs(self.state.stale[1], True)
+        self.assertFalse(self.world.get_region("Region 2").can_reach(self.state))
+
+
 class TestCacheDisabled(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
@@ -0,0 +1,94 @@
+import unittest
+from typing import Iterator, Set
+
+from BaseClasses import CollectionState, Location, MultiWorld
+from Fill import FillError
+from worlds.generic.Rules import set_rule
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+class TestSpheres(unittest.TestCase):
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        """Two players, each needing an item from the other player's world to progress."""
+        self.multiworld = generate_test_multiworld(2)
+        locations = {player: generate_locations(3, player, self.multiworld.get_region("Menu", player), 1)
+                     for player in (1, 2)}
+        items = {player: generate_items(2, player, True, 1) for player in (1, 2)}
+        for player, other in ((1, 2), (2, 1)):
+            first, second = items[player]
+            self.multiworld.push_item(locations[other][0], first, False)
+            set_rule(locations[player][1], lambda state, item=first: state.has(item.name, item.player))
+            self.multiworld.push_item(locations[other][1], second, False)
+            set_rule(locations[player][2], lambda state, item=second: state.has(item.name, item.player))
+            self.multiworld.push_item(locations[player][2], generate_items(1, player, False, 1)[0], False)
+            self.multiworld.completion_condition[player] = lambda state, item=second: state.has(item.name, item.player)
+        self.locations = locations
+
+    def test_spheres(self) -> None:
+        """Tests that each location is in the first sphere it can be reached in and that the cache agrees."""
+        expected = [
+            {self.locations[1][0], self.locations[2][0]},
+            {self.locations[1][1], self.locations[2][1]},
+            {self.locations[1][2], self.locations[2][2]},
+        ]
+        self.assertEqual(expected, list(self.multiworld.get_spheres()))
+        self.assertEqual(expected, list(self.multiworld.get_sendable_spheres()))
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+        self.multiworld.cache_spheres()
+        self.assertEqual(expected, list(self.multiworld.get_spheres()))
+        self.assertEqual(expected, list(self.multiworld.get_sendable_spheres()))
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+    def test_unreachable_spheres(self) -> None:
+        """Tests that unreachable locations follow an empty sphere, with and without the cache."""
+        set_rule(self.locations[2][2], lambda state: False)
+        expected = [
+            {self.locations[1][0], self.locations[2][0]},
+            {self.locations[1][1], self.locations[2][1]},
+            {self.locations[1][2]},
+            set(),
+            {self.locations[2][2]},
+        ]
+        self.assertEqual(expected, list(self.multiworld.get_spheres()))
+        self.multiworld.cache_spheres()
+        self.assertEqual(expected, list(self.multiworld.get_spheres()))
+        with self.assertRaises(FillError):
+            self.multiworld.fulfills_accessibility()
+
+    def test_cross_player_spheres(self) -> None:
+        """Tests that a location depending on another player's items is in the same sphere as a full recheck puts it,
+        even when only the other player's state changes for several spheres."""
+        multiworld = generate_test_multiworld(2)
+        chain_locations = generate_locations(6, 2, multiworld.get_region("Menu", 2), 1, "chain")
+        chain_items = generate_items(6, 2, True, 1)
+        for index, (location, item) in enumerate(zip(chain_locations, chain_items)):
+            multiworld.push_item(location, item, False)
+            if index:
+                set_rule(location, lambda state, previous=chain_items[index - 1]: state.has(previous.name, 2))
+        dependent_location, = generate_locations(1, 1, multiworld.get_region("Menu", 1), 1, "dependent")
+        set_rule(dependent_location, lambda state: state.has(chain_items[0].name, 2))
+        multiworld.push_item(dependent_location, generate_items(1, 1, False, 1)[0], False)
+
+        def full_recheck_spheres() -> Iterator[Set[Location]]:
+            state = CollectionState(multiworld)
+            locations = set(multiworld.get_filled_locations())
+            while locations:
+                sphere = {location for location in locations if location.can_reach(state)}
+                yield sphere
+                if not sphere:
+                    yield locations
+                    break
+                for location in sphere:
+                    state.collect(location.item, True, location)
+                locations -= sphere
+
+        expected = list(full_recheck_spheres())
+        self.assertIn(dependent_location, expected[1])
+        self.assertEqual(expected, list(multiworld.get_spheres()))
+        self.assertEqual(expected, list(multiworld.get_sendable_spheres()))
+        multiworld.cache_spheres()
+        self.assertEqual(expected, list(multiworld.get_spheres()))
+        self.assertEqual(expected, list(multiworld.get_sendable_spheres()))
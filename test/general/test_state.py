@@ -1,5 +1,8 @@
+import pickle
 import unittest
+from copy import deepcopy
 
+from BaseClasses import CollectionState, SharedPlayerContainers
 from worlds.AutoWorld import AutoWorldRegister, call_all
 from . import setup_solo_multiworld
 
@@ -27,3 +30,91 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+    def test_copy_is_independent(self):
+        """Ensure a copied state shares nothing observable with its source."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                state = multiworld.get_all_state(False)
+                expected_items = dict(state.prog_items[1])
+                expected_regions = set(state.reachable_regions[1])
+                copy = state.copy()
+                copy.prog_items[1]["Copy Only Item"] += 1
+                copy.reachable_regions[1].clear()
+                self.assertEqual(expected_items, dict(state.prog_items[1]))
+                self.assertEqual(expected_regions, state.reachable_regions[1])
+                state.prog_items[1]["Source Only Item"] += 1
+                self.assertNotIn("Source Only Item", copy.prog_items[1])
+                self.assertEqual(1, copy.prog_items[1]["Copy Only Item"])
+
+    def test_copy_keeps_source_containers(self):
+        """Ensure copying a state keeps the containers of its source, so references held by logic stay in use."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"])
+        state = multiworld.get_all_state(False)
+        prog_items = state.prog_items[1]
+        reachable_regions = state.reachable_regions[1]
+        state.copy()
+        prog_items["Held Item"] += 1
+        self.assertIs(prog_items, state.prog_items[1])
+        self.assertIs(reachable_regions, state.reachable_regions[1])
+        self.assertTrue(state.has("Held Item", 1))
+
+    def test_remove_undoes_collect(self):
+        """Ensure removing collected items restores the state, including LogicMixin attributes, as fill relies on it."""
+        core_attributes = {"multiworld", "prog_items", "reachable_regions", "blocked_connections", "advancements",
+                           "path", "locations_checked", "stale", "allow_partial_entrances"}
+
+        def comparable(value):
+            # objects without their own equality, such as the progression of SMZ3, are compared by their attributes
+            if isinstance(value, dict):
+                return {key: comparable(item) for key, item in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [comparable(item) for item in value]
+            if type(value).__eq__ is object.__eq__ and hasattr(value, "__dict__"):
+                return type(value), comparable(vars(value))
+            return deepcopy(value)
+
+        def logic_snapshot(state):
+            return ({player: {name: count for name, count in counts.items() if count}
+                     for player, counts in state.prog_items.items()},
+                    {name: comparable(value) for name, value in vars(state).items() if name not in core_attributes})
+
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                state = CollectionState(multiworld)
+                items = [item for item in multiworld.itempool if item.advancement]
+                expected = logic_snapshot(state)
+                for item in items:
+                    state.collect(item, True)
+                for item in reversed(items):
+                    state.remove(item)
+                self.assertEqual(expected, logic_snapshot(state))
+
+
+
+class TestSharedPlayerContainers(unittest.TestCase):
+    def test_copies_on_access(self):
+        """Ensure shared containers are only copied once accessed, and modifications stay on their side."""
+        source = SharedPlayerContainers({1: {"a"}, 2: {"b"}, 3: {"c"}})
+        containers = dict(dict.items(source))
+        source, copy = SharedPlayerContainers.share(source)
+        copy, copy_of_copy = SharedPlayerContainers.share(copy)
+        self.assertEqual(0, dict.__len__(copy))
+        self.assertEqual(3, len(copy_of_copy))
+        self.assertIn(3, copy_of_copy)
+
+        source[2].add("source")
+        self.assertIs(containers[2], source[2])
+        copy[2].add("copy")
+        self.assertEqual({"b", "copy"}, copy[2])
+        self.assertEqual({"b"}, copy_of_copy[2])
+        self.assertEqual({"b", "source"}, source[2])
+
+        copy_of_copy[3] = {"replaced"}
+        del copy
+        self.assertIs(containers[3], source[3])
+        self.assertEqual({1: {"a"}, 2: {"b"}, 3: {"replaced"}}, copy_of_copy)
+        self.assertEqual([1, 2, 3], list(copy_of_copy))
+        self.assertEqual({1: {"a"}, 2: {"b", "source"}, 3: {"c"}}, pickle.loads(pickle.dumps(source)))
@@ -0,0 +1,54 @@
+import multiprocessing
+import unittest
+
+from BaseClasses import CollectionState, MultiWorld, Region
+from sweep_pool import SweepPool, parallel_sweeps
+from worlds.generic.Rules import set_rule
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "sweep pools need to fork processes")
+class TestSweepPool(unittest.TestCase):
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        """Each player's progression is a chain of items, with every item placed in the next player's world.
+        The second half of each player's locations is behind an entrance that needs the fifth item."""
+        players = 4
+        self.multiworld = generate_test_multiworld(players)
+        for player in self.multiworld.player_ids:
+            receiver = player % players + 1
+            menu = self.multiworld.get_region("Menu", player)
+            behind = Region("Behind", player, self.multiworld)
+            self.multiworld.regions.append(behind)
+            menu.connect(behind, "Gate", lambda state, name=f"player{player}_progitem4", owner=player:
+                         state.has(name, owner))
+            locations = generate_locations(5, player, menu) + generate_locations(5, player, behind, tag="_behind")
+            items = generate_items(10, receiver, True)
+            for index, (location, item) in enumerate(zip(locations, items)):
+                self.multiworld.push_item(location, item, False)
+                if index:
+                    set_rule(location, lambda state, name=f"player{player}_progitem{index - 1}", owner=player:
+                             state.has(name, owner))
+        self.min_locations = SweepPool.min_locations
+        SweepPool.min_locations = 0
+
+    def tearDown(self) -> None:
+        SweepPool.min_locations = self.min_locations
+
+    def test_sweep_matches_in_process_sweep(self) -> None:
+        """Tests that sweeping with workers collects the same items and finds the same paths as sweeping in-process."""
+        expected = CollectionState(self.multiworld)
+        expected.sweep_for_advancements()
+        with parallel_sweeps(self.multiworld, 2):
+            self.assertIsNotNone(self.multiworld.sweep_pool)
+            state = CollectionState(self.multiworld)
+            state.sweep_for_advancements()
+        self.assertIsNone(self.multiworld.sweep_pool)
+
+        self.assertEqual(len(self.multiworld.get_filled_locations()), len(state.advancements))
+        self.assertEqual(expected.advancements, state.advancements)
+        for player in self.multiworld.player_ids:
+            self.assertEqual(expected.prog_items[player], state.prog_items[player])
+            self.assertEqual(expected.reachable_regions[player], state.reachable_regions[player])
+        self.assertEqual(expected.path, state.path)
@@ -0,0 +1,79 @@
+import enum
+import unittest
+
+import NetUtils
+from NetUtils import (Hint, HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, Permission, SlotType, decode,
+                      decode_binary, encode, encode_binary, is_binary_packet)
+from Utils import version_tuple
+
+msgs = [
+    {"cmd": "RoomInfo", "version": version_tuple, "games": {"A Link to the Past"}, "tags": ["AP"],
+     "permissions": {"release": Permission.auto_enabled}, "time": 1.5},
+    {"cmd": "Connected", "team": 0, "slot": 1, "players": [NetworkPlayer(0, 1, "Alias", "Name")],
+     "missing_locations": [1, 2], "checked_locations": {3},
+     "slot_info": {1: NetworkSlot("Name", "A Link to the Past", SlotType.player),
+                   2: NetworkSlot("Group", "A Link to the Past", SlotType.group, [1])},
+     "slot_data": {"nested": {5: [1, (2, 3)], "none": None, "bool": True}}},
+    {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(5, -2, 0)]},
+    {"cmd": "PrintJSON", "type": "ItemSend", "data": [{"text": "ü"}], "receiving": 2, "item": NetworkItem(1, 2, 3)},
+    {"cmd": "Retrieved", "keys": {"_read_hints_0_1": [Hint(1, 2, 3, 4, False, "", 1, HintStatus.HINT_PRIORITY)]}},
+]
+
+
+class TestEncode(unittest.TestCase):
+    def test_same_as_json_module(self) -> None:
+        """Tests that encode produces the same JSON as encoding with the json module after converting NamedTuples."""
+        for msg in msgs:
+            with self.subTest(cmd=msg["cmd"]):
+                self.assertEqual(NetUtils._encode(NetUtils._scan_for_TypedTuples([msg])), encode([msg]))
+
+    def test_big_int(self) -> None:
+        """Tests that integers beyond 64 bit still get encoded."""
+        self.assertEqual('[{"item":{"item":1,"location":36893488147419103232,"player":1,"flags":0,'
+                         '"class":"NetworkItem"}}]', encode([{"item": NetworkItem(1, 2 ** 65, 1)}]))
+
+    def test_unsupported(self) -> None:
+        """Tests that types the json module can't encode still raise."""
+        with self.assertRaises(TypeError):
+            encode([{"cmd": "Test", "object": object()}])
+
+    @unittest.skipUnless(NetUtils.orjson, "orjson not installed")
+    def test_orjson_divergence(self) -> None:
+        """Tests the documented cases in which encoding with orjson differs from the json module."""
+        class Plain(enum.Enum):
+            member = 1
+
+        self.assertEqual("[null,null,null]", encode([float("nan"), float("inf"), float("-inf")]))
+        self.assertEqual("[NaN,Infinity,-Infinity]", NetUtils._encode([float("nan"), float("inf"), float("-inf")]))
+        self.assertEqual("[1]", encode([Plain.member]))
+        with self.assertRaises(TypeError):
+            NetUtils._encode([Plain.member])
+
+
+@unittest.skipUnless(NetUtils.msgpack, "msgpack not installed")
+class TestBinaryEncoding(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """Tests that binary packets decode into the same objects as their JSON."""
+        for msg in msgs:
+            if not is_binary_packet([msg]):
+                continue
+            with self.subTest(cmd=msg["cmd"]):
+                expected = decode(encode([msg]))
+                decoded = decode_binary(encode_binary([msg]))
+                self.assertEqual(expected, decoded)
+                for key, value in expected[0].items():
+                    self.assertIs(type(value), type(decoded[0][key]), key)
+                    if isinstance(value, list) and value:
+                        self.assertIs(type(value[0]), type(decoded[0][key][0]), key)
+
+    def test_binary_packets(self) -> None:
+        """Tests that only packets of commands decode_binary knows about qualify for the binary encoding."""
+        self.assertEqual(["ReceivedItems", "PrintJSON"],
+                         [msg["cmd"] for msg in msgs if is_binary_packet([msg])])
+        self.assertFalse(is_binary_packet(msgs))
+
+    def test_connect(self) -> None:
+        """Tests that the version of a binary Connect gets restored."""
+        decoded = decode_binary(encode_binary([{"cmd": "Connect", "version": version_tuple}]))
+        self.assertEqual(version_tuple, decoded[0]["version"])
+        self.assertEqual(decode(encode([{"cmd": "Connect", "version": version_tuple}])), decoded)
@@ -112,10 +112,22 @@ class Base:
             self.assertEqual(sorted(self.store.find_item(set(range(2048)), 13)),
                              [(1, 13, 13, 1, 0)])
 
+        def test_find_item_order(self) -> None:
+            # the index has to yield in the same order as a scan over all locations
+            for slots in ({1}, {2}, {1, 2}, {3, 4, 5}):
+                for item in (11, 12, 21, 99):
+                    scanned = [(sender, location, item_id, receiver, flags)
+                               for sender, locations in self.store.items()
+                               for location, (item_id, receiver, flags) in locations.items()
+                               if item_id == item and receiver in slots]
+                    self.assertEqual(list(self.store.find_item(slots, item)), scanned)
+
         def test_get_for_player(self) -> None:
             self.assertEqual(self.store.get_for_player(3), {4: {9}})
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
+            self.assertEqual(list(self.store.get_for_player(2)), [1, 2])
             self.assertEqual(self.store.get_for_player(9999), {})
+            self.assertEqual(self.store.get_for_player(0), {})
 
         def test_get_checked(self) -> None:
             self.assertEqual(self.store.get_checked(full_state, 0, 1), [11, 12, 13])
@@ -165,6 +177,40 @@ class Base:
             with self.assertRaises(KeyError):
                 self.store.get_remaining(bad_state, 0, 9999)
 
+        def test_new_checks(self) -> None:
+            checks = self.store.new_checks(2)
+            self.assertEqual(len(checks), 0)
+            checks |= {21, 23, 11, "23"}  # locations of other slots and invalid IDs are ignored
+            self.assertEqual(len(checks), 2)
+            self.assertEqual(list(checks), [21, 23])
+            self.assertEqual(checks, {21, 23})
+            self.assertIn(21, checks)
+            self.assertNotIn(22, checks)
+            self.assertNotIn(11, checks)
+            self.assertNotIn(2 ** 100, checks)
+            self.assertEqual({21, 22, 11} - checks, {22, 11})
+            checks.add(22)
+            self.assertEqual(len(checks), 3)
+            with self.assertRaises(KeyError):
+                checks.add(11)
+            checks.discard(22)
+            self.assertEqual(checks, {21, 23})
+            with self.assertRaises(KeyError):
+                self.store.new_checks(6)
+
+        def test_checks_accessors(self) -> None:
+            # accessors have to give the same results for bitset and set states
+            for slot_checks in ({12}, set(), {11, 12, 13}):
+                set_state = {(0, 1): slot_checks}
+                checks_state = {(0, 1): self.store.new_checks(1)}
+                checks_state[0, 1] |= slot_checks
+                self.assertEqual(sorted(self.store.get_checked(checks_state, 0, 1)),
+                                 sorted(self.store.get_checked(set_state, 0, 1)))
+                self.assertEqual(sorted(self.store.get_missing(checks_state, 0, 1)),
+                                 sorted(self.store.get_missing(set_state, 0, 1)))
+                self.assertEqual(self.store.get_remaining(checks_state, 0, 1),
+                                 self.store.get_remaining(set_state, 0, 1))
+
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
             locations.intersection_update(self.store[1])
@@ -0,0 +1,63 @@
+import pickle
+import unittest
+import zlib
+
+from NetUtils import LazySlotData, MultiDataSections, encode_multidata, multidata_version
+from Utils import VersionException
+
+multidata = {
+    "slot_data": {1: {"goal": 1}, 2: {"goal": 2, "nested": [1, (2, 3)]}},
+    "locations": {1: {100: (200, 2, 0)}, 2: {101: (201, 1, 1)}},
+    "seed_name": "12345",
+    "datapackage": {"Game": {"checksum": "abc", "version": 0}},
+}
+
+
+class TestMultiDataSections(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """Tests that encoded multidata decodes into the same values."""
+        data = encode_multidata(multidata)
+        self.assertEqual(multidata_version, data[0])
+        decoded = MultiDataSections(data)
+        self.assertEqual(set(multidata), set(decoded))
+        self.assertEqual(len(multidata), len(decoded))
+        for key, value in multidata.items():
+            self.assertEqual(value, dict(decoded[key]) if key == "slot_data" else decoded[key], key)
+
+    def test_lazy(self) -> None:
+        """Tests that sections and the slot_data of each slot only get decoded when accessed."""
+        decoded = MultiDataSections(encode_multidata(multidata))
+        self.assertEqual({}, decoded._decoded)
+        slot_data = decoded["slot_data"]
+        self.assertIsInstance(slot_data, LazySlotData)
+        self.assertEqual({2: {"goal": 2, "nested": [1, (2, 3)]}}, {2: slot_data[2]})
+        self.assertEqual([2], list(slot_data._decoded))
+        self.assertEqual({"slot_data"}, set(decoded._decoded))
+
+    def test_reencode(self) -> None:
+        """Tests that re-encoding keeps sections that were not accessed and picks up changed ones."""
+        decoded = MultiDataSections(encode_multidata(multidata))
+        raw_locations = decoded.get_raw("locations")
+        decoded["datapackage"]["Game"]["version"] = 1
+        del decoded["seed_name"]
+        decoded["race_mode"] = 1
+        self.assertEqual({1, 2}, set(decoded.get_raw("slot_data")))
+        decoded["slot_data"][1]
+
+        reencoded = MultiDataSections(encode_multidata(decoded))
+        self.assertEqual(raw_locations, reencoded.get_raw("locations"))
+        self.assertNotIn("seed_name", reencoded)
+        self.assertEqual(1, reencoded["race_mode"])
+        self.assertEqual(1, reencoded["datapackage"]["Game"]["version"])
+        self.assertEqual(multidata["slot_data"], dict(reencoded["slot_data"]))
+
+    def test_old_version(self) -> None:
+        """Tests that multidata of the previous single compressed pickle format still loads."""
+        decoded = MultiDataSections(bytes([3]) + zlib.compress(pickle.dumps(multidata), 9))
+        self.assertEqual(multidata, dict(decoded))
+        self.assertEqual(multidata, dict(MultiDataSections(encode_multidata(decoded))))
+
+    def test_newer_version(self) -> None:
+        """Tests that multidata of an unknown newer format gets rejected."""
+        with self.assertRaises(VersionException):
+            MultiDataSections(bytes([multidata_version + 1]) + encode_multidata(multidata)[1:])
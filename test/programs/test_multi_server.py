@@ -1,5 +1,21 @@
+import asyncio
+import collections
+import datetime
+import logging
+import os
+import tempfile
+import threading
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import unittest.mock
+
+import MultiServer
+import Utils
+from MultiServer import Client, Context, ServerCommandProcessor, ServerMetrics, collect_player, \
+    encoded_game_packages, release_player, send_items_to, send_new_items
+import NetUtils
+from NetUtils import ClientStatus, Hint, HintStatus, LocationStore, NetworkItem, NetworkSlot, SlotType, decode, \
+    decode_binary, encode
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +54,346 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestDataPackage(unittest.TestCase):
+    def test_encode_data_package(self) -> None:
+        """Tests that the spliced DataPackage message is the same as encoding it as a whole."""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.gamespackage = {name: game_package for name, game_package in list(ctx.gamespackage.items())[:3]}
+        ctx.gamespackage["No Checksum"] = {"item_name_to_id": {"Item": 1}, "location_name_to_id": {}}
+        for game_names in (list(ctx.gamespackage), list(ctx.gamespackage)[1:], []):
+            with self.subTest(games=game_names):
+                for _ in range(2):  # encoded and cached
+                    self.assertEqual(encode([{"cmd": "DataPackage", "data": {"games": {
+                        name: ctx.gamespackage[name] for name in game_names}}}]), ctx.encode_data_package(game_names))
+        for name, game_package in ctx.gamespackage.items():
+            if "checksum" in game_package:
+                self.assertIn(game_package["checksum"], encoded_game_packages)
+
+    def test_encoded_game_packages_bounded(self) -> None:
+        """Tests that the cache of encoded game packages drops the least recently used ones when full."""
+        with unittest.mock.patch.object(MultiServer, "max_encoded_game_packages", 2), \
+                unittest.mock.patch.object(MultiServer, "encoded_game_packages", collections.OrderedDict()) as cache:
+            MultiServer.get_encoded_game_package("a", {"checksum": "a"})
+            MultiServer.get_encoded_game_package("b", {"checksum": "b"})
+            self.assertEqual(encode({"checksum": "a"}), MultiServer.get_encoded_game_package("a", {"checksum": "a"}))
+            MultiServer.get_encoded_game_package("c", {"checksum": "c"})
+            self.assertEqual(["a", "c"], list(cache))
+
+
+class TestServerMetrics(unittest.TestCase):
+    def test_report(self) -> None:
+        """Tests that timings land in their histogram buckets and sent packets are counted by type and recipient."""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        metrics = ServerMetrics(60)
+        metrics.record("save", 0.002)
+        metrics.record("save", 2.0)
+        metrics.record_cmd("Sync", 0.00005)
+        metrics.record_cmd(["Sync"], 0.00005)
+        msg = encode([{"cmd": "PrintJSON", "data": [{"text": "\u00fc"}]}])
+        metrics.record_sent(msg, 3)
+        metrics.record_sent("[]")
+        report = metrics.report(ctx)
+
+        self.assertEqual(0, report["endpoints"])
+        self.assertEqual({"cmd Sync", "cmd unknown", "save"}, set(report["timings"]))
+        save = report["timings"]["save"]
+        self.assertEqual(2, save["count"])
+        self.assertEqual(2.0, save["max"])
+        self.assertEqual([0, 0, 1, 0, 0, 0, 0, 0, 1], save["buckets"])
+        self.assertEqual([1, 0, 0, 0, 0, 0, 0, 0, 0], report["timings"]["cmd Sync"]["buckets"])
+        self.assertEqual({"packets": 3, "size": 3 * len(msg)}, report["sent"]["PrintJSON"])
+        self.assertEqual({"packets": 1, "size": 2}, report["sent"]["unknown"])
+        self.assertEqual({}, metrics.report(ctx)["timings"], "report should start a new interval")
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesce(self) -> None:
+        """Tests that items sent within one event loop tick reach only their slots' clients, in one packet each."""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        sent: typing.List[typing.Tuple[Client, typing.List[dict]]] = []
+
+        async def send_msgs(client: Client, msgs: typing.List[dict]) -> bool:
+            sent.append((client, msgs))
+            return True
+
+        ctx.send_msgs = send_msgs  # type: ignore[method-assign]
+        clients = {slot: Client(None, ctx) for slot in (1, 2, 3)}
+        ctx.clients = {0: {slot: [client] for slot, client in clients.items()}}
+        for slot, client in clients.items():
+            client.team, client.slot = 0, slot
+        items = [NetworkItem(10, 1, 2, 0), NetworkItem(11, 2, 2, 0), NetworkItem(12, 3, 3, 0)]
+
+        send_items_to(ctx, 0, 1, items[0])
+        send_new_items(ctx)
+        send_items_to(ctx, 0, 1, items[1])
+        send_items_to(ctx, 0, 2, items[2])
+        send_new_items(ctx)
+        self.assertEqual([], sent, "items should be sent at the end of the tick")
+        for _ in range(2):  # one tick to flush, one to run the send tasks
+            await asyncio.sleep(0)
+
+        self.assertEqual(2, len(sent))
+        received = {client.slot: msgs[0]["items"] for client, msgs in sent}
+        self.assertEqual({1: items[:2], 2: items[2:]}, received)
+        self.assertEqual(2, clients[1].send_index)
+        self.assertEqual(0, clients[3].send_index)
+
+        send_new_items(ctx)
+        await asyncio.sleep(0)
+        self.assertEqual(2, len(sent), "clients should not be sent items again")
+
+
+class TestBulkSendLogging(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ctx = ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.slot_info = {1: NetworkSlot("One", "Game", SlotType.player), 2: NetworkSlot("Two", "Game", SlotType.player)}
+        ctx.clients = {0: {1: [], 2: []}}
+        ctx.player_names = {(0, 1): "One", (0, 2): "Two"}
+        ctx.locations = LocationStore({1: {10: (100, 2, 0), 11: (101, 1, 0), 12: (102, 2, 0)}, 2: {20: (200, 1, 0)}})
+        ctx.location_checks = Utils.KeyedDefaultDict(ctx._new_location_checks)
+        ctx.item_names["Game"].update({100: "A", 101: "B", 102: "C", 200: "D"})
+        ctx.location_names["Game"].update({10: "L10", 11: "L11", 12: "L12", 20: "L20"})
+        ctx.save = lambda *args, **kwargs: None  # type: ignore[method-assign]
+        ctx.logger = logging.getLogger("TestBulkSendLogging")
+
+    async def test_release(self) -> None:
+        """Tests that a release logs one summary at info level and the sent items at debug level."""
+        with self.assertLogs(self.ctx.logger, logging.DEBUG) as logs:
+            release_player(self.ctx, 0, 1)
+        info = [record for record in logs.records if record.levelno == logging.INFO]
+        self.assertEqual(2, len(info))  # the broadcast notice and the summary
+        self.assertEqual("(Team #1) Release of One sent 3 items: 2 to Two, 1 to One", info[1].getMessage())
+        self.assertEqual({"type": "Release", "team": 0, "slot": 1, "items": 3, "receivers": {2: 2, 1: 1}},
+                         info[1].bulk_send)
+        self.assertEqual(["(Team #1) One sent B to One (L11)", "(Team #1) One sent A to Two (L10)",
+                          "(Team #1) One sent C to Two (L12)"],
+                         [record.getMessage() for record in logs.records if record.levelno == logging.DEBUG])
+
+    async def test_collect(self) -> None:
+        """Tests that a collect from several worlds gets summarised as one record."""
+        self.ctx.locations = LocationStore({1: {10: (100, 2, 0)}, 2: {20: (200, 2, 0), 21: (201, 1, 0)}})
+        self.ctx.location_checks = Utils.KeyedDefaultDict(self.ctx._new_location_checks)
+        with self.assertLogs(self.ctx.logger, logging.INFO) as logs:
+            collect_player(self.ctx, 0, 2)
+        self.assertEqual(["Notice (all): Two (Team #1) has collected their items from other worlds.",
+                          "(Team #1) Collect of Two sent 2 items: 2 to Two"],
+                         [record.getMessage() for record in logs.records])
+
+
+@unittest.skipUnless(NetUtils.msgpack, "msgpack not installed")
+class TestBinaryClients(unittest.IsolatedAsyncioTestCase):
+    class Socket:
+        def __init__(self) -> None:
+            self.open = True
+            self.sent: typing.List[typing.Union[str, bytes]] = []
+
+        async def send(self, msg: typing.Union[str, bytes]) -> None:
+            self.sent.append(msg)
+
+    async def test_encodings(self) -> None:
+        """Tests that clients asking for the binary encoding get it for the packets that support it."""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        broadcasts: typing.List[typing.Tuple[typing.List[Client], typing.Union[str, bytes]]] = []
+
+        async def broadcast_send_encoded_msgs(endpoints: typing.Iterable[Client],
+                                              msg: typing.Union[str, bytes]) -> bool:
+            broadcasts.append((list(endpoints), msg))
+            return True
+
+        ctx.broadcast_send_encoded_msgs = broadcast_send_encoded_msgs  # type: ignore[method-assign]
+        text_client, binary_client = Client(self.Socket(), ctx), Client(self.Socket(), ctx)
+        binary_client.binary = True
+        received_items = [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 0)]}]
+        retrieved = [{"cmd": "Retrieved", "keys": {"key": None}}]
+
+        for client in (text_client, binary_client):
+            await ctx.send_msgs(client, received_items)
+            await ctx.send_msgs(client, retrieved)
+        self.assertEqual([encode(received_items), encode(retrieved)], text_client.socket.sent)
+        self.assertIsInstance(binary_client.socket.sent[0], bytes)
+        self.assertEqual(decode(encode(received_items)), decode_binary(binary_client.socket.sent[0]))
+        self.assertEqual(encode(retrieved), binary_client.socket.sent[1])
+
+        ctx.broadcast([text_client, binary_client], received_items)
+        ctx.broadcast([text_client, binary_client], retrieved)
+        await asyncio.sleep(0)
+        self.assertEqual([([text_client], str), ([binary_client], bytes), ([text_client, binary_client], str)],
+                         [(endpoints, type(msg)) for endpoints, msg in broadcasts])
+
+    async def test_json_fallback(self) -> None:
+        """Tests that binary clients get slot_data and values msgpack can't encode as JSON, which round-trips them."""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        client = Client(self.Socket(), ctx)
+        client.binary = True
+        connected = [{"cmd": "Connected", "team": 0, "slot": 1,
+                      "slot_data": {"big": 2 ** 70, "item": NetworkItem(1, 2, 3, 0)}}]
+        print_json = [{"cmd": "PrintJSON", "type": "ItemSend", "data": [{"text": "Item"}], "receiving": 1,
+                       "item": NetworkItem(1, 2 ** 70, 1, 0)}]
+
+        await ctx.send_msgs(client, connected)
+        await ctx.send_msgs(client, print_json)
+        self.assertEqual([encode(connected), encode(print_json)], client.socket.sent)
+        self.assertEqual(connected, decode(client.socket.sent[0]))
+        self.assertIsInstance(decode(client.socket.sent[0])[0]["slot_data"]["item"], NetworkItem)
+        self.assertEqual(print_json, decode(client.socket.sent[1]))
+
+
+class TestHintIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.hint = Hint(2, 1, 4, 13, False, status=HintStatus.HINT_PRIORITY)
+        self.other_hint = Hint(1, 2, 5, 14, False, status=HintStatus.HINT_PRIORITY)
+        for hint in (self.hint, self.other_hint):
+            for slot in (1, 2):
+                self.ctx.hints[0, slot].add(hint)
+
+    def check(self, slot: int, location: int) -> set:
+        self.ctx.location_checks[0, slot].add(location)
+        changed = set()
+        self.ctx.check_hints(0, slot, [location], changed)
+        return changed
+
+    def test_check_hints(self) -> None:
+        """Tests that checking a location marks exactly the hints for it as found, in all slots holding them."""
+        self.assertEqual(set(), self.check(1, 5), "location without hint should not change hints")
+        self.assertEqual({(0, 1), (0, 2)}, self.check(1, 4))
+        found_hint = self.hint._replace(found=True, status=HintStatus.HINT_FOUND)
+        for slot in (1, 2):
+            self.assertEqual({found_hint, self.other_hint}, self.ctx.hints[0, slot])
+        self.assertNotIn((0, 1, 4), self.ctx.hint_index)
+        self.assertIn((0, 2, 5), self.ctx.hint_index)
+
+    def test_replaced_hint(self) -> None:
+        """Tests that a hint replaced after the index was built is still found."""
+        self.ctx.get_hint_index()
+        new_hint = self.hint.re_prioritize(self.ctx, HintStatus.HINT_AVOID)
+        for slot in (1, 2):
+            self.ctx.replace_hint(0, slot, self.hint, new_hint)
+        self.check(1, 4)
+        found_hint = self.hint._replace(found=True, status=HintStatus.HINT_FOUND)
+        for slot in (1, 2):
+            self.assertEqual({found_hint, self.other_hint}, self.ctx.hints[0, slot])
+
+    def test_build_rechecks(self) -> None:
+        """Tests that building the index marks hints for locations checked before as found."""
+        self.ctx.location_checks[0, 2].add(5)
+        self.ctx.get_hint_index()
+        self.assertEqual({(0, 1, 4)}, set(self.ctx.hint_index))
+        self.assertIn(self.other_hint._replace(found=True, status=HintStatus.HINT_FOUND), self.ctx.hints[0, 1])
+
+
+class TestSaveJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.save_filename = os.path.join(temp_dir.name, "test.apsave")
+
+    def make_context(self) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.connect_names = {"Player1": (0, 1), "Player2": (0, 2)}
+        ctx.save_filename = self.save_filename
+        ctx._start_async_saving = lambda: None  # type: ignore[method-assign]
+        ctx.init_save()
+        return ctx
+
+    @staticmethod
+    def get_state(ctx: Context) -> dict:
+        save = ctx.get_save()
+        del save["journal_generation"]
+        return save
+
+    def test_replay(self) -> None:
+        """Tests that a full save plus journal entries loads into the same state they were written from."""
+        ctx = self.make_context()
+        self.assertTrue(ctx._save())
+        self.assertEqual(0, ctx.save_journal.size, "first save should be a full save")
+        ctx.save_journal.snapshot_size = 1 << 20  # don't compact during the test
+
+        ctx.location_checks[0, 1] |= {1, 2}
+        ctx.received_items[0, 2, True] = [NetworkItem(10, 1, 1, 0), NetworkItem(11, 2, 1, 0)]
+        ctx.client_game_state[0, 1] = ClientStatus.CLIENT_PLAYING
+        ctx.client_activity_timers[0, 1] = datetime.datetime.now(datetime.timezone.utc)
+        ctx.stored_data["key"] = {"a": 1}
+        ctx.save_journal.mark("stored_data", "key")
+        ctx.name_aliases[0, 2] = "Alias"
+        self.assertTrue(ctx._save())
+        size = ctx.save_journal.size
+        self.assertGreater(size, 0)
+
+        ctx.location_checks[0, 1].add(3)
+        ctx.received_items[0, 2, True].append(NetworkItem(12, 3, 1, 0))
+        ctx.hints[0, 1].add(Hint(2, 1, 4, 13, False))
+        ctx.on_changed_hints(0, 1)
+        ctx.hints_used[0, 1] += 1
+        ctx.stored_data["key"]["b"] = 2
+        ctx.save_journal.mark("stored_data", "key")
+        del ctx.name_aliases[0, 2]
+        ctx.hint_cost = 5
+        ctx.random.random()
+        self.assertTrue(ctx._save())
+        self.assertGreater(ctx.save_journal.size, size)
+
+        self.assertTrue(ctx._save())
+        self.assertGreater(ctx.save_journal.size, size, "saving without changes should not write an entry")
+
+        loaded = self.make_context()
+        self.assertEqual(self.get_state(ctx), self.get_state(loaded))
+        self.assertEqual(ctx.client_activity_timers, loaded.client_activity_timers)
+
+    def test_compaction(self) -> None:
+        """Tests that compaction outdates the existing journal entries."""
+        ctx = self.make_context()
+        self.assertTrue(ctx._save())
+        ctx.save_journal.snapshot_size = 1 << 20
+        ctx.location_checks[0, 1].add(1)
+        self.assertTrue(ctx._save())
+        journal_size = os.path.getsize(ctx.journal_filename)
+        self.assertGreater(journal_size, 0)
+
+        self.assertTrue(ctx._save(exit_save=True))
+        self.assertEqual(0, os.path.getsize(ctx.journal_filename))
+        self.assertEqual(2, ctx.save_journal.generation)
+
+        loaded = self.make_context()
+        self.assertEqual(2, loaded.save_journal.generation)
+        self.assertEqual({1}, loaded.location_checks[0, 1])
+
+    def test_incomplete_entry(self) -> None:
+        """Tests that an entry cut off while it was written is discarded, keeping all entries before it."""
+        ctx = self.make_context()
+        self.assertTrue(ctx._save())
+        ctx.save_journal.snapshot_size = 1 << 20
+        ctx.location_checks[0, 1].add(1)
+        self.assertTrue(ctx._save())
+        complete_size = ctx.save_journal.size
+        ctx.location_checks[0, 1].add(2)
+        self.assertTrue(ctx._save())
+        with open(ctx.journal_filename, "r+b") as f:
+            f.truncate(ctx.save_journal.size - 1)
+
+        with self.assertLogs(level="WARNING"):
+            loaded = self.make_context()
+        self.assertEqual({1}, loaded.location_checks[0, 1])
+        self.assertEqual(complete_size, os.path.getsize(ctx.journal_filename))
+
+    def test_concurrent_marks(self) -> None:
+        """Tests that marks made while the saving thread collects them are neither lost nor break collecting."""
+        ctx = self.make_context()
+        keys = [f"key{index}" for index in range(20000)]
+        for key in keys:
+            ctx.stored_data[key] = 0
+
+        def mark_all() -> None:
+            for key in keys:
+                ctx.save_journal.mark("stored_data", key)
+
+        thread = threading.Thread(target=mark_all)
+        collected: typing.Set[str] = set()
+        thread.start()
+        while thread.is_alive():
+            collected.update(ctx.save_journal.collect(ctx).get("stored_data", ({}, set()))[0])
+        thread.join()
+        collected.update(ctx.save_journal.collect(ctx).get("stored_data", ({}, set()))[0])
+        self.assertEqual(set(keys), collected)
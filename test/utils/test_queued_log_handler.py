@@ -0,0 +1,53 @@
+import logging
+import threading
+import typing
+import unittest
+
+from Utils import QueuedLogHandler
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: typing.List[str] = []
+        self.threads: typing.Set[str] = set()
+        self.closed = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+
+    def close(self) -> None:
+        self.closed = True
+        super().close()
+
+
+class TestQueuedLogHandler(unittest.TestCase):
+    def test_writes_in_background(self) -> None:
+        """Tests that records reach the wrapped handler in order from the writer thread before it gets closed."""
+        logger = logging.getLogger("TestQueuedLogHandler")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        handler = RecordingHandler()
+        handler.setLevel(logging.INFO)
+        queued_handler = QueuedLogHandler(handler)
+        logger.addHandler(queued_handler)
+        self.addCleanup(logger.removeHandler, queued_handler)
+
+        for i in range(100):
+            logger.info("message %d", i)
+        logger.debug("filtered")
+        try:
+            raise ValueError("error")
+        except ValueError:
+            logger.exception("exception")
+        queued_handler.close()
+
+        self.assertTrue(handler.closed)
+        self.assertEqual([f"message {i}" for i in range(100)], handler.messages[:100])
+        self.assertEqual(101, len(handler.messages))
+        self.assertIn("ValueError: error", handler.messages[-1])
+        self.assertNotIn(threading.current_thread().name, handler.threads)
+
+        logger.info("after close")
+        self.assertEqual(101, len(handler.messages))
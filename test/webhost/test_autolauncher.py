@@ -0,0 +1,35 @@
+import unittest
+from uuid import uuid4
+
+
+class TestRoomPlacement(unittest.TestCase):
+    def test_get_load(self) -> None:
+        """Verify that hosters are ranked by reported memory plus an estimate for rooms they did not report yet."""
+        from WebHostLib import app
+        from WebHostLib.autolauncher import MultiworldInstance
+
+        hosters = [MultiworldInstance(app.config, x) for x in range(3)]
+        for hoster, (memory, rooms) in zip(hosters, ((300, 2), (200, 1), (100, 0))):
+            hoster.status[:] = [memory, rooms]
+            hoster.room_ids = {uuid4() for _ in range(rooms)}
+        self.assertEqual((100, 0), hosters[2].get_load())
+        self.assertIs(hosters[2], min(hosters, key=MultiworldInstance.get_load))
+
+        hosters[2].room_ids.add(uuid4())
+        hosters[2].room_ids.add(uuid4())
+        self.assertEqual((300, 2), hosters[2].get_load())
+        self.assertIs(hosters[1], min(hosters, key=MultiworldInstance.get_load))
+
+    def test_update_rooms(self) -> None:
+        """Verify that rooms reported as shut down are no longer counted for their hoster."""
+        from WebHostLib import app
+        from WebHostLib.autolauncher import MultiworldInstance
+
+        hoster = MultiworldInstance(app.config, 0)
+        room_id = uuid4()
+        hoster.start_room(room_id)
+        self.assertEqual({room_id}, hoster.room_ids)
+        self.assertEqual(room_id, hoster.rooms_to_start.get(timeout=5))
+        hoster.rooms_shutting_down.put(room_id)
+        while hoster.room_ids:  # the queue only shows the room once its feeder thread got to it
+            hoster.update_rooms()
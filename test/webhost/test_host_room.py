@@ -219,10 +219,177 @@ class TestHostFakeRoom(TestBase):
         room_id = uuid4()
         self.addCleanup(_cleanup_logger, room_id)
         logger = set_up_logging(room_id)
-        handlers = logger.handlers[:]
+        handlers = [getattr(handler, "handler", handler) for handler in logger.handlers]
         self.assertGreater(len(handlers), 0)
 
         tear_down_logging(room_id)
         for handler in handlers:
             if isinstance(handler, logging.FileHandler):
                 self.assertTrue(handler.stream is None or handler.stream.closed)
+
+    def test_command_poller(self) -> None:
+        """Verify that the command poller hands commands to hosted rooms only and deletes the ones it handed over."""
+        import asyncio
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import DBCommandPoller
+        from WebHostLib.models import Command, Room, Seed
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            other_room = Room(seed=Seed(multidata=b"", owner=room.owner), owner=room.owner)
+            other_room_id = other_room.id
+            Command(room=room, commandtext="/help")
+            Command(room=other_room, commandtext="/exit")
+        self.addCleanup(self._delete_room, other_room_id)
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        poller = DBCommandPoller(loop)
+        received: list[str] = []
+        poller.add(self.room_id, received.append)
+        poller._process_db_commands()
+        loop.run_until_complete(asyncio.sleep(0))
+
+        self.assertEqual(["/help"], received)
+        with db_session:
+            self.assertEqual(["/exit"], [command.commandtext for command in select(command for command in Command)])
+
+    def test_delete_stale_commands(self) -> None:
+        """Verify that commands of rooms closed for longer than the maximum room timeout get deleted."""
+        import datetime
+        from pony.orm import db_session, select
+        from Utils import utcnow
+        from WebHostLib.autolauncher import delete_stale_commands
+        from WebHostLib.models import Command, Room, Seed
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            closed_room = Room(seed=Seed(multidata=b"", owner=room.owner), owner=room.owner,
+                               last_activity=utcnow() - datetime.timedelta(hours=2))
+            closed_room_id = closed_room.id
+            Command(room=room, commandtext="/help")
+            Command(room=closed_room, commandtext="/exit")
+        self.addCleanup(self._delete_room, closed_room_id)
+
+        self.assertEqual(1, delete_stale_commands(3600))
+        with db_session:
+            self.assertEqual(["/help"], [command.commandtext for command in select(command for command in Command)])
+
+    def test_command_poller_failure(self) -> None:
+        """Verify that the command poller logs a failed poll and keeps polling."""
+        import asyncio
+        from WebHostLib.customserver import DBCommandPoller
+
+        class FailingPoller(DBCommandPoller):
+            interval = 0
+            polls = 0
+
+            def _process_db_commands(self) -> None:
+                self.polls += 1
+                if self.polls == 1:
+                    raise ConnectionError("database unreachable")
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        poller = FailingPoller(loop)
+        poller.add(self.room_id, lambda commandtext: None)
+
+        async def poll_twice() -> None:
+            task = asyncio.create_task(poller.run())
+            while poller.polls < 2 and not task.done():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with self.assertLogs(level=logging.ERROR) as logs:
+            loop.run_until_complete(poll_twice())
+        self.assertGreaterEqual(poller.polls, 2)
+        self.assertIn("database unreachable", logs.output[0])
+
+    def test_hibernate_wake_up(self) -> None:
+        """Verify that a room only hibernates without connecting clients, wakes up once its save is done, and keeps
+        hibernating if reopening its context fails."""
+        import asyncio
+        import threading
+        import time
+        from MultiServer import Context
+        from WebHostLib.customserver import HibernatingRoom
+
+        logger = logging.getLogger("test_hibernate_wake_up")
+        opened: list[Context] = []
+        failures: list[Exception] = []
+        events: list[str] = []
+
+        async def open_room(room_id: UUID, room_logger: logging.Logger) -> Context:
+            await asyncio.sleep(0)
+            if failures:
+                raise failures.pop()
+            ctx = Context("", 0, "", "", 0, 0, False, logger=room_logger)
+            opened.append(ctx)
+            events.append("open")
+            return ctx
+
+        def save(exit_save: bool = False) -> bool:
+            time.sleep(0.05)
+            events.append("save" if threading.current_thread() is not threading.main_thread() else "save on loop")
+            return True
+
+        async def cycle() -> None:
+            room = HibernatingRoom(self.room_id, logger, open_room)
+            first = await room.open()
+            room.server = server = object()
+            room.connections = 1
+            self.assertFalse(await room.hibernate(), "a room with a connecting client should not hibernate")
+            self.assertIs(first, room.ctx)
+            room.connections = 0
+
+            first.saving = True
+            first._save = save  # type: ignore[method-assign]
+            hibernating = asyncio.create_task(room.hibernate())
+            await asyncio.sleep(0)
+            await room.wake_up()
+            self.assertTrue(await hibernating)
+            self.assertEqual(["open", "save", "open"], events, "waking up should wait for the save to finish")
+            self.assertIsNot(first, room.ctx)
+            self.assertTrue(await room.hibernate())
+            self.assertTrue(first.exit_event.is_set())
+            self.assertIsNone(room.ctx)
+            self.assertIsNone(room.cmdprocessor)
+
+            failures.append(ConnectionError("database unreachable"))
+            with self.assertLogs(logger, logging.ERROR):
+                await room.wake_up()
+            self.assertTrue(room.hibernating)
+            self.assertFalse(room.woken.is_set())
+
+            with self.assertLogs(logger, logging.INFO) as logs:
+                room.handle_command("/help")
+                room.handle_command("/help")
+                await asyncio.wait_for(room.woken.wait(), 1)
+                await asyncio.sleep(0)
+            self.assertFalse(room.hibernating)
+            self.assertEqual(3, len(opened), "waking up should open the context once")
+            self.assertIs(opened[-1], room.ctx)
+            self.assertIs(server, room.ctx.server)
+            self.assertEqual(1, sum(record.getMessage() == "Woke up from hibernation." for record in logs.records))
+            self.assertEqual(2, sum("/help" in record.getMessage() for record in logs.records))
+
+            self.assertTrue(await room.hibernate())
+            room.close()
+            await room.wake_up()
+            self.assertIsNone(room.ctx)
+            self.assertEqual(3, len(opened))
+
+        asyncio.run(cycle())
+
+    @staticmethod
+    def _delete_room(room_id: UUID) -> None:
+        from pony.orm import db_session, select
+        from WebHostLib.models import Command, Room
+
+        with db_session:
+            for command in select(command for command in Command if command.room.id == room_id):  # type: ignore
+                command.delete()
+            room: Room = Room.get(id=room_id)
+            room.seed.delete()
+            room.delete()
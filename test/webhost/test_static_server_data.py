@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+
+
+class TestStaticServerData(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """Verify that mapped static server data equals the original and only loads the games that get accessed."""
+        from WebHostLib.customserver import LazyGameData, get_static_server_data, map_static_server_data, \
+            write_static_server_data
+
+        static_server_data = get_static_server_data()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "static_server_data.bin")
+            with open(path, "wb") as file:
+                write_static_server_data(file)
+            mapped = map_static_server_data(path)
+
+            self.assertEqual(static_server_data.keys(), mapped.keys())
+            self.assertEqual(static_server_data["non_hintable_names"], mapped["non_hintable_names"])
+            gamespackage = mapped["gamespackage"]
+            self.assertIsInstance(gamespackage, LazyGameData)
+            self.assertIn("Archipelago", gamespackage)
+            self.assertNotIn("Not A Game", gamespackage)
+            self.assertEqual({}, gamespackage.get("Not A Game", {}))
+            self.assertEqual(static_server_data["gamespackage"]["Archipelago"], gamespackage["Archipelago"])
+            self.assertIs(gamespackage["Archipelago"], gamespackage["Archipelago"])
+            self.assertEqual(["Archipelago"], list(gamespackage._loaded))
+
+            for section in ("gamespackage", "item_name_groups", "location_name_groups"):
+                with self.subTest(section=section):
+                    self.assertEqual(static_server_data[section], dict(mapped[section]))
+            del mapped, gamespackage  # release the mapping before the file gets deleted
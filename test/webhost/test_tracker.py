@@ -103,3 +103,28 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_tracker_data_cache(self) -> None:
+        """Verify that TrackerData shares the decoded seed between requests without sharing placeholder names, and
+        reloads the save only on changes."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first = TrackerData(room)
+            second = TrackerData(room)
+            self.assertIs(first._multidata, second._multidata)
+            self.assertEqual(first.item_id_to_name["Archipelago"], second.item_id_to_name["Archipelago"])
+            self.assertEqual("Unknown Item (ID: -999)", first.item_id_to_name["Archipelago"][-999])
+            self.assertNotIn(-999, second.item_id_to_name["Archipelago"])
+            self.assertEqual({}, second._multisave)
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1}}})
+            saved = TrackerData(room)
+            self.assertEqual({1}, saved.get_player_checked_locations(0, 1))
+            self.assertIs(saved._multisave, TrackerData(room)._multisave)
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1, 2}}})
+            self.assertEqual({1, 2}, TrackerData(room).get_player_checked_locations(0, 1))
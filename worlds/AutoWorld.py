@@ -576,6 +576,13 @@ class World(metaclass=AutoWorldRegister):
         """Called when a region is newly reachable by the state."""
         pass
 
+    def get_connections_to_recheck(self, state: "CollectionState", item_names: Set[str]) -> Iterable["Entrance"]:
+        """
+        Called when updating reachable regions if only the given item names were collected since the last update,
+        see CollectionState.stale. Returns the blocked connections that could have been unblocked by these items.
+        """
+        return state.blocked_connections[self.player]
+
     # following methods should not need to be overridden.
     def create_filler(self) -> "Item":
         return self.create_item(self.get_filler_item_name())
@@ -640,6 +647,7 @@ class World(metaclass=AutoWorldRegister):
         """Sets an access rule for a location or entrance"""
         if isinstance(rule, Rule):
             rule = rule.resolve(self)
+            rule.compile()
             self.register_rule_dependencies(rule)
             if isinstance(spot, Entrance):
                 self._register_rule_indirects(rule, spot)
@@ -649,6 +657,7 @@ class World(metaclass=AutoWorldRegister):
         """Set the completion rule for this world"""
         if isinstance(rule, Rule):
             rule = rule.resolve(self)
+            rule.compile()
             self.register_rule_dependencies(rule)
         self.multiworld.completion_condition[self.player] = rule
 
@@ -666,6 +675,7 @@ class World(metaclass=AutoWorldRegister):
             rule = rule.resolve(self)
             if rule.always_false and not force_creation:
                 return None
+            rule.compile()
             self.register_rule_dependencies(rule)
 
         entrance = from_region.connect(to_region, name, rule=rule)
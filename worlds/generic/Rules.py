@@ -68,12 +68,14 @@ def locality_rules(multiworld: MultiWorld):
                     lambda i, sending_blockers = forbid_data[location.player], \
                                             old_rule = location.item_rule: \
                     i.name not in sending_blockers[i.player]
+                multiworld.locality_item_rules[location.item_rule] = forbid_data[location.player]
             # special rule, needs to also be fulfilled.
             else:
                 func_cache[location.player, location.item_rule] = location.item_rule = \
                     lambda i, sending_blockers = forbid_data[location.player], \
                                             old_rule = location.item_rule: \
                     i.name not in sending_blockers[i.player] and old_rule(i)
+                multiworld.locality_item_rules[location.item_rule] = forbid_data[location.player]
 
 
 def exclusion_rules(multiworld: MultiWorld, player: int, exclude_locations: typing.Set[str]) -> None: